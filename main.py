@@ -27,6 +27,8 @@ def menu() -> None:
     print("10. Mostrar conceptos clave")
     print("11. Ver archivos soportados")
     print("12. Recargar archivos desde storage")
+    print("13. 🔁 Repasar flashcards pendientes")
+    print("14. 📊 Panel de progreso")
     print("0. Salir")
 
 if __name__ == "__main__":
@@ -34,7 +36,7 @@ if __name__ == "__main__":
 
     while True:
         menu()
-        opcion: str = input("Seleccione una opción (0-12): ")
+        opcion: str = input("Seleccione una opción (0-14): ")
 
         if opcion == "1":
             archivo: str = input("Ingrese la ruta del archivo (por ejemplo C:/ruta/archivo.txt): ")
@@ -105,6 +107,12 @@ if __name__ == "__main__":
         elif opcion == "12":
             app.reload_files_from_storage()
 
+        elif opcion == "13":
+            app.start_flashcard_review()
+
+        elif opcion == "14":
+            app.show_progress_dashboard()
+
         elif opcion == "0":
             print("👋 Saliendo de StudyBox...")
             break
@@ -7,6 +7,7 @@ from .tools.audio_generator_tool import AudioGeneratorTool
 from .tools.audio_player_tool import AudioPlayerTool
 from .tools.flashcard_tool import FlashcardTool
 from .tools.quiz_tool import QuizTool
+from .tools.progress_tool import ProgressTool
 
 class StudyBoxApp:
     def __init__(self) -> None:
@@ -18,6 +19,7 @@ class StudyBoxApp:
         self.audio_player = AudioPlayerTool()
         self.flashcard_generator = FlashcardTool()
         self.quiz_generator = QuizTool()
+        self.progress = ProgressTool()
 
     def upload_file(self, file: str) -> None:
         try: 
@@ -161,6 +163,13 @@ class StudyBoxApp:
         print(f"Iniciando generador de flashcards con {len(self.texts)} archivo(s) procesado(s)...")
         self.flashcard_generator.generate_flashcards(self.texts)
 
+    def start_flashcard_review(self) -> None:
+        print("Abriendo el repaso de flashcards...")
+        self.flashcard_generator.review_due_cards()
+
+    def show_progress_dashboard(self) -> None:
+        self.progress.show_dashboard()
+
     def start_quiz_generator(self) -> None:
         if not self.texts:
             print("No hay contenido procesado. Procesa archivos primero.")
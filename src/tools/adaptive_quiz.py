@@ -0,0 +1,192 @@
+import os
+import bisect
+import sqlite3
+import threading
+from typing import Dict, Optional, Sequence, Set, Tuple
+import numpy as np
+from .study_log import KIND_QUIZ
+
+# Paso de las actualizaciones tipo Elo; se reduce a medida que un ítem (o el estudiante) acumula respuestas
+ELO_K = 0.4
+ELO_K_DECAY = 0.05
+# Pseudo-respuestas al estimar la dificultad inicial desde el historial (evita ±infinito con 0% o 100%)
+HISTORY_SMOOTHING = 1.0
+
+# Habilidad a priori del estudiante en una sesión: normal centrada en la habilidad guardada
+ABILITY_PRIOR_SD = 1.0
+ABILITY_LIMIT = 4.0
+
+# Criterio de parada del modo adaptativo: error estándar de la habilidad
+TARGET_SE = 0.5
+MIN_ADAPTIVE_ITEMS = 5
+MAX_ADAPTIVE_ITEMS = 20
+
+
+def probability_correct(ability, difficulty):
+    """Probabilidad de acertar según el modelo 1PL (Rasch): 1 / (1 + e^-(habilidad - dificultad))"""
+    return 1.0 / (1.0 + np.exp(-(np.asarray(ability) - np.asarray(difficulty))))
+
+
+def estimate_ability(difficulties: Sequence[float], responses: Sequence[bool],
+                     prior_mean: float = 0.0, prior_sd: float = ABILITY_PRIOR_SD) -> Tuple[float, float]:
+    """Habilidad más probable (MAP) y su error estándar dadas las respuestas de la sesión.
+
+    Newton-Raphson sobre la log-verosimilitud 1PL más una normal a priori; la
+    información de Fisher acumulada da el error estándar.
+    """
+    b = np.asarray(difficulties, dtype=np.float64)
+    r = np.asarray(responses, dtype=np.float64)
+    precision = 1.0 / prior_sd ** 2
+    ability = prior_mean
+    information = precision
+    for _ in range(25):
+        p = probability_correct(ability, b)
+        gradient = float(np.sum(r - p)) - (ability - prior_mean) * precision
+        information = float(np.sum(p * (1 - p))) + precision
+        step = gradient / information
+        ability = max(-ABILITY_LIMIT, min(ABILITY_LIMIT, ability + step))
+        if abs(step) < 1e-4:
+            break
+    return ability, 1.0 / np.sqrt(information)
+
+
+def _elo_step(answers: int) -> float:
+    return ELO_K / (1.0 + ELO_K_DECAY * answers)
+
+
+class ItemBank:
+    """Dificultad de cada pregunta y habilidad del estudiante (1PL), actualizadas con cada respuesta"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        if db_path is None:
+            db_path = os.path.join(os.path.dirname(__file__), "..", "storage", "quizzes.db")
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_db(self) -> None:
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS item_difficulty (
+                    item INTEGER PRIMARY KEY,
+                    difficulty REAL NOT NULL,
+                    answers INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE INDEX IF NOT EXISTS idx_item_difficulty ON item_difficulty(difficulty);
+
+                CREATE TABLE IF NOT EXISTS learner_ability (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    ability REAL NOT NULL,
+                    answers INTEGER NOT NULL
+                );
+            """)
+
+    def ability(self) -> Tuple[float, int]:
+        """(habilidad guardada, respuestas que la respaldan)"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT ability, answers FROM learner_ability WHERE id = 1").fetchone()
+        return (row["ability"], row["answers"]) if row else (0.0, 0)
+
+    def difficulties(self, items: Sequence[int]) -> Dict[int, Tuple[float, int]]:
+        """Dificultad y número de respuestas de los ítems conocidos"""
+        found: Dict[int, Tuple[float, int]] = {}
+        items = list(items)
+        with self._connect() as conn:
+            # Por partes: SQLite limita la cantidad de parámetros de una consulta
+            for start in range(0, len(items), 500):
+                chunk = items[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT item, difficulty, answers FROM item_difficulty "
+                    f"WHERE item IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                found.update({row["item"]: (row["difficulty"], row["answers"]) for row in rows})
+        return found
+
+    def fit_from_history(self, columns: Dict[str, np.ndarray], items: Sequence[int]) -> int:
+        """Estima la dificultad de los ítems sin calibrar a partir de las respuestas ya registradas.
+
+        Con la habilidad guardada como referencia, dificultad = habilidad - logit(aciertos suavizados);
+        el conteo por ítem se hace de una vez con bincount sobre el registro de estudio.
+        """
+        known = self.difficulties(items)
+        missing = np.array([item for item in items if item not in known], dtype=np.int64)
+        if not len(missing) or not len(columns["item"]):
+            return 0
+
+        mask = (columns["kind"] == KIND_QUIZ) & np.isin(columns["item"], missing)
+        answered, inverse = np.unique(columns["item"][mask], return_inverse=True)
+        if not len(answered):
+            return 0
+        counts = np.bincount(inverse, minlength=len(answered))
+        hits = np.bincount(inverse, weights=columns["correct"][mask], minlength=len(answered))
+        accuracy = (hits + HISTORY_SMOOTHING / 2) / (counts + HISTORY_SMOOTHING)
+        ability, _ = self.ability()
+        fitted = ability - np.log(accuracy / (1 - accuracy))
+
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO item_difficulty (item, difficulty, answers) VALUES (?, ?, ?)",
+                zip(answered.tolist(), fitted.tolist(), counts.tolist())
+            )
+        return len(answered)
+
+    def update(self, item: int, correct: bool) -> Tuple[float, float]:
+        """Actualización Elo tras una respuesta; devuelve (nueva habilidad, nueva dificultad)"""
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT difficulty, answers FROM item_difficulty WHERE item = ?", (item,)).fetchone()
+            difficulty, item_answers = (row["difficulty"], row["answers"]) if row else (0.0, 0)
+            learner = conn.execute("SELECT ability, answers FROM learner_ability WHERE id = 1").fetchone()
+            ability, learner_answers = (learner["ability"], learner["answers"]) if learner else (0.0, 0)
+
+            surprise = (1.0 if correct else 0.0) - float(probability_correct(ability, difficulty))
+            difficulty -= _elo_step(item_answers) * surprise
+            ability += _elo_step(learner_answers) * surprise
+
+            conn.execute("INSERT OR REPLACE INTO item_difficulty (item, difficulty, answers) VALUES (?, ?, ?)",
+                         (item, difficulty, item_answers + 1))
+            conn.execute("INSERT OR REPLACE INTO learner_ability (id, ability, answers) VALUES (1, ?, ?)",
+                         (ability, learner_answers + 1))
+        return ability, difficulty
+
+
+class AdaptiveSelector:
+    """Elige la siguiente pregunta de máxima información: en 1PL, la de dificultad más cercana a la habilidad"""
+
+    def __init__(self, difficulties: Dict[int, float]):
+        ordered = sorted((difficulty, item) for item, difficulty in difficulties.items())
+        self._difficulties = [difficulty for difficulty, _ in ordered]
+        self._items = [item for _, item in ordered]
+        self.asked: Set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def next_item(self, ability: float) -> Optional[int]:
+        """Ítem sin preguntar con la dificultad más próxima (búsqueda binaria y expansión a ambos lados)"""
+        right = bisect.bisect_left(self._difficulties, ability)
+        left = right - 1
+        while left >= 0 or right < len(self._items):
+            use_right = left < 0 or (right < len(self._items) and
+                                     self._difficulties[right] - ability <= ability - self._difficulties[left])
+            index = right if use_right else left
+            if use_right:
+                right += 1
+            else:
+                left -= 1
+            item = self._items[index]
+            if item not in self.asked:
+                self.asked.add(item)
+                return item
+        return None
+
+    def mastery(self, ability: float) -> float:
+        """Porcentaje esperado de aciertos sobre todo el banco con la habilidad dada"""
+        if not self._difficulties:
+            return 0.0
+        return float(np.mean(probability_correct(ability, np.array(self._difficulties))))
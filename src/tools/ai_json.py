@@ -0,0 +1,225 @@
+import re
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+# Campos obligatorios de cada tipo de elemento que devuelve la IA (todos texto salvo Options)
+SCHEMAS: Dict[str, tuple] = {
+    "flashcard": ("Q", "A"),
+    "multiple_choice": ("Q", "Options", "Answer"),
+    "true_false": ("Q", "Answer"),
+    "fill_blank": ("Q", "Answer"),
+    "open": ("Q", "Answer"),
+}
+# Campos opcionales que se conservan si vienen como texto
+OPTIONAL_FIELDS = ("Explanation",)
+
+_TRUE_ANSWERS = {"verdadero", "v", "true", "cierto", "sí", "si"}
+_FALSE_ANSWERS = {"falso", "f", "false", "no"}
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+
+
+class JsonArrayStream:
+    """Extrae los objetos JSON completos de una respuesta que llega por partes.
+
+    Ignora el texto antes del arreglo (prosa, ```json) y después de cerrarlo, y
+    entrega cada objeto apenas se cierra su llave: si la respuesta se corta,
+    los objetos anteriores ya están disponibles. Solo se toma como arreglo de
+    elementos un "[" seguido de "{" (la prosa puede tener corchetes), y si la
+    respuesta viene envuelta en un objeto ({"preguntas": [...]}) se usan los
+    elementos de su primer arreglo de objetos.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        # Profundidad de los elementos: 1 en un arreglo, 2 en el arreglo de un objeto envoltorio,
+        # 0 en un objeto suelto y None mientras se busca dónde empieza el JSON
+        self._item_depth: Optional[int] = None
+        self._start = -1
+        self._found = 0            # objetos no vacíos entregados del arreglo actual
+        self._in_string = False
+        self._escape = False
+        self.finished = False
+
+    @staticmethod
+    def _opens_objects(buffer: str, i: int) -> Optional[bool]:
+        """Si el "[" en la posición i abre un arreglo de objetos (None: aún no se sabe)"""
+        for char in buffer[i + 1:]:
+            if not char.isspace():
+                return char == "{"
+        return None
+
+    def feed(self, chunk: str) -> List[Any]:
+        """Agrega texto y devuelve los objetos completados con él"""
+        if self.finished:
+            return []
+        self._buffer += chunk
+        objects = []
+        buffer = self._buffer
+        i = self._pos
+        while i < len(buffer):
+            char = buffer[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif self._item_depth is None:
+                # Antes del JSON: se espera un arreglo de objetos (o un objeto suelto)
+                if char == "[":
+                    opens = self._opens_objects(buffer, i)
+                    if opens is None:
+                        break
+                    if opens:
+                        self._item_depth, self._depth, self._found = 1, 1, 0
+                elif char == "{":
+                    self._item_depth, self._depth, self._start = 0, 1, i
+            elif char == '"':
+                self._in_string = True
+            elif char == "[" and self._item_depth == 0 and self._depth == 1:
+                # Arreglo dentro de un objeto suelto: si es de objetos, el objeto es un envoltorio
+                opens = self._opens_objects(buffer, i)
+                if opens is None:
+                    break
+                if opens:
+                    self._item_depth, self._found, self._start = 2, 0, -1
+                self._depth += 1
+            elif char in "[{":
+                if char == "{" and self._depth == self._item_depth:
+                    self._start = i
+                self._depth += 1
+            elif char in "]}":
+                self._depth -= 1
+                if char == "}" and self._depth == self._item_depth and self._start >= 0:
+                    parsed = _loads_lenient(buffer[self._start:i + 1])
+                    if parsed is not None:
+                        objects.append(parsed)
+                        self._found += 1 if parsed else 0
+                    self._start = -1
+                if self._item_depth == 0 and self._depth <= 0:
+                    # Terminó el objeto suelto: se sigue buscando
+                    self._item_depth, self._depth, self._start = None, 0, -1
+                elif self._item_depth and self._depth < self._item_depth:
+                    if self._found:
+                        # Se cerró el arreglo: lo que sigue es texto suelto
+                        self.finished = True
+                        break
+                    # Arreglo sin ningún objeto válido: se sigue buscando (el envoltorio, hasta su cierre)
+                    self._item_depth = 0 if self._item_depth == 2 else None
+                    self._depth = max(self._depth, 0)
+            i += 1
+
+        # Descartar lo ya consumido que no forma parte de un objeto abierto
+        keep_from = self._start if self._start >= 0 else i
+        self._buffer = buffer[keep_from:]
+        self._pos = i - keep_from
+        if self._start >= 0:
+            self._start = 0
+        return objects
+
+
+def _loads_lenient(text: str) -> Optional[Any]:
+    """json.loads tolerando comas finales, un error típico de los modelos"""
+    try:
+        return json.loads(text)
+    except ValueError:
+        try:
+            return json.loads(_TRAILING_COMMA_RE.sub(r"\1", text))
+        except ValueError:
+            return None
+
+
+def iter_json_objects(chunks: Iterable[str]) -> Iterator[Any]:
+    """Objetos JSON de la respuesta, a medida que se completan"""
+    stream = JsonArrayStream()
+    for chunk in chunks:
+        yield from stream.feed(chunk)
+        if stream.finished:
+            break
+
+
+def validate_item(item: Any, kind: str) -> Optional[Dict[str, Any]]:
+    """Elemento normalizado según el esquema de su tipo, o None si no sirve.
+
+    Los tipos "mixed" y "topic" usan el esquema indicado en el campo "Type" de
+    cada pregunta. En opción múltiple se acepta la respuesta como texto de la
+    opción y se convierte en letra; en verdadero/falso se normaliza a
+    "Verdadero"/"Falso".
+    """
+    if not isinstance(item, dict):
+        return None
+    if kind in ("mixed", "topic"):
+        item_type = str(item.get("Type", "")).strip()
+        if item_type in SCHEMAS and item_type != "flashcard":
+            kind = item_type
+        else:
+            kind = "multiple_choice" if "Options" in item else "open"
+
+    result: Dict[str, Any] = {}
+    for field in SCHEMAS[kind]:
+        value = item.get(field)
+        if field == "Options":
+            if not isinstance(value, list) or len(value) < 2:
+                return None
+            result[field] = [str(option).strip() for option in value]
+        else:
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                value = str(value)
+            if not isinstance(value, str) or not value.strip():
+                return None
+            result[field] = value.strip()
+    for field in OPTIONAL_FIELDS:
+        if isinstance(item.get(field), str):
+            result[field] = item[field].strip()
+    if "Type" in item:
+        result["Type"] = kind
+
+    if kind == "multiple_choice":
+        answer = result["Answer"].rstrip(").:").strip()
+        options = result["Options"]
+        if len(answer) == 1 and 0 <= ord(answer.upper()) - 65 < len(options):
+            result["Answer"] = answer.upper()
+        elif answer.lower() in [option.lower() for option in options]:
+            result["Answer"] = chr(65 + [option.lower() for option in options].index(answer.lower()))
+        else:
+            return None
+    elif kind == "true_false":
+        answer = result["Answer"].lower().rstrip(".")
+        if answer in _TRUE_ANSWERS:
+            result["Answer"] = "Verdadero"
+        elif answer in _FALSE_ANSWERS:
+            result["Answer"] = "Falso"
+        else:
+            return None
+    return result
+
+
+def response_chunks(response: Any) -> Iterator[str]:
+    """Texto de una respuesta de Gemini; por partes si se pidió con stream=True"""
+    if isinstance(response, str):
+        yield response
+    elif hasattr(response, "__iter__"):
+        for chunk in response:
+            yield chunk.text
+    else:
+        yield response.text
+
+
+def parse_ai_items(chunks: Iterable[str], kind: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Elementos válidos de una respuesta de la IA; si se corta, se conserva lo recibido"""
+    items: List[Dict[str, Any]] = []
+    try:
+        for obj in iter_json_objects(chunks):
+            item = validate_item(obj, kind)
+            if item is not None:
+                items.append(item)
+                if limit is not None and len(items) >= limit:
+                    break
+    except Exception as e:
+        if not items:
+            raise
+        print(f"⚠️ Respuesta de IA interrumpida ({e}); se conservan {len(items)} elemento(s)")
+    return items
@@ -0,0 +1,106 @@
+import os
+import shutil
+import subprocess
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Formato y bitrate de las narraciones finales (configurables en el .env)
+AUDIO_FORMAT = os.getenv('STUDYBOX_AUDIO_FORMAT', 'opus').lower()
+AUDIO_BITRATE = os.getenv('STUDYBOX_AUDIO_BITRATE', '48k')
+
+# Formato -> (extensión, argumentos del códec para ffmpeg)
+# Opus usa contenedor Ogg, pero SDL_mixer solo lo reconoce con extensión .opus
+ENCODER_FORMATS: Dict[str, Tuple[str, List[str]]] = {
+    "opus": (".opus", ["-c:a", "libopus", "-application", "voip"]),
+    "mp3": (".mp3", ["-c:a", "libmp3lame"]),
+}
+
+# Un único proceso de codificación a la vez para no competir con la síntesis
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="audio-encoder")
+
+
+class AudioEncoder:
+    """Transcodifica narraciones WAV a un formato comprimido usando ffmpeg"""
+
+    def __init__(self, audio_format: Optional[str] = None, bitrate: Optional[str] = None):
+        self.audio_format = (audio_format or AUDIO_FORMAT).lower()
+        self.bitrate = bitrate or AUDIO_BITRATE
+        self.ffmpeg_path = shutil.which("ffmpeg")
+
+    def is_available(self) -> bool:
+        """Indica si hay un formato comprimido configurado y ffmpeg instalado"""
+        return self.audio_format in ENCODER_FORMATS and self.ffmpeg_path is not None
+
+    def encode(self, wav_path: str, keep_source: bool = False) -> str:
+        """Codifica el archivo en un proceso ffmpeg y devuelve la ruta resultante.
+
+        Si no se puede codificar, devuelve la ruta original sin cambios.
+        """
+        if not self.is_available() or not wav_path.lower().endswith(".wav"):
+            return wav_path
+
+        extension, codec_args = ENCODER_FORMATS[self.audio_format]
+        output_path = os.path.splitext(wav_path)[0] + extension
+        temp_path = output_path + ".part"
+
+        command = [
+            self.ffmpeg_path, "-nostdin", "-loglevel", "error", "-y",
+            "-i", wav_path,
+            *codec_args, "-b:a", self.bitrate,
+            "-f", "ogg" if extension == ".opus" else "mp3",
+            temp_path,
+        ]
+
+        try:
+            subprocess.run(command, check=True, capture_output=True, timeout=600)
+            os.replace(temp_path, output_path)
+        except (subprocess.SubprocessError, OSError) as e:
+            print(f"⚠️ No se pudo comprimir el audio ({e}), se conserva el WAV")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return wav_path
+
+        if not keep_source:
+            try:
+                os.remove(wav_path)
+            except OSError:
+                # Puede estar en uso por el reproductor; se deja el WAV
+                pass
+
+        return output_path
+
+    def decode_to_wav(self, audio_path: str) -> Optional[str]:
+        """Decodifica un audio comprimido a un WAV PCM de 16 bits junto al original.
+
+        Devuelve la ruta del WAV, o None si no hay ffmpeg o la decodificación falla.
+        """
+        if self.ffmpeg_path is None:
+            return None
+
+        wav_path = os.path.splitext(audio_path)[0] + ".wav"
+        temp_path = wav_path + ".part"
+
+        command = [
+            self.ffmpeg_path, "-nostdin", "-loglevel", "error", "-y",
+            "-i", audio_path,
+            "-c:a", "pcm_s16le", "-f", "wav",
+            temp_path,
+        ]
+
+        try:
+            subprocess.run(command, check=True, capture_output=True, timeout=600)
+            os.replace(temp_path, wav_path)
+        except (subprocess.SubprocessError, OSError) as e:
+            print(f"⚠️ No se pudo decodificar el audio ({e})")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return None
+
+        return wav_path
+
+    def encode_async(self, wav_path: str, keep_source: bool = False) -> Future:
+        """Codifica en segundo plano y devuelve un Future con la ruta resultante"""
+        return _executor.submit(self.encode, wav_path, keep_source)
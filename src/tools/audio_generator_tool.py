@@ -1,16 +1,36 @@
 import os
+import re
 import json
-import requests
+import queue
+import shutil
+import threading
+import wave
 import base64
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import google.generativeai as genai
 from dotenv import load_dotenv
+from .tts_http import get_tts_session, google_tts_request, elevenlabs_tts_request
+from .local_tts import synthesize_to_file
+from .script_markers import parse_tts_script
+from .audio_encoder import AudioEncoder
+from .audio_postprocess import measure_wav, normalize_wav, trimmed_range
+from .audio_job_queue import AudioJobQueue, AudioJobWorker, SCRIPT_JOB, SYNTHESIS_JOB
 
 # Cargar variables de entorno
 load_dotenv()
 
 class AudioGeneratorTool:
     
+    # Opción de menú -> (nombre del script, tipo de audio, método que crea el script)
+    AUDIO_SCRIPT_TYPES = {
+        "1": ("resumen_narrado", "Resumen Narrado", "_create_summary_script"),
+        "2": ("explicacion_conceptos", "Explicación de Conceptos", "_create_concepts_script"),
+        "3": ("lectura_completa", "Lectura Completa", "_create_reading_script"),
+        "4": ("preguntas_respuestas", "Preguntas y Respuestas", "_create_qa_script"),
+        "5": ("historia_educativa", "Historia Educativa", "_create_story_script"),
+        "6": ("guia_estudio", "Guía de Estudio", "_create_study_guide_script"),
+    }
+    
     def __init__(self):
         """Inicializa el generador de audio con IA"""
         try:
@@ -39,6 +59,25 @@ class AudioGeneratorTool:
             print(f"⚠️ Error configurando generador de audio: {e}")
             self.model = None
             self.ai_available = False
+        
+        # Compresión de las narraciones generadas (WAV -> Opus/MP3)
+        self.encoder = AudioEncoder()
+        
+        # Cola persistente de trabajos de audio en segundo plano
+        self.job_queue = None
+        self.job_worker = None
+        try:
+            self.job_queue = AudioJobQueue()
+            self.job_worker = AudioJobWorker(self.job_queue, self)
+            
+            # Reanudar trabajos interrumpidos en una ejecución anterior
+            self.job_queue.requeue_interrupted()
+            pending = self.job_queue.count_pending()
+            if pending:
+                print(f"🔄 Reanudando {pending} trabajo(s) de audio pendiente(s) en segundo plano...")
+                self.job_worker.ensure_running()
+        except Exception as e:
+            print(f"⚠️ Cola de trabajos de audio no disponible: {e}")
 
     def generate_audio_content(self, processed_texts: List[str]) -> None:
         """
@@ -59,6 +98,8 @@ class AudioGeneratorTool:
         print("   5. Historia o conversación")
         print("   6. Guía de estudio")
         print("   7. Generar todos")
+        print("   8. Generar en segundo plano")
+        print("   9. Ver cola de trabajos de audio")
         print("   0. Volver")
         print("-"*60)
         
@@ -67,7 +108,7 @@ class AudioGeneratorTool:
         
         while True:
             try:
-                opcion = input("\nSelecciona el tipo de audio (0-7): ").strip()
+                opcion = input("\nSelecciona el tipo de audio (0-9): ").strip()
                 
                 if opcion == "0":
                     print("👋 Regresando al menú principal...")
@@ -86,8 +127,12 @@ class AudioGeneratorTool:
                     self._generate_study_guide_audio(context)
                 elif opcion == "7":
                     self._generate_all_audio_types(context)
+                elif opcion == "8":
+                    self._enqueue_script_job(context)
+                elif opcion == "9":
+                    self._show_job_queue()
                 else:
-                    print("Opción no válida. Elige un número del 0 al 7.")
+                    print("Opción no válida. Elige un número del 0 al 9.")
                     
             except KeyboardInterrupt:
                 print("\n👋 Regresando al menú principal...")
@@ -108,6 +153,13 @@ class AudioGeneratorTool:
         """Genera script de audio para resumen narrado"""
         print("\nGenerando resumen narrado...")
         
+        script = self._create_summary_script(context)
+        
+        self._save_audio_script("resumen_narrado", script)
+        self._display_audio_instructions("Resumen Narrado", script)
+
+    def _create_summary_script(self, context: str) -> str:
+        """Crea el script de audio para resumen narrado"""
         if not self.ai_available:
             script = self._simulate_summary_script(context)
         else:
@@ -143,13 +195,19 @@ Genera el script completo:
                 print(f"Error generando resumen: {e}")
                 script = self._simulate_summary_script(context)
         
-        self._save_audio_script("resumen_narrado", script)
-        self._display_audio_instructions("Resumen Narrado", script)
+        return script
 
     def _generate_concepts_audio(self, context: str) -> None:
         """Genera script de audio para explicación de conceptos"""
         print("\nGenerando explicación de conceptos...")
         
+        script = self._create_concepts_script(context)
+        
+        self._save_audio_script("explicacion_conceptos", script)
+        self._display_audio_instructions("Explicación de Conceptos", script)
+
+    def _create_concepts_script(self, context: str) -> str:
+        """Crea el script de audio para explicación de conceptos"""
         if not self.ai_available:
             script = self._simulate_concepts_script(context)
         else:
@@ -188,13 +246,19 @@ Genera el script completo:
                 print(f"Error generando conceptos: {e}")
                 script = self._simulate_concepts_script(context)
         
-        self._save_audio_script("explicacion_conceptos", script)
-        self._display_audio_instructions("Explicación de Conceptos", script)
+        return script
 
     def _generate_full_reading_audio(self, context: str) -> None:
         """Genera script de audio para lectura completa"""
         print("\nGenerando lectura completa...")
         
+        script = self._create_reading_script(context)
+        
+        self._save_audio_script("lectura_completa", script)
+        self._display_audio_instructions("Lectura Completa", script)
+
+    def _create_reading_script(self, context: str) -> str:
+        """Crea el script de audio para lectura completa"""
         if not self.ai_available:
             script = self._simulate_reading_script(context)
         else:
@@ -230,13 +294,19 @@ Genera el script completo:
                 print(f"Error generando lectura: {e}")
                 script = self._simulate_reading_script(context)
         
-        self._save_audio_script("lectura_completa", script)
-        self._display_audio_instructions("Lectura Completa", script)
+        return script
 
     def _generate_qa_audio(self, context: str) -> None:
         """Genera script de audio de preguntas y respuestas"""
         print("\nGenerando preguntas y respuestas...")
         
+        script = self._create_qa_script(context)
+        
+        self._save_audio_script("preguntas_respuestas", script)
+        self._display_audio_instructions("Preguntas y Respuestas", script)
+
+    def _create_qa_script(self, context: str) -> str:
+        """Crea el script de audio de preguntas y respuestas"""
         if not self.ai_available:
             script = self._simulate_qa_script(context)
         else:
@@ -276,13 +346,19 @@ Genera el script completo:
                 print(f"Error generando Q&A: {e}")
                 script = self._simulate_qa_script(context)
         
-        self._save_audio_script("preguntas_respuestas", script)
-        self._display_audio_instructions("Preguntas y Respuestas", script)
+        return script
 
     def _generate_story_audio(self, context: str) -> None:
         """Genera script de audio como historia/conversación"""
         print("\nGenerando historia educativa...")
         
+        script = self._create_story_script(context)
+        
+        self._save_audio_script("historia_educativa", script)
+        self._display_audio_instructions("Historia Educativa", script)
+
+    def _create_story_script(self, context: str) -> str:
+        """Crea el script de audio como historia/conversación"""
         if not self.ai_available:
             script = self._simulate_story_script(context)
         else:
@@ -318,13 +394,19 @@ Genera el script completo:
                 print(f"Error generando historia: {e}")
                 script = self._simulate_story_script(context)
         
-        self._save_audio_script("historia_educativa", script)
-        self._display_audio_instructions("Historia Educativa", script)
+        return script
 
     def _generate_study_guide_audio(self, context: str) -> None:
         """Genera script de audio de guía de estudio"""
         print("\nGenerando guía de estudio...")
         
+        script = self._create_study_guide_script(context)
+        
+        self._save_audio_script("guia_estudio", script)
+        self._display_audio_instructions("Guía de Estudio", script)
+
+    def _create_study_guide_script(self, context: str) -> str:
+        """Crea el script de audio de guía de estudio"""
         if not self.ai_available:
             script = self._simulate_study_guide_script(context)
         else:
@@ -365,8 +447,7 @@ Genera el script completo:
                 print(f"Error generando guía: {e}")
                 script = self._simulate_study_guide_script(context)
         
-        self._save_audio_script("guia_estudio", script)
-        self._display_audio_instructions("Guía de Estudio", script)
+        return script
 
     def _generate_all_audio_types(self, context: str) -> None:
         """Genera todos los tipos de audio"""
@@ -391,7 +472,71 @@ Genera el script completo:
         
         print("\nListo. Todos los audios generados.")
 
-    def _save_audio_script(self, filename: str, script: str) -> None:
+    def create_script(self, script_name: str, context: str) -> str:
+        """Crea el script de un tipo de audio a partir de su nombre (p. ej. 'resumen_narrado')"""
+        for name, _, creator in self.AUDIO_SCRIPT_TYPES.values():
+            if name == script_name:
+                return getattr(self, creator)(context)
+        raise ValueError(f"Tipo de audio desconocido: {script_name}")
+
+    def _enqueue_script_job(self, context: str) -> None:
+        """Encola la creación y síntesis de un audio para procesarlo en segundo plano"""
+        if not self.job_queue:
+            print("❌ La cola de trabajos de audio no está disponible.")
+            return
+        
+        print("\n¿Qué tipo de audio quieres generar en segundo plano?")
+        for key, (_, audio_type, _) in self.AUDIO_SCRIPT_TYPES.items():
+            print(f"   {key}. {audio_type}")
+        
+        opcion = input("\nSelecciona el tipo (1-6): ").strip()
+        if opcion not in self.AUDIO_SCRIPT_TYPES:
+            print("❌ Opción no válida.")
+            return
+        
+        script_name, audio_type, _ = self.AUDIO_SCRIPT_TYPES[opcion]
+        job_id = self.job_queue.enqueue(SCRIPT_JOB, audio_type, script_name, {"context": context})
+        self.job_worker.ensure_running()
+        print(f"📥 Trabajo #{job_id} ({audio_type}) en cola. Puedes seguir usando el menú.")
+
+    def _enqueue_synthesis_job(self, script: str, audio_type: str) -> None:
+        """Encola la síntesis de un script ya generado"""
+        if not self.job_queue:
+            print("❌ La cola de trabajos de audio no está disponible.")
+            return
+        
+        script_name = audio_type.lower().replace(' ', '_')
+        job_id = self.job_queue.enqueue(SYNTHESIS_JOB, audio_type, script_name, {"script": script})
+        self.job_worker.ensure_running()
+        print(f"📥 Trabajo #{job_id} en cola. El audio se generará en segundo plano.")
+
+    def _show_job_queue(self) -> None:
+        """Muestra el estado de los trabajos de audio recientes"""
+        if not self.job_queue:
+            print("❌ La cola de trabajos de audio no está disponible.")
+            return
+        
+        jobs = self.job_queue.list_jobs()
+        if not jobs:
+            print("📭 No hay trabajos de audio.")
+            return
+        
+        print("\nTrabajos de audio recientes:")
+        print("-" * 50)
+        for job in jobs:
+            progress = ""
+            if job["total_chunks"]:
+                progress = f" [{job['done_chunks']}/{job['total_chunks']} partes]"
+            print(f"#{job['id']:3d} {job['audio_type']} ({job['kind']}): {job['status']}{progress}")
+            if job["output_path"]:
+                print(f"      📁 {job['output_path']}")
+            if job["error"]:
+                print(f"      ⚠️ {job['error']}")
+        
+        if self.job_worker and self.job_worker.is_running():
+            print("\n⚙️ El procesador de trabajos está activo.")
+
+    def _save_audio_script(self, filename: str, script: str) -> Optional[str]:
         """Guarda el script de audio en un archivo"""
         try:
             # Crear directorio de scripts si no existe
@@ -404,8 +549,10 @@ Genera el script completo:
                 f.write(script)
             
             print(f"💾 Script guardado en: {filepath}")
+            return filepath
         except Exception as e:
             print(f"❌ Error guardando script: {e}")
+            return None
 
     def _display_audio_instructions(self, audio_type: str, script: str) -> None:
         """Muestra instrucciones y opciones para generar audio"""
@@ -421,10 +568,12 @@ Genera el script completo:
         print("2. Generar audio con ElevenLabs (requiere API)")
         print("3. Usar servicios online")
         print("4. Solo guardar el script")
+        print("5. Narrar en streaming (reproduce mientras se genera)")
+        print("6. Generar audio en segundo plano")
         
         while True:
             try:
-                opcion = input("\nSelecciona una opción (1-4): ").strip()
+                opcion = input("\nSelecciona una opción (1-6): ").strip()
                 
                 if opcion == "1":
                     self._generate_google_tts_audio(script, audio_type)
@@ -438,8 +587,14 @@ Genera el script completo:
                 elif opcion == "4":
                     print("Script guardado. Puedes convertirlo a audio más tarde.")
                     break
+                elif opcion == "5":
+                    self._generate_streaming_tts_audio(script, audio_type)
+                    break
+                elif opcion == "6":
+                    self._enqueue_synthesis_job(script, audio_type)
+                    break
                 else:
-                    print("❌ Opción no válida. Selecciona 1-4.")
+                    print("❌ Opción no válida. Selecciona 1-6.")
             except KeyboardInterrupt:
                 print("\n👋 Regresando...")
                 break
@@ -452,20 +607,16 @@ Genera el script completo:
             # Limpiar script para TTS
             clean_script = self._clean_script_for_tts(script)
             
-            # Usar Google TTS API
-            audio_data = self._call_google_tts(clean_script)
+            # Sintetizar directamente al archivo (WAV local o MP3 de Google TTS)
+            base_path = self._get_audio_path(f"{audio_type.lower().replace(' ', '_')}_local_tts")
+            audio_path = self._call_google_tts(clean_script, base_path) if base_path else None
             
-            if audio_data:
-                # Guardar archivo de audio
-                filename = f"{audio_type.lower().replace(' ', '_')}_local_tts.wav"
-                audio_path = self._save_audio_file(filename, audio_data)
-                
-                if audio_path:
-                    print(f"✅ Audio generado exitosamente: {audio_path}")
-                    print(f"📁 Ubicación: {os.path.abspath(audio_path)}")
-                    self._play_audio_instructions(audio_path)
-                else:
-                    print("❌ Error guardando archivo de audio")
+            if audio_path:
+                # Ajustar nivel y comprimir la narración antes de reproducirla
+                audio_path = self._finalize_narration(audio_path)
+                print(f"✅ Audio generado exitosamente: {audio_path}")
+                print(f"📁 Ubicación: {os.path.abspath(audio_path)}")
+                self._play_audio_instructions(audio_path)
             else:
                 print("❌ Error generando audio con Google TTS")
                 self._show_manual_tts_instructions(clean_script)
@@ -491,205 +642,316 @@ Genera el script completo:
             # Limpiar script para TTS
             clean_script = self._clean_script_for_tts(script)
             
-            # Usar ElevenLabs API
-            audio_data = self._call_elevenlabs_tts(clean_script, api_key)
+            # Usar ElevenLabs API, escribiendo la respuesta directamente a disco
+            filename = f"{audio_type.lower().replace(' ', '_')}_elevenlabs.mp3"
+            audio_path = self._get_audio_path(filename)
             
-            if audio_data:
-                # Guardar archivo de audio
-                filename = f"{audio_type.lower().replace(' ', '_')}_elevenlabs.mp3"
-                audio_path = self._save_audio_file(filename, audio_data)
-                
-                if audio_path:
-                    print(f"✅ Audio generado exitosamente: {audio_path}")
-                    print(f"📁 Ubicación: {os.path.abspath(audio_path)}")
-                    self._play_audio_instructions(audio_path)
-                else:
-                    print("❌ Error guardando archivo de audio")
+            if audio_path and self._download_elevenlabs_tts(clean_script, api_key, audio_path):
+                # Ajustar nivel igual que las narraciones locales
+                audio_path = self._finalize_narration(audio_path)
+                print(f"✅ Audio generado exitosamente: {audio_path}")
+                print(f"📁 Ubicación: {os.path.abspath(audio_path)}")
+                self._play_audio_instructions(audio_path)
             else:
                 print("❌ Error generando audio con ElevenLabs")
                 
         except Exception as e:
             print(f"❌ Error en ElevenLabs: {e}")
 
-    def _clean_script_for_tts(self, script: str) -> str:
-        """Limpia el script para optimizar la conversión a audio"""
-        # Remover marcadores de formato
-        clean_script = script.replace('[INTRODUCCIÓN]', '')
-        clean_script = clean_script.replace('[CONTENIDO PRINCIPAL]', '')
-        clean_script = clean_script.replace('[CONCLUSIÓN]', '')
-        clean_script = clean_script.replace('[PAUSA]', '. ')
-        clean_script = clean_script.replace('[ESCENA 1]', '')
-        clean_script = clean_script.replace('[ESCENA 2]', '')
-        clean_script = clean_script.replace('[PASO 1]', 'Primero,')
-        clean_script = clean_script.replace('[PASO 2]', 'Segundo,')
-        clean_script = clean_script.replace('[PASO 3]', 'Tercero,')
-        
-        # Limpiar espacios extra
-        clean_script = ' '.join(clean_script.split())
+    def _generate_streaming_tts_audio(self, script: str, audio_type: str) -> None:
+        """Sintetiza el script por partes y las reproduce en cuanto están listas"""
+        print("\n🎤 Narración en streaming con TTS local...")
         
-        # Limitar longitud para APIs
-        if len(clean_script) > 4000:
-            clean_script = clean_script[:4000] + "..."
+        chunks = self._plan_tts_chunks(script)
+        if not chunks:
+            print("❌ El script está vacío.")
+            return
+        
+        base_name = f"{audio_type.lower().replace(' ', '_')}_local_tts"
+        parts_dir = self._get_audio_path(f"{base_name}_partes")
+        if not parts_dir:
+            return
+        os.makedirs(parts_dir, exist_ok=True)
         
-        return clean_script
-
-    def _call_google_tts(self, text: str) -> Optional[bytes]:
-        """Genera audio MP3 directamente usando pyttsx3"""
         try:
-            # Usar pyttsx3 - librería local que no requiere internet
-            import pyttsx3
-            import tempfile
-            import os
-            
-            # Configurar motor TTS
-            engine = pyttsx3.init()
-            
-            # Configurar propiedades de voz
-            voices = engine.getProperty('voices')
-            for voice in voices:
-                if 'spanish' in voice.name.lower() or 'es' in voice.id.lower():
-                    engine.setProperty('voice', voice.id)
-                    break
-            
-            # Configurar velocidad y volumen
-            engine.setProperty('rate', 150)  # Velocidad de habla
-            engine.setProperty('volume', 0.9)  # Volumen
-            
-            # Crear archivo temporal
-            with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_file:
-                temp_path = temp_file.name
-            
-            # Generar audio
-            engine.save_to_file(text, temp_path)
-            engine.runAndWait()
-            
-            # Leer archivo generado
-            with open(temp_path, 'rb') as f:
-                audio_data = f.read()
-            
-            # Limpiar archivo temporal
-            os.unlink(temp_path)
+            from .audio_player_tool import AudioPlayerTool
+            player = AudioPlayerTool()
+        except Exception as e:
+            print(f"❌ Error abriendo reproductor: {e}")
+            return
+        
+        # Consumidor: el reproductor toma las partes de la cola en otro hilo
+        chunk_queue: "queue.Queue[Optional[str]]" = queue.Queue()
+        consumer = threading.Thread(
+            target=player.play_audio_stream, args=(chunk_queue, len(chunks)), daemon=True
+        )
+        consumer.start()
+        
+        # Productor: cada parte se sintetiza en el hilo de síntesis compartido con la cola
+        part_paths: List[str] = []
+        silences_ms: List[int] = []
+        try:
+            for i, (chunk, pause_ms) in enumerate(chunks):
+                part_path = self._synthesize_chunk_to_file(chunk, os.path.join(parts_dir, f"parte_{i:03d}"))
+                if not part_path:
+                    print(f"\n⚠️ No se pudo sintetizar la parte {i + 1}")
+                    continue
+                part_paths.append(part_path)
+                silences_ms.append(pause_ms)
+                chunk_queue.put(part_path)
+        except KeyboardInterrupt:
+            print("\n⏹️ Síntesis interrumpida")
+            player.stop_audio()
+        finally:
+            chunk_queue.put(None)
+        
+        consumer.join()
+        
+        if not part_paths:
+            print("❌ Error generando audio en streaming")
+            self._show_manual_tts_instructions(" ".join(text for text, _ in chunks))
+            return
+        
+        # Unir las partes en un único archivo reutilizable
+        audio_path = self._get_audio_path(f"{base_name}.wav")
+        if audio_path and self._merge_wav_parts(part_paths, audio_path, silences_ms):
+            shutil.rmtree(parts_dir, ignore_errors=True)
+            self._normalize_narration(audio_path)
+            print(f"✅ Audio completo guardado: {audio_path}")
             
-            return audio_data
-                
-        except ImportError:
-            print("⚠️ pyttsx3 no está instalado. Instalando...")
+            # La reproducción ya terminó: se comprime en segundo plano
+            if self.encoder.is_available():
+                future = self.encoder.encode_async(audio_path)
+                future.add_done_callback(
+                    lambda f: print(f"\n🗜️ Audio comprimido: {os.path.basename(f.result())}")
+                )
+        else:
+            print(f"📁 Partes de audio guardadas en: {parts_dir}")
+
+    def _finalize_narration(self, audio_path: str) -> str:
+        """Normaliza y comprime una narración terminada; devuelve la ruta final"""
+        if not audio_path.lower().endswith('.wav'):
+            return self._finalize_compressed_narration(audio_path)
+        self._normalize_narration(audio_path)
+        return self._encode_narration(audio_path)
+
+    def _finalize_compressed_narration(self, audio_path: str) -> str:
+        """Normaliza una narración MP3 (Google TTS por partes, ElevenLabs) pasando por un WAV temporal.
+
+        Si el nivel ya es correcto se conserva el archivo original sin recomprimirlo.
+        """
+        wav_path = self.encoder.decode_to_wav(audio_path)
+        if not wav_path:
+            return audio_path
+        
+        if not self._normalize_narration(wav_path):
+            os.remove(wav_path)
+            return audio_path
+        
+        final_path = self._encode_narration(wav_path)
+        if final_path != audio_path:
             try:
-                import subprocess
-                subprocess.check_call(['py', '-m', 'pip', 'install', 'pyttsx3'])
-                print("✅ pyttsx3 instalado. Reintentando...")
-                return self._call_google_tts(text)
-            except Exception as install_error:
-                print(f"❌ Error instalando pyttsx3: {install_error}")
-                return self._fallback_google_tts(text)
-        except Exception as e:
-            print(f"❌ Error con pyttsx3: {e}")
-            return self._fallback_google_tts(text)
+                os.remove(audio_path)
+            except OSError:
+                pass
+        return final_path
+
+    def _normalize_narration(self, wav_path: str) -> bool:
+        """Recorta el silencio de los extremos y lleva la narración al nivel objetivo.
 
-    def _fallback_google_tts(self, text: str) -> Optional[bytes]:
-        """Método alternativo usando requests directo"""
+        Devuelve True si el archivo se reescribió.
+        """
         try:
-            # Dividir texto en chunks si es muy largo
-            if len(text) > 200:
-                chunks = [text[i:i+200] for i in range(0, len(text), 200)]
-                audio_data = b''
-                
-                for chunk in chunks:
-                    chunk_audio = self._get_single_chunk_audio(chunk)
-                    if chunk_audio:
-                        audio_data += chunk_audio
-                
-                return audio_data if audio_data else None
+            return normalize_wav(wav_path)
+        except (OSError, wave.Error, EOFError) as e:
+            print(f"⚠️ No se pudo normalizar el audio: {e}")
+            return False
+
+    def _encode_narration(self, wav_path: str) -> str:
+        """Comprime una narración WAV terminada y devuelve la ruta del archivo final"""
+        if not self.encoder.is_available():
+            return wav_path
+        
+        print(f"🗜️ Comprimiendo audio ({self.encoder.audio_format}, {self.encoder.bitrate})...")
+        return self.encoder.encode(wav_path)
+
+    def _plan_tts_chunks(self, script: str) -> List[Tuple[str, int]]:
+        """Divide el script en partes para sintetizar, con el silencio (ms) que sigue a cada una.
+
+        Las pausas del script ([PAUSA], cambios de sección) siempre cortan una parte,
+        de modo que el silencio real se inserta al unir el audio.
+        """
+        tts_script = parse_tts_script(script)
+        text = tts_script.text
+        
+        chunks: List[Tuple[str, int]] = []
+        start = 0
+        boundaries = [(p.position, p.duration_ms) for p in tts_script.pauses] + [(len(text), 0)]
+        for position, pause_ms in boundaries:
+            segment = text[start:position].strip()
+            start = position
+            if not segment:
+                continue
+            
+            # Solo la primera parte del script se acorta para empezar antes
+            first_chars = 150 if not chunks else 400
+            pieces = self._split_for_tts(segment, first_chunk_chars=first_chars)
+            chunks.extend((piece, 0) for piece in pieces[:-1])
+            chunks.append((pieces[-1], pause_ms))
+        
+        return chunks
+
+    def _split_for_tts(self, text: str, max_chars: int = 400, first_chunk_chars: int = 150) -> List[str]:
+        """Divide el texto en partes por oraciones para sintetizarlas por separado.
+
+        La primera parte es más corta para que el audio empiece cuanto antes.
+        """
+        sentences = [s.strip() for s in re.split(r'(?<=[.!?;:])\s+', text) if s.strip()]
+        
+        chunks: List[str] = []
+        current = ""
+        for sentence in sentences:
+            limit = first_chunk_chars if not chunks else max_chars
+            if current and len(current) + len(sentence) + 1 > limit:
+                chunks.append(current)
+                current = sentence
             else:
-                return self._get_single_chunk_audio(text)
-                
+                current = f"{current} {sentence}".strip()
+        
+        if current:
+            chunks.append(current)
+        
+        return chunks
+
+    def _synthesize_chunk_to_file(self, text: str, base_path: str) -> Optional[str]:
+        """Sintetiza una parte del texto y devuelve la ruta del archivo generado"""
+        try:
+            path = f"{base_path}.wav"
+            if synthesize_to_file(text, path):
+                return path
         except Exception as e:
-            print(f"❌ Error en fallback TTS: {e}")
-            return None
+            print(f"⚠️ TTS local no disponible ({e}), usando Google TTS...")
+        
+        # Alternativa en línea (MP3), descargada directamente a disco
+        path = f"{base_path}.mp3"
+        if self._fallback_google_tts(text, path):
+            return path
+        
+        return None
+
+    def _merge_wav_parts(self, part_paths: List[str], dest_path: str, silences_ms: Optional[List[int]] = None) -> bool:
+        """Une varias partes WAV con el mismo formato en un solo archivo.
 
-    def _get_single_chunk_audio(self, text: str) -> Optional[bytes]:
-        """Obtiene audio para un chunk de texto"""
+        silences_ms indica cuántos milisegundos de silencio insertar tras cada parte.
+        El silencio propio de cada parte se recorta para que las pausas dependan
+        solo del script.
+        """
+        if not part_paths or not all(p.endswith('.wav') for p in part_paths):
+            return False
+        
         try:
-            import urllib.parse
-            
-            # URL de Google TTS
-            url = "https://translate.google.com/translate_tts"
+            with wave.open(part_paths[0], 'rb') as first:
+                params = first.getparams()
             
-            params = {
-                'ie': 'UTF-8',
-                'q': text,
-                'tl': 'es',
-                'client': 'tw-ob',
-                'idx': '0',
-                'total': '1'
-            }
-            
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                'Referer': 'https://translate.google.com/',
-                'Accept': 'audio/mpeg,audio/*,*/*;q=0.9'
-            }
-            
-            response = requests.get(url, params=params, headers=headers, timeout=10)
+            with wave.open(dest_path, 'wb') as out:
+                out.setparams(params)
+                frame_size = params.nchannels * params.sampwidth
+                for i, part in enumerate(part_paths):
+                    with wave.open(part, 'rb') as w:
+                        if w.getparams()[:3] != params[:3]:
+                            raise ValueError(f"formato distinto en {os.path.basename(part)}")
+                        
+                        levels = measure_wav(part)
+                        keep = trimmed_range(levels, params.framerate) if levels else range(w.getnframes())
+                        w.setpos(keep.start)
+                        out.writeframes(w.readframes(len(keep)))
+                    
+                    silence_ms = silences_ms[i] if silences_ms and i < len(silences_ms) else 0
+                    if silence_ms and i < len(part_paths) - 1:
+                        silence_frames = params.framerate * silence_ms // 1000
+                        # PCM de 8 bits es sin signo: su silencio es 0x80
+                        fill = b'\x80' if params.sampwidth == 1 else b'\x00'
+                        out.writeframes(fill * (silence_frames * frame_size))
             
-            if response.status_code == 200 and response.content:
-                return response.content
-            else:
-                print(f"❌ Error en Google TTS: {response.status_code}")
-                return None
-                
+            return True
         except Exception as e:
-            print(f"❌ Error obteniendo audio: {e}")
-            return None
+            print(f"⚠️ No se pudieron unir las partes de audio: {e}")
+            if os.path.exists(dest_path):
+                os.remove(dest_path)
+            return False
 
-    def _call_elevenlabs_tts(self, text: str, api_key: str) -> Optional[bytes]:
-        """Llama a ElevenLabs Text-to-Speech API"""
+    def _clean_script_for_tts(self, script: str, max_length: Optional[int] = 4000) -> str:
+        """Limpia el script para optimizar la conversión a audio"""
+        # Reescribir marcadores y espacios en una sola pasada
+        clean_script = parse_tts_script(script).text
+        
+        # Limitar longitud para APIs
+        if max_length and len(clean_script) > max_length:
+            clean_script = clean_script[:max_length] + "..."
+        
+        return clean_script
+
+    def _call_google_tts(self, text: str, base_path: str) -> Optional[str]:
+        """Genera el audio con pyttsx3 (o Google TTS si falla) y devuelve la ruta del archivo"""
+        # Si pyttsx3 no está instalado, la síntesis local lo informa y se usa Google TTS
+        return self._synthesize_chunk_to_file(text, base_path)
+
+    def _fallback_google_tts(self, text: str, dest_path: str) -> bool:
+        """Método alternativo: descarga el audio de Google TTS por partes directamente al archivo"""
+        # Dividir texto en chunks: el servicio solo acepta textos cortos
+        chunks = [text[i:i+200] for i in range(0, len(text), 200)]
+        session = get_tts_session()
+        written = 0
+        
         try:
-            url = "https://api.elevenlabs.io/v1/text-to-speech/21m00Tcm4TlvDq8ikWAM"
-            
-            headers = {
-                'Accept': 'audio/mpeg',
-                'Content-Type': 'application/json',
-                'xi-api-key': api_key
-            }
+            with open(dest_path, 'wb') as f:
+                for chunk in chunks:
+                    try:
+                        url, request_kwargs = google_tts_request(chunk)
+                        # Sesión compartida: los chunks reutilizan la misma conexión
+                        written += session.write_response("GET", url, f, **request_kwargs) or 0
+                    except Exception as e:
+                        print(f"❌ Error obteniendo audio: {e}")
+        except Exception as e:
+            print(f"❌ Error en fallback TTS: {e}")
+        
+        if written:
+            return True
+        
+        # No dejar archivos vacíos
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+        return False
+
+    def _download_elevenlabs_tts(self, text: str, api_key: str, dest_path: str) -> bool:
+        """Descarga el audio de ElevenLabs por bloques directamente al archivo destino"""
+        try:
+            url, request_kwargs = elevenlabs_tts_request(text, api_key)
+            written = get_tts_session().download_to_file("POST", url, dest_path, **request_kwargs)
             
-            data = {
-                'text': text,
-                'model_id': 'eleven_monolingual_v1',
-                'voice_settings': {
-                    'stability': 0.5,
-                    'similarity_boost': 0.5
-                }
-            }
+            if written:
+                return True
             
-            response = requests.post(url, json=data, headers=headers)
+            # No dejar archivos vacíos o incompletos
+            if os.path.exists(dest_path):
+                os.remove(dest_path)
+            return False
             
-            if response.status_code == 200:
-                return response.content
-            else:
-                print(f"❌ Error en ElevenLabs: {response.status_code}")
-                return None
-                
         except Exception as e:
             print(f"❌ Error llamando ElevenLabs: {e}")
-            return None
+            if os.path.exists(dest_path):
+                os.remove(dest_path)
+            return False
 
-    def _save_audio_file(self, filename: str, audio_data: bytes) -> Optional[str]:
-        """Guarda el archivo de audio"""
+    def _get_audio_path(self, filename: str) -> Optional[str]:
+        """Devuelve la ruta destino de un audio generado, creando el directorio"""
         try:
             # Crear directorio de audios si no existe
             audio_dir = os.path.join(os.path.dirname(__file__), "..", "storage", "generated_audio")
             os.makedirs(audio_dir, exist_ok=True)
-            
-            # Guardar archivo
-            filepath = os.path.join(audio_dir, filename)
-            with open(filepath, 'wb') as f:
-                f.write(audio_data)
-            
-            return filepath
-            
+            return os.path.join(audio_dir, filename)
         except Exception as e:
-            print(f"❌ Error guardando audio: {e}")
+            print(f"❌ Error preparando directorio de audio: {e}")
             return None
 
     def _play_audio_instructions(self, audio_path: str) -> None:
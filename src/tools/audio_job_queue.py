@@ -0,0 +1,274 @@
+import os
+import json
+import shutil
+import sqlite3
+import threading
+import datetime
+from typing import List, Dict, Any, Optional, Tuple
+
+# Estados de un trabajo
+PENDING = "pendiente"
+RUNNING = "en_proceso"
+DONE = "completado"
+FAILED = "fallido"
+
+# Tipos de trabajo
+SCRIPT_JOB = "script"
+SYNTHESIS_JOB = "sintesis"
+
+
+class AudioJobQueue:
+    """Cola persistente (SQLite) de trabajos de generación de audio"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        if db_path is None:
+            storage_dir = os.path.join(os.path.dirname(__file__), "..", "storage")
+            os.makedirs(storage_dir, exist_ok=True)
+            db_path = os.path.join(storage_dir, "audio_jobs.db")
+
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Conexión corta por operación: la cola se usa desde varios hilos
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_db(self) -> None:
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT NOT NULL,
+                    audio_type TEXT NOT NULL,
+                    script_name TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    output_path TEXT,
+                    error TEXT,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, id);
+
+                CREATE TABLE IF NOT EXISTS job_chunks (
+                    job_id INTEGER NOT NULL,
+                    idx INTEGER NOT NULL,
+                    text TEXT NOT NULL,
+                    path TEXT,
+                    done INTEGER NOT NULL DEFAULT 0,
+                    pause_ms INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (job_id, idx)
+                );
+            """)
+            
+            # Bases de datos creadas antes de registrar las pausas
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(job_chunks)")]
+            if "pause_ms" not in columns:
+                conn.execute("ALTER TABLE job_chunks ADD COLUMN pause_ms INTEGER NOT NULL DEFAULT 0")
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.datetime.now().isoformat(timespec="seconds")
+
+    def enqueue(self, kind: str, audio_type: str, script_name: str, payload: Dict[str, Any]) -> int:
+        """Agrega un trabajo pendiente y devuelve su id"""
+        with self._lock, self._connect() as conn:
+            return self._insert_job(conn, kind, audio_type, script_name, payload)
+
+    def _insert_job(self, conn: sqlite3.Connection, kind: str, audio_type: str, script_name: str,
+                    payload: Dict[str, Any]) -> int:
+        now = self._now()
+        cursor = conn.execute(
+            "INSERT INTO jobs (kind, audio_type, script_name, payload, status, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (kind, audio_type, script_name, json.dumps(payload, ensure_ascii=False), PENDING, now, now)
+        )
+        return cursor.lastrowid
+
+    def claim_next(self) -> Optional[Dict[str, Any]]:
+        """Marca como en proceso el trabajo pendiente más antiguo y lo devuelve"""
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY id LIMIT 1", (PENDING,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ?",
+                (RUNNING, self._now(), row["id"])
+            )
+
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        return job
+
+    def mark_done(self, job_id: int, output_path: Optional[str]) -> None:
+        self._set_status(job_id, DONE, output_path=output_path)
+
+    def mark_done_and_enqueue(self, job_id: int, output_path: Optional[str], kind: str, audio_type: str,
+                              script_name: str, payload: Dict[str, Any]) -> int:
+        """Completa un trabajo y encola el siguiente en la misma transacción; devuelve el id del nuevo.
+
+        Así un cierre entre ambos pasos no hace que el trabajo se repita y encole un duplicado.
+        """
+        with self._lock, self._connect() as conn:
+            new_id = self._insert_job(conn, kind, audio_type, script_name, payload)
+            conn.execute(
+                "UPDATE jobs SET status = ?, output_path = COALESCE(?, output_path), error = NULL, updated_at = ? "
+                "WHERE id = ?",
+                (DONE, output_path, self._now(), job_id)
+            )
+            return new_id
+
+    def mark_failed(self, job_id: int, error: str) -> None:
+        self._set_status(job_id, FAILED, error=error)
+
+    def _set_status(self, job_id: int, status: str, output_path: Optional[str] = None, error: Optional[str] = None) -> None:
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, output_path = COALESCE(?, output_path), error = ?, updated_at = ? "
+                "WHERE id = ?",
+                (status, output_path, error, self._now(), job_id)
+            )
+
+    def requeue_interrupted(self) -> int:
+        """Devuelve a pendiente los trabajos que quedaron a medias (p. ej. tras un cierre)"""
+        with self._lock, self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE status = ?",
+                (PENDING, self._now(), RUNNING)
+            )
+            return cursor.rowcount
+
+    def count_pending(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (PENDING,)).fetchone()[0]
+
+    def list_jobs(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Lista los trabajos más recientes con su progreso de síntesis"""
+        with self._connect() as conn:
+            rows = conn.execute("""
+                SELECT j.id, j.kind, j.audio_type, j.status, j.output_path, j.error, j.updated_at,
+                       COUNT(c.idx) AS total_chunks, COALESCE(SUM(c.done), 0) AS done_chunks
+                FROM jobs j LEFT JOIN job_chunks c ON c.job_id = j.id
+                GROUP BY j.id ORDER BY j.id DESC LIMIT ?
+            """, (limit,)).fetchall()
+        return [dict(row) for row in rows]
+
+    # Checkpoints de síntesis por partes
+    def add_chunks(self, job_id: int, chunks: List[Tuple[str, int]]) -> None:
+        """Registra las partes (texto, silencio posterior en ms) de un trabajo de síntesis (idempotente)"""
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO job_chunks (job_id, idx, text, pause_ms) VALUES (?, ?, ?, ?)",
+                [(job_id, i, text, pause_ms) for i, (text, pause_ms) in enumerate(chunks)]
+            )
+
+    def get_chunks(self, job_id: int) -> List[Dict[str, Any]]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT idx, text, path, done, pause_ms FROM job_chunks WHERE job_id = ? ORDER BY idx", (job_id,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def complete_chunk(self, job_id: int, idx: int, path: str) -> None:
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "UPDATE job_chunks SET path = ?, done = 1 WHERE job_id = ? AND idx = ?",
+                (path, job_id, idx)
+            )
+
+
+class AudioJobWorker:
+    """Hilo de fondo que vacía la cola de trabajos de audio"""
+
+    def __init__(self, job_queue: AudioJobQueue, generator: Any):
+        self.job_queue = job_queue
+        self.generator = generator
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def ensure_running(self) -> None:
+        """Arranca el hilo si no está activo (termina solo cuando la cola queda vacía)"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self) -> None:
+        while True:
+            job = self.job_queue.claim_next()
+            if job is None:
+                # Revisar de nuevo bajo el lock para no perder un trabajo recién encolado
+                with self._lock:
+                    job = self.job_queue.claim_next()
+                    if job is None:
+                        self._thread = None
+                        return
+
+            try:
+                if job["kind"] == SCRIPT_JOB:
+                    # Se marca como completado junto con el encolado de su síntesis
+                    self._run_script_job(job)
+                else:
+                    self.job_queue.mark_done(job["id"], self._run_synthesis_job(job))
+                print(f"\n✅ Trabajo de audio #{job['id']} ({job['audio_type']}) completado")
+            except Exception as e:
+                self.job_queue.mark_failed(job["id"], str(e))
+                print(f"\n❌ Trabajo de audio #{job['id']} falló: {e}")
+
+    def _run_script_job(self, job: Dict[str, Any]) -> None:
+        """Crea el script, lo marca como completado y encola su síntesis"""
+        script = self.generator.create_script(job["script_name"], job["payload"]["context"])
+        script_path = self.generator._save_audio_script(job["script_name"], script)
+
+        self.job_queue.mark_done_and_enqueue(job["id"], script_path, SYNTHESIS_JOB, job["audio_type"],
+                                             job["script_name"], {"script": script})
+
+    def _run_synthesis_job(self, job: Dict[str, Any]) -> Optional[str]:
+        """Sintetiza las partes pendientes y une el resultado"""
+        job_id = job["id"]
+
+        chunks = self.job_queue.get_chunks(job_id)
+        if not chunks:
+            self.job_queue.add_chunks(job_id, self.generator._plan_tts_chunks(job["payload"]["script"]))
+            chunks = self.job_queue.get_chunks(job_id)
+
+        if not chunks:
+            raise ValueError("el script está vacío")
+
+        parts_dir = self.generator._get_audio_path(os.path.join(".trabajos", f"trabajo_{job_id}"))
+        os.makedirs(parts_dir, exist_ok=True)
+
+        part_paths: List[str] = []
+        for chunk in chunks:
+            # Las partes ya sintetizadas antes de una interrupción se reutilizan
+            if chunk["done"] and chunk["path"] and os.path.exists(chunk["path"]):
+                part_paths.append(chunk["path"])
+                continue
+
+            base_path = os.path.join(parts_dir, f"parte_{chunk['idx']:03d}")
+            # pyttsx3 corre en el hilo de síntesis compartido, no en el de este worker
+            part_path = self.generator._synthesize_chunk_to_file(chunk["text"], base_path)
+            if not part_path:
+                raise RuntimeError(f"no se pudo sintetizar la parte {chunk['idx'] + 1}")
+
+            self.job_queue.complete_chunk(job_id, chunk["idx"], part_path)
+            part_paths.append(part_path)
+
+        base_name = f"{job['audio_type'].lower().replace(' ', '_')}_local_tts"
+        audio_path = self.generator._get_audio_path(f"{base_name}.wav")
+        silences_ms = [chunk["pause_ms"] for chunk in chunks]
+        if not self.generator._merge_wav_parts(part_paths, audio_path, silences_ms):
+            return parts_dir
+
+        shutil.rmtree(parts_dir, ignore_errors=True)
+        return self.generator._finalize_narration(audio_path)
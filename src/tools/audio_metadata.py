@@ -0,0 +1,441 @@
+import os
+import json
+import mmap
+import struct
+import threading
+from typing import Any, BinaryIO, Dict, List, Optional
+
+AUDIO_EXTENSIONS = ('.mp3', '.wav', '.ogg', '.opus', '.m4a')
+
+# Tablas de cabeceras MPEG audio: bitrate (kbps) por [versión MPEG-1?][capa][índice]
+_MP3_BITRATES = {
+    (True, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (True, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (True, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (False, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (False, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (False, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+# Frecuencias por bits de versión (0: MPEG-2.5, 2: MPEG-2, 3: MPEG-1)
+_MP3_SAMPLE_RATES = {
+    0: [11025, 12000, 8000],
+    2: [22050, 24000, 16000],
+    3: [44100, 48000, 32000],
+}
+
+# Bytes leídos al final de un Ogg para encontrar la última página
+_OGG_TAIL_BYTES = 64 * 1024
+
+# Separación (segundos) entre entradas del índice de búsqueda
+SEEK_INDEX_STEP = 1.0
+
+
+def format_duration(seconds: Optional[float]) -> str:
+    """Convierte segundos a 'mm:ss' (o 'h:mm:ss')"""
+    if seconds is None:
+        return "--:--"
+    total = int(round(seconds))
+    hours, rest = divmod(total, 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes:02d}:{secs:02d}"
+
+
+def parse_timestamp(text: str) -> Optional[float]:
+    """Convierte 'ss', 'mm:ss' o 'h:mm:ss' a segundos (None si no es válido)"""
+    try:
+        parts = [float(part) for part in text.strip().split(':')]
+    except ValueError:
+        return None
+    if not 1 <= len(parts) <= 3 or any(part < 0 for part in parts):
+        return None
+
+    seconds = 0.0
+    for part in parts:
+        seconds = seconds * 60 + part
+    return seconds
+
+
+def read_audio_metadata(file_path: str) -> Dict[str, Any]:
+    """Lee duración, frecuencia y canales desde las cabeceras, sin decodificar audio"""
+    extension = os.path.splitext(file_path)[1].lower()
+    info: Dict[str, Any] = {
+        "format": extension.lstrip('.'),
+        "duration": None,
+        "sample_rate": None,
+        "channels": None,
+        "bitrate": None,
+    }
+
+    try:
+        with open(file_path, 'rb') as f:
+            magic = f.read(4)
+            f.seek(0)
+            # Se detecta por contenido: algunos archivos tienen extensión engañosa
+            if magic == b'RIFF':
+                info.update(_read_wav(f))
+            elif magic == b'OggS':
+                info.update(_read_ogg(f, os.path.getsize(file_path)))
+            elif extension == '.mp3' or magic[:3] == b'ID3' or (magic[:1] == b'\xff' and magic[1] & 0xE0 == 0xE0):
+                info.update(_read_mp3(f, os.path.getsize(file_path)))
+    except (OSError, struct.error, ValueError, IndexError) as e:
+        info["error"] = str(e)
+
+    return info
+
+
+def _read_wav(f: BinaryIO) -> Dict[str, Any]:
+    riff, _, wave_id = struct.unpack('<4sI4s', f.read(12))
+    if wave_id != b'WAVE':
+        raise ValueError("cabecera WAV inválida")
+
+    file_size = os.fstat(f.fileno()).st_size
+    info: Dict[str, Any] = {"format": "wav"}
+    byte_rate = 0
+
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            break
+        chunk_id, chunk_size = struct.unpack('<4sI', header)
+
+        if chunk_id == b'fmt ':
+            fmt = f.read(chunk_size)
+            _, channels, sample_rate, byte_rate, block_align, bits = struct.unpack('<HHIIHH', fmt[:16])
+            info.update(channels=channels, sample_rate=sample_rate, bits_per_sample=bits,
+                        block_align=block_align, bitrate=byte_rate * 8 // 1000)
+            if chunk_size % 2:
+                f.seek(1, os.SEEK_CUR)
+        elif chunk_id == b'data':
+            data_offset = f.tell()
+            # Archivos escritos en streaming pueden declarar un tamaño inválido
+            data_size = min(chunk_size, file_size - data_offset)
+            info.update(data_offset=data_offset, data_size=data_size)
+            if byte_rate:
+                info["duration"] = data_size / byte_rate
+            break
+        else:
+            f.seek(chunk_size + (chunk_size % 2), os.SEEK_CUR)
+
+    return info
+
+
+def parse_mp3_header(header: bytes) -> Optional[Dict[str, Any]]:
+    """Interpreta una cabecera de frame MPEG audio de 4 bytes (None si no es válida)"""
+    if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return None
+
+    version_bits = (header[1] >> 3) & 0x03
+    layer_bits = (header[1] >> 1) & 0x03
+    bitrate_index = header[2] >> 4
+    rate_index = (header[2] >> 2) & 0x03
+    if version_bits == 1 or layer_bits == 0 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    mpeg1 = version_bits == 3
+    layer = 4 - layer_bits
+    bitrate = _MP3_BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+    sample_rate = _MP3_SAMPLE_RATES[version_bits][rate_index]
+    padding = (header[2] >> 1) & 0x01
+    channels = 1 if (header[3] >> 6) == 3 else 2
+
+    if layer == 1:
+        samples = 384
+        frame_length = (12 * bitrate // sample_rate + padding) * 4
+    else:
+        samples = 1152 if (layer == 2 or mpeg1) else 576
+        frame_length = (samples // 8) * bitrate // sample_rate + padding
+
+    return {
+        "mpeg1": mpeg1,
+        "layer": layer,
+        "bitrate": bitrate,
+        "sample_rate": sample_rate,
+        "channels": channels,
+        "samples": samples,
+        "frame_length": frame_length,
+    }
+
+
+def mp3_audio_start(f: BinaryIO) -> int:
+    """Devuelve el desplazamiento del primer byte de audio tras una etiqueta ID3v2"""
+    f.seek(0)
+    header = f.read(10)
+    if header[:3] != b'ID3':
+        return 0
+    size = ((header[6] & 0x7F) << 21) | ((header[7] & 0x7F) << 14) | ((header[8] & 0x7F) << 7) | (header[9] & 0x7F)
+    footer = 10 if header[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def find_mp3_frame(f: BinaryIO, start: int, limit: int = 64 * 1024) -> Optional[int]:
+    """Busca la primera cabecera de frame válida desde 'start'"""
+    f.seek(start)
+    data = f.read(limit)
+    pos = data.find(b'\xff')
+    while 0 <= pos < len(data) - 4:
+        frame = parse_mp3_header(data[pos:pos + 4])
+        if frame and frame["frame_length"] > 0:
+            # Confirmar con la cabecera del frame siguiente cuando está disponible
+            following = pos + frame["frame_length"]
+            if following + 4 > len(data) or parse_mp3_header(data[following:following + 4]):
+                return start + pos
+        pos = data.find(b'\xff', pos + 1)
+    return None
+
+
+def _read_mp3(f: BinaryIO, file_size: int) -> Dict[str, Any]:
+    audio_start = mp3_audio_start(f)
+    frame_offset = find_mp3_frame(f, audio_start)
+    if frame_offset is None:
+        raise ValueError("no se encontró un frame MP3 válido")
+
+    f.seek(frame_offset)
+    first = f.read(min(2048, file_size - frame_offset))
+    frame = parse_mp3_header(first[:4])
+
+    info: Dict[str, Any] = {
+        "format": "mp3",
+        "sample_rate": frame["sample_rate"],
+        "channels": frame["channels"],
+        "bitrate": frame["bitrate"] // 1000,
+        "data_offset": frame_offset,
+    }
+
+    # Cabecera Xing/Info (VBR) en el primer frame: número total de frames
+    if frame["mpeg1"]:
+        side_info = 17 if frame["channels"] == 1 else 32
+    else:
+        side_info = 9 if frame["channels"] == 1 else 17
+    xing_pos = 4 + side_info
+    tag = first[xing_pos:xing_pos + 4]
+    total_frames = None
+    if tag in (b'Xing', b'Info'):
+        flags = struct.unpack('>I', first[xing_pos + 4:xing_pos + 8])[0]
+        if flags & 0x01:
+            total_frames = struct.unpack('>I', first[xing_pos + 8:xing_pos + 12])[0]
+    elif first[36:40] == b'VBRI':
+        total_frames = struct.unpack('>I', first[50:54])[0]
+
+    if total_frames:
+        duration = total_frames * frame["samples"] / frame["sample_rate"]
+        info["duration"] = duration
+        if duration > 0:
+            info["bitrate"] = int((file_size - frame_offset) * 8 / duration / 1000)
+    else:
+        # CBR: el tamaño de los datos determina la duración
+        audio_bytes = file_size - frame_offset
+        f.seek(max(0, file_size - 128))
+        if f.read(3) == b'TAG':
+            audio_bytes -= 128
+        info["duration"] = audio_bytes * 8 / frame["bitrate"]
+
+    return info
+
+
+def _read_ogg(f: BinaryIO, file_size: int) -> Dict[str, Any]:
+    header = f.read(27)
+    if header[:4] != b'OggS':
+        raise ValueError("cabecera Ogg inválida")
+    segments = header[26]
+    lacing = f.read(segments)
+    packet = f.read(sum(lacing))
+
+    info: Dict[str, Any] = {"format": "ogg"}
+    granule_rate = None
+    pre_skip = 0
+
+    if packet[:7] == b'\x01vorbis':
+        channels = packet[11]
+        sample_rate, _, nominal, _ = struct.unpack('<Iiii', packet[12:28])
+        info.update(codec="vorbis", channels=channels, sample_rate=sample_rate)
+        if nominal > 0:
+            info["bitrate"] = nominal // 1000
+        granule_rate = sample_rate
+    elif packet[:8] == b'OpusHead':
+        channels = packet[9]
+        pre_skip, input_rate = struct.unpack('<HI', packet[10:16])
+        info.update(codec="opus", channels=channels, sample_rate=input_rate or 48000)
+        # La posición granular de Opus siempre cuenta muestras a 48 kHz
+        granule_rate = 48000
+
+    if granule_rate:
+        last_granule = _last_ogg_granule(f, file_size)
+        if last_granule is not None:
+            duration = max(0, last_granule - pre_skip) / granule_rate
+            info["duration"] = duration
+            if duration > 0 and "bitrate" not in info:
+                info["bitrate"] = int(file_size * 8 / duration / 1000)
+
+    return info
+
+
+def _last_ogg_granule(f: BinaryIO, file_size: int) -> Optional[int]:
+    """Lee la posición granular de la última página Ogg"""
+    f.seek(max(0, file_size - _OGG_TAIL_BYTES))
+    tail = f.read()
+    pos = tail.rfind(b'OggS')
+    while pos >= 0:
+        if pos + 14 <= len(tail):
+            granule = struct.unpack('<q', tail[pos + 6:pos + 14])[0]
+            if granule >= 0:
+                return granule
+        pos = tail.rfind(b'OggS', 0, pos)
+    return None
+
+
+def build_seek_index(file_path: str, info: Dict[str, Any], step: float = SEEK_INDEX_STEP) -> Dict[str, Any]:
+    """Calcula cómo saltar a un instante del archivo sin decodificar desde el principio.
+
+    En MP3 se guarda el byte de inicio del frame de cada 'step' segundos. WAV
+    (aritmética sobre el bloque de datos) y Ogg (bisección por posición
+    granular) ya se posicionan directamente en el decodificador.
+    """
+    if info.get("format") == "mp3":
+        return {"method": "byte_offset", "step": step, "offsets": _scan_mp3_offsets(file_path, step)}
+    return {"method": "decoder"}
+
+
+def _scan_mp3_offsets(file_path: str, step: float) -> List[int]:
+    """Recorre las cabeceras de frame una sola vez (sin decodificar audio)"""
+    offsets: List[int] = []
+    with open(file_path, 'rb') as f:
+        pos = find_mp3_frame(f, mp3_audio_start(f))
+        if pos is None or os.fstat(f.fileno()).st_size == 0:
+            return offsets
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            size = len(data)
+            elapsed = 0.0
+            next_mark = 0.0
+
+            while pos + 4 <= size:
+                frame = parse_mp3_header(data[pos:pos + 4])
+                if frame is None or frame["frame_length"] <= 0:
+                    # Datos entre frames (p. ej. etiqueta ID3v1 final): resincronizar
+                    if data[pos:pos + 3] == b'TAG':
+                        break
+                    pos = find_mp3_frame(f, pos + 1)
+                    if pos is None:
+                        break
+                    continue
+
+                if elapsed >= next_mark:
+                    offsets.append(pos)
+                    next_mark += step
+                elapsed += frame["samples"] / frame["sample_rate"]
+                pos += frame["frame_length"]
+
+    return offsets
+
+
+class AudioLibraryIndex:
+    """Índice en caché de los audios generados, invalidado por ruta + mtime"""
+
+    INDEX_FILENAME = ".biblioteca_audio.json"
+
+    def __init__(self, audio_dir: str, index_path: Optional[str] = None):
+        self.audio_dir = audio_dir
+        self.index_path = index_path or os.path.join(audio_dir, self.INDEX_FILENAME)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = self._load()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            temp_path = self.index_path + ".tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f, ensure_ascii=False)
+            os.replace(temp_path, self.index_path)
+        except OSError as e:
+            print(f"⚠️ No se pudo guardar el índice de audio: {e}")
+
+    def _is_fresh(self, entry: Optional[Dict[str, Any]], stat: os.stat_result) -> bool:
+        return bool(entry) and entry.get("mtime_ns") == stat.st_mtime_ns and entry.get("size") == stat.st_size
+
+    def _build_entry(self, path: str, stat: os.stat_result) -> Dict[str, Any]:
+        entry = read_audio_metadata(path)
+        entry.update(path=path, filename=os.path.basename(path),
+                     size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+        return entry
+
+    def scan(self) -> List[Dict[str, Any]]:
+        """Devuelve las entradas de todos los audios, leyendo solo los nuevos o modificados"""
+        if not os.path.isdir(self.audio_dir):
+            return []
+
+        with self._lock:
+            changed = False
+            seen = set()
+            entries: List[Dict[str, Any]] = []
+
+            with os.scandir(self.audio_dir) as it:
+                for dir_entry in it:
+                    if not dir_entry.is_file() or not dir_entry.name.lower().endswith(AUDIO_EXTENSIONS):
+                        continue
+
+                    path = os.path.join(self.audio_dir, dir_entry.name)
+                    stat = dir_entry.stat()
+                    seen.add(path)
+
+                    entry = self._entries.get(path)
+                    if not self._is_fresh(entry, stat):
+                        entry = self._build_entry(path, stat)
+                        self._entries[path] = entry
+                        changed = True
+                    entries.append(entry)
+
+            for stale in set(self._entries) - seen:
+                del self._entries[stale]
+                changed = True
+
+            if changed:
+                self._save()
+
+        return sorted(entries, key=lambda e: e["path"])
+
+    def get(self, path: str) -> Optional[Dict[str, Any]]:
+        """Devuelve la entrada de un archivo, actualizándola si cambió"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if not self._is_fresh(entry, stat):
+                entry = self._build_entry(path, stat)
+                # Solo se guardan en el índice los archivos de la biblioteca
+                if os.path.dirname(os.path.abspath(path)) == os.path.abspath(self.audio_dir):
+                    self._entries[path] = entry
+                    self._save()
+        return entry
+
+    def get_seek_index(self, path: str) -> Optional[Dict[str, Any]]:
+        """Devuelve el índice de búsqueda del archivo; se calcula una vez y queda en caché"""
+        entry = self.get(path)
+        if entry is None:
+            return None
+        if "seek_index" in entry:
+            return entry["seek_index"]
+
+        try:
+            seek_index = build_seek_index(path, entry)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ No se pudo indexar {os.path.basename(path)}: {e}")
+            return None
+
+        with self._lock:
+            entry["seek_index"] = seek_index
+            if self._entries.get(path) is entry:
+                self._save()
+        return seek_index
@@ -0,0 +1,116 @@
+from typing import Any, Dict, Optional, Tuple
+import pygame
+from .audio_metadata import AudioLibraryIndex, read_audio_metadata
+
+# Configuración usada cuando no se conoce el formato del archivo
+DEFAULT_FREQUENCY = 22050
+DEFAULT_CHANNELS = 2
+
+# Tamaños de buffer permitidos (muestras): se sube un escalón al detectar cortes
+BUFFER_SIZES = (512, 1024, 2048, 4096, 8192)
+
+# Cortes en una pista antes de pedir un buffer mayor
+UNDERRUNS_BEFORE_GROW = 2
+
+# Opus siempre se decodifica a 48 kHz, sea cual sea la frecuencia original
+OPUS_DECODE_RATE = 48000
+
+
+class AudioOutputManager:
+    """Ajusta el mezclador de pygame al formato nativo del audio y adapta el buffer"""
+
+    def __init__(self, library: Optional[AudioLibraryIndex] = None, buffer_size: int = BUFFER_SIZES[0]):
+        self.library = library
+        self.buffer_size = buffer_size
+        self.config: Optional[Tuple[int, int, int]] = None
+        self._pending_buffer: Optional[int] = None
+        self._underruns = 0
+        self._last_lag = 0.0
+
+    def init(self, frequency: int = DEFAULT_FREQUENCY, channels: int = DEFAULT_CHANNELS) -> bool:
+        """Inicializa (o reinicializa) el mezclador con la configuración indicada"""
+        config = (frequency, channels, self.buffer_size)
+        if self.config == config and pygame.mixer.get_init():
+            return True
+
+        try:
+            if pygame.mixer.get_init():
+                pygame.mixer.quit()
+            pygame.mixer.init(frequency=frequency, size=-16, channels=channels, buffer=self.buffer_size)
+        except pygame.error as e:
+            print(f"⚠️ Error inicializando el mezclador ({frequency} Hz, {channels} canal(es)): {e}")
+            self.config = None
+            return False
+
+        self.config = config
+        return True
+
+    def native_format(self, file_path: str) -> Tuple[int, int]:
+        """Frecuencia y canales con los que el decodificador entrega el archivo"""
+        info: Dict[str, Any] = {}
+        if self.library is not None:
+            info = self.library.get(file_path) or {}
+        if not info:
+            info = read_audio_metadata(file_path)
+
+        frequency = info.get("sample_rate") or DEFAULT_FREQUENCY
+        if info.get("codec") == "opus":
+            frequency = OPUS_DECODE_RATE
+        channels = min(info.get("channels") or DEFAULT_CHANNELS, 2)
+        return frequency, channels
+
+    def matches(self, file_path: str) -> bool:
+        """Indica si el archivo se puede reproducir sin reconfigurar el mezclador"""
+        if self.config is None or self._pending_buffer is not None:
+            return False
+        return self.native_format(file_path) == self.config[:2]
+
+    def prepare(self, file_path: str) -> bool:
+        """Reconfigura el mezclador solo si cambia el formato o hay un buffer pendiente.
+
+        Devuelve True si el mezclador se reinicializó.
+        """
+        if self._pending_buffer is not None:
+            print(f"\n🔧 Buffer de audio ampliado a {self._pending_buffer} muestras")
+            self.buffer_size = self._pending_buffer
+            self._pending_buffer = None
+
+        previous = self.config
+        frequency, channels = self.native_format(file_path)
+        if not self.init(frequency, channels):
+            # Si el formato nativo falla, se vuelve a la configuración por defecto
+            self.init()
+
+        self.reset_measurement()
+        return self.config != previous
+
+    def reset_measurement(self) -> None:
+        """Reinicia la medición de cortes (al empezar una pista o tras un salto)"""
+        self._underruns = 0
+        self._last_lag = 0.0
+
+    def observe(self, wall_seconds: float, mixed_seconds: float) -> None:
+        """Compara el tiempo transcurrido con el audio que el mezclador llegó a entregar.
+
+        Cuando el dispositivo se queda sin datos, get_pos() se retrasa respecto
+        al reloj; cada salto de retraso mayor que dos buffers cuenta como corte.
+        """
+        if self.config is None or mixed_seconds < 0:
+            return
+
+        frequency = self.config[0]
+        buffer_seconds = self.buffer_size / frequency
+        lag = wall_seconds - mixed_seconds
+
+        if lag - self._last_lag > 2 * buffer_seconds:
+            self._underruns += 1
+            if self._underruns >= UNDERRUNS_BEFORE_GROW:
+                self._request_larger_buffer()
+                self._underruns = 0
+        self._last_lag = max(self._last_lag, lag)
+
+    def _request_larger_buffer(self) -> None:
+        # Se aplica al cargar la próxima pista para no cortar la actual
+        larger = [size for size in BUFFER_SIZES if size > self.buffer_size]
+        if larger and self._pending_buffer is None:
+            self._pending_buffer = larger[0]
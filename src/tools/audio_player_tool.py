@@ -1,9 +1,12 @@
 import os
-import threading
+import queue
 import time
 from typing import List, Optional
 import pygame
 from pathlib import Path
+from .audio_metadata import AudioLibraryIndex, format_duration
+from .audio_output import AudioOutputManager
+from .playback_controller import PlaybackController
 
 class AudioPlayerTool:
     
@@ -12,11 +15,19 @@ class AudioPlayerTool:
         self.is_playing = False
         self.current_file = None
         self.pygame_initialized = False
+        self.controller: Optional[PlaybackController] = None
+        
+        # Índice en caché con duración y formato de los audios generados
+        self.audio_dir = os.path.join(os.path.dirname(__file__), "..", "storage", "generated_audio")
+        self.library = AudioLibraryIndex(self.audio_dir)
+        
+        # El mezclador se reconfigura al formato nativo de cada archivo
+        self.output = AudioOutputManager(self.library)
         
         try:
-            pygame.mixer.init(frequency=22050, size=-16, channels=2, buffer=512)
-            self.pygame_initialized = True
-            print("Reproductor de audio listo")
+            self.pygame_initialized = self.output.init()
+            if self.pygame_initialized:
+                print("Reproductor de audio listo")
         except Exception as e:
             print(f"⚠️ Error inicializando reproductor: {e}")
             self.pygame_initialized = False
@@ -39,22 +50,61 @@ class AudioPlayerTool:
             print(f"Cargando: {os.path.basename(file_path)}")
             print("Reproduciendo en consola...")
             
-            # Cargar y reproducir archivo
-            pygame.mixer.music.load(file_path)
-            pygame.mixer.music.play()
-            
             self.is_playing = True
             self.current_file = file_path
             
-            # Mostrar controles mientras reproduce
-            self._show_playback_controls()
+            # Reproducir con controles de consola hasta el evento de fin de pista
+            self._get_controller().play_files([file_path])
             
+            self.is_playing = False
+            self.current_file = None
             return True
             
         except Exception as e:
             print(f"❌ Error reproduciendo audio: {e}")
             return False
 
+    def play_audio_stream(self, chunk_queue: "queue.Queue[Optional[str]]", total_parts: Optional[int] = None) -> bool:
+        """Reproduce partes de audio a medida que llegan a la cola (None indica el final)"""
+        if not self.pygame_initialized:
+            print("❌ Reproductor no disponible.")
+            # Vaciar la cola para no bloquear al productor
+            while chunk_queue.get() is not None:
+                pass
+            return False
+
+        played = 0
+        self.is_playing = True
+
+        while True:
+            part_path = chunk_queue.get()
+            if part_path is None:
+                break
+
+            # Si se detuvo la reproducción, solo se consumen las partes restantes
+            if not self.is_playing:
+                continue
+
+            try:
+                self.output.prepare(part_path)
+                pygame.mixer.music.load(part_path)
+                pygame.mixer.music.play()
+                self.current_file = part_path
+                played += 1
+
+                total = f"/{total_parts}" if total_parts else ""
+                print(f"\r▶️ Reproduciendo parte {played}{total}...", end="", flush=True)
+
+                while self.is_playing and pygame.mixer.music.get_busy():
+                    time.sleep(0.05)
+            except Exception as e:
+                print(f"\n❌ Error reproduciendo parte: {e}")
+
+        print()
+        self.is_playing = False
+        self.current_file = None
+        return played > 0
+
     def stop_audio(self) -> None:
         """Detiene la reproducción actual"""
         if self.pygame_initialized and self.is_playing:
@@ -76,55 +126,11 @@ class AudioPlayerTool:
                 pygame.mixer.music.unpause()
                 print("▶️ Reproducción reanudada")
 
-    def _show_playback_controls(self) -> None:
-        """Muestra controles de reproducción y reproduce directamente en consola"""
-        print("\nReproducción en consola")
-        print("• ENTER: pausar/reanudar")
-        print("• s + ENTER: detener")
-        print("• q + ENTER: salir")
-        print("• Reproduciendo...")
-        
-        # Hilo para monitorear controles
-        control_thread = threading.Thread(target=self._monitor_controls)
-        control_thread.daemon = True
-        control_thread.start()
-        
-        # Mostrar progreso mientras reproduce
-        self._show_playback_progress()
-        
-        if self.is_playing:
-            print("Reproducción completada")
-            self.is_playing = False
-
-    def _show_playback_progress(self) -> None:
-        """Muestra progreso de reproducción en consola"""
-        start_time = time.time()
-        
-        while self.is_playing and pygame.mixer.music.get_busy():
-            elapsed = int(time.time() - start_time)
-            print(f"\rReproduciendo... {elapsed}s", end="", flush=True)
-            time.sleep(1)
-        
-        print()  # Nueva línea al final
-
-    def _monitor_controls(self) -> None:
-        """Monitorea entrada del usuario para controles"""
-        try:
-            while self.is_playing:
-                user_input = input().strip().lower()
-                
-                if user_input == '':
-                    self.pause_audio()
-                elif user_input == 's':
-                    self.stop_audio()
-                    break
-                elif user_input == 'q':
-                    self.stop_audio()
-                    break
-                    
-        except EOFError:
-            # Usuario cerró la entrada
-            pass
+    def _get_controller(self) -> PlaybackController:
+        """Devuelve el controlador de reproducción (se crea al primer uso)"""
+        if self.controller is None:
+            self.controller = PlaybackController(self.library, self.output)
+        return self.controller
 
     def _install_and_retry(self, file_path: str) -> bool:
         """Instala pygame y reintenta reproducir"""
@@ -135,8 +141,7 @@ class AudioPlayerTool:
             print("✅ pygame instalado. Reiniciando reproductor...")
             
             # Reinicializar pygame
-            pygame.mixer.init(frequency=22050, size=-16, channels=2, buffer=512)
-            self.pygame_initialized = True
+            self.pygame_initialized = self.output.init()
             
             # Reintentar reproducción
             return self.play_audio_file(file_path)
@@ -147,21 +152,12 @@ class AudioPlayerTool:
 
     def list_audio_files(self) -> List[str]:
         """Lista archivos de audio disponibles"""
-        audio_dir = os.path.join(os.path.dirname(__file__), "..", "storage", "generated_audio")
-        
-        if not os.path.exists(audio_dir):
-            return []
-        
-        audio_files = []
-        for file in os.listdir(audio_dir):
-            if file.lower().endswith(('.mp3', '.wav', '.ogg', '.m4a')):
-                audio_files.append(os.path.join(audio_dir, file))
-        
-        return sorted(audio_files)
+        return [entry["path"] for entry in self.library.scan()]
 
     def show_audio_menu(self) -> None:
         """Muestra menú de selección de archivos de audio"""
-        audio_files = self.list_audio_files()
+        audio_entries = self.library.scan()
+        audio_files = [entry["path"] for entry in audio_entries]
         
         if not audio_files:
             print("❌ No hay archivos de audio disponibles.")
@@ -174,15 +170,16 @@ class AudioPlayerTool:
         print("="*60)
         print("📁 Archivos de audio disponibles:")
         
-        for i, file_path in enumerate(audio_files, 1):
-            filename = os.path.basename(file_path)
-            file_size = os.path.getsize(file_path)
-            print(f"{i:2d}. {filename} ({file_size} bytes)")
+        for i, entry in enumerate(audio_entries, 1):
+            duration = format_duration(entry.get("duration"))
+            print(f"{i:2d}. {entry['filename']} [{duration}] ({entry['size']} bytes)")
         
         print("="*60)
         print("🎧 Opciones de reproducción:")
         print("• Ingresa número para reproducir archivo EN LA CONSOLA")
         print("• Ingresa 'todos' para reproducir secuencialmente")
+        print("• Ingresa 'aleatorio' para reproducir en orden aleatorio")
+        print("• Agrega ' repetir' para reproducir en bucle (p. ej. 'todos repetir')")
         print("• Ingresa '0' para volver al menú principal")
         print("="*60)
         print("💡 El audio se reproduce directamente aquí, no se abre reproductor externo")
@@ -194,8 +191,13 @@ class AudioPlayerTool:
                 if selection == "0":
                     print("👋 Regresando al menú principal...")
                     break
-                elif selection == "todos":
-                    self._play_all_audio_files(audio_files)
+                elif selection.split()[:1] in (["todos"], ["aleatorio"]):
+                    options = selection.split()
+                    self._play_all_audio_files(
+                        audio_files,
+                        shuffle=options[0] == "aleatorio",
+                        repeat="repetir" in options[1:]
+                    )
                     break
                 else:
                     try:
@@ -205,7 +207,7 @@ class AudioPlayerTool:
                         else:
                             print(f"❌ Número no válido. Rango: 1-{len(audio_files)}")
                     except ValueError:
-                        print("❌ Entrada no válida. Usa números o 'todos'.")
+                        print("❌ Entrada no válida. Usa números, 'todos' o 'aleatorio'.")
                         
             except KeyboardInterrupt:
                 print("\n👋 Regresando al menú principal...")
@@ -213,23 +215,29 @@ class AudioPlayerTool:
             except Exception as e:
                 print(f"❌ Error: {e}")
 
-    def _play_all_audio_files(self, audio_files: List[str]) -> None:
-        """Reproduce todos los archivos de audio secuencialmente en consola"""
-        print(f"\n🔄 Reproduciendo {len(audio_files)} archivo(s) secuencialmente EN LA CONSOLA...")
+    def _play_all_audio_files(self, audio_files: List[str], shuffle: bool = False, repeat: bool = False) -> None:
+        """Reproduce todos los archivos de audio como lista continua en consola"""
+        order = "en orden aleatorio" if shuffle else "secuencialmente"
+        loop = " (en bucle)" if repeat else ""
+        print(f"\n🔄 Reproduciendo {len(audio_files)} archivo(s) {order}{loop} EN LA CONSOLA...")
         print("🔊 Todos los audios se reproducirán directamente aquí")
         
-        for i, file_path in enumerate(audio_files, 1):
-            filename = os.path.basename(file_path)
-            print(f"\n📀 Archivo {i}/{len(audio_files)}: {filename}")
-            print("🎧 Reproduciendo directamente en consola...")
-            
-            if self.play_audio_file(file_path):
-                if i < len(audio_files):
-                    print("⏭️ Preparando siguiente archivo...")
-                    time.sleep(2)
-            else:
-                print(f"❌ Error reproduciendo {filename}")
-                break
+        if not self.pygame_initialized:
+            print("❌ Reproductor no disponible.")
+            return
+        
+        def announce(index: int, file_path: str) -> None:
+            print(f"\n📀 Archivo {index + 1}/{len(audio_files)}: {os.path.basename(file_path)}")
+        
+        # Una sola sesión para toda la lista: la siguiente pista queda en cola sin pausas
+        self.is_playing = True
+        try:
+            self._get_controller().play_files(audio_files, on_track_start=announce, shuffle=shuffle, repeat=repeat)
+        except Exception as e:
+            print(f"❌ Error reproduciendo la lista: {e}")
+        finally:
+            self.is_playing = False
+            self.current_file = None
         
         print("\n🎉 Reproducción completa finalizada")
 
@@ -239,25 +247,21 @@ class AudioPlayerTool:
             if not os.path.exists(file_path):
                 return {"error": "Archivo no encontrado"}
             
-            file_size = os.path.getsize(file_path)
-            file_extension = os.path.splitext(file_path)[1].lower()
+            # Metadatos leídos de las cabeceras (en caché por ruta + mtime)
+            entry = self.library.get(file_path) or {}
             
             info = {
                 "filename": os.path.basename(file_path),
-                "size": file_size,
-                "extension": file_extension,
-                "path": file_path
+                "size": entry.get("size", os.path.getsize(file_path)),
+                "extension": os.path.splitext(file_path)[1].lower(),
+                "path": file_path,
+                "duration": format_duration(entry.get("duration")) if entry.get("duration") is not None else "Desconocida",
+                "duration_seconds": entry.get("duration"),
+                "sample_rate": entry.get("sample_rate"),
+                "channels": entry.get("channels"),
+                "bitrate": entry.get("bitrate"),
             }
             
-            # Intentar obtener duración si pygame está disponible
-            if self.pygame_initialized:
-                try:
-                    pygame.mixer.music.load(file_path)
-                    # pygame no tiene método directo para duración, pero podemos estimar
-                    info["duration"] = "Desconocida"
-                except:
-                    info["duration"] = "No disponible"
-            
             return info
             
         except Exception as e:
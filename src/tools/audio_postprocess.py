@@ -0,0 +1,177 @@
+import os
+import wave
+from typing import List, NamedTuple, Optional
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Nivel objetivo de la narración (RMS con puerta, en dBFS) y techo de pico
+TARGET_DBFS = float(os.getenv('STUDYBOX_AUDIO_TARGET_DBFS', '-18'))
+PEAK_CEILING_DBFS = -1.0
+
+# Por debajo de este nivel un tramo de 10 ms se considera silencio
+SILENCE_DBFS = -50.0
+# Silencio que se conserva en cada extremo al recortar
+EDGE_KEEP_MS = 120
+
+# Ventana de lectura: la memoria no depende de la duración del archivo
+WINDOW_SECONDS = 1.0
+# Bloques para medir el nivel y tramos para detectar silencio
+LOUDNESS_BLOCK_MS = 100
+SILENCE_FRAME_MS = 10
+
+# Puertas de la medición: absoluta y relativa a la media (estilo EBU R128)
+ABSOLUTE_GATE_DBFS = -70.0
+RELATIVE_GATE_DB = -10.0
+
+# Cambios de ganancia menores que esto no justifican reescribir el archivo
+MIN_GAIN_DB = 0.5
+
+FULL_SCALE = 32768.0
+
+
+class WavLevels(NamedTuple):
+    """Resultado de medir un WAV: nivel, pico y tramo con sonido (en frames)"""
+    loudness_dbfs: Optional[float]
+    peak_dbfs: Optional[float]
+    sound_start: int
+    sound_end: int
+    total_frames: int
+
+
+def _to_dbfs(mean_square: float) -> float:
+    return float(10 * np.log10(max(mean_square, 1e-12)))
+
+
+def _gated_loudness(block_energies: np.ndarray) -> Optional[float]:
+    """Nivel medio de los bloques que superan las puertas absoluta y relativa"""
+    above_absolute = block_energies[block_energies > 10 ** (ABSOLUTE_GATE_DBFS / 10)]
+    if not len(above_absolute):
+        return None
+    relative_gate = above_absolute.mean() * 10 ** (RELATIVE_GATE_DB / 10)
+    gated = above_absolute[above_absolute > relative_gate]
+    return _to_dbfs(float(gated.mean()))
+
+
+def _read_windows(wav: wave.Wave_read, start: int, end: int):
+    """Recorre [start, end) en ventanas, como float32 en [-1, 1) con forma (frames, canales)"""
+    channels = wav.getnchannels()
+    window = max(1, int(wav.getframerate() * WINDOW_SECONDS))
+    wav.setpos(start)
+    position = start
+    while position < end:
+        data = wav.readframes(min(window, end - position))
+        if not data:
+            break
+        samples = np.frombuffer(data, dtype='<i2').reshape(-1, channels)
+        position += len(samples)
+        yield samples.astype(np.float32) / FULL_SCALE
+
+
+def _is_supported(wav: wave.Wave_read) -> bool:
+    # pyttsx3 y los fragmentos unidos producen PCM de 16 bits
+    return wav.getsampwidth() == 2 and wav.getcomptype() == 'NONE'
+
+
+def measure_wav(path: str) -> Optional[WavLevels]:
+    """Mide el archivo en una pasada por ventanas (None si el formato no es PCM de 16 bits)"""
+    with wave.open(path, 'rb') as wav:
+        if not _is_supported(wav):
+            return None
+
+        rate = wav.getframerate()
+        total = wav.getnframes()
+        block = max(1, rate * LOUDNESS_BLOCK_MS // 1000)
+        frame = max(1, rate * SILENCE_FRAME_MS // 1000)
+        silence_level = 10 ** (SILENCE_DBFS / 10)
+
+        energies: List[np.ndarray] = []
+        pending = np.zeros(0, dtype=np.float32)
+        peak = 0.0
+        sound_start: Optional[int] = None
+        sound_end = 0
+        offset = 0
+
+        for samples in _read_windows(wav, 0, total):
+            # Energía por frame mezclando canales; un solo cálculo para nivel y silencio
+            squares = (samples ** 2).mean(axis=1)
+            peak = max(peak, float(np.abs(samples).max()))
+
+            usable = len(squares) - len(squares) % frame
+            if usable:
+                frame_energy = squares[:usable].reshape(-1, frame).mean(axis=1)
+                loud = np.flatnonzero(frame_energy > silence_level)
+                if len(loud):
+                    if sound_start is None:
+                        sound_start = offset + int(loud[0]) * frame
+                    sound_end = offset + (int(loud[-1]) + 1) * frame
+            if usable < len(squares) and squares[usable:].max() > silence_level:
+                # Cola menor que un tramo: solo ocurre al final del archivo
+                sound_end = offset + len(squares)
+            offset += len(squares)
+
+            pending = np.concatenate([pending, squares])
+            complete = len(pending) - len(pending) % block
+            if complete:
+                energies.append(pending[:complete].reshape(-1, block).mean(axis=1))
+                pending = pending[complete:]
+
+        if len(pending):
+            energies.append(np.array([pending.mean()], dtype=np.float32))
+
+    loudness = _gated_loudness(np.concatenate(energies)) if energies else None
+    return WavLevels(
+        loudness_dbfs=loudness,
+        peak_dbfs=float(20 * np.log10(peak)) if peak > 0 else None,
+        sound_start=sound_start if sound_start is not None else 0,
+        sound_end=sound_end if sound_start is not None else 0,
+        total_frames=total,
+    )
+
+
+def trimmed_range(levels: WavLevels, frame_rate: int, keep_ms: int = EDGE_KEEP_MS) -> range:
+    """Frames a conservar tras quitar el silencio de los extremos (con un margen)"""
+    keep = frame_rate * keep_ms // 1000
+    if levels.sound_end <= levels.sound_start:
+        return range(0, 0)
+    return range(max(0, levels.sound_start - keep), min(levels.total_frames, levels.sound_end + keep))
+
+
+def normalization_gain_db(levels: WavLevels, target_dbfs: float = TARGET_DBFS) -> float:
+    """Ganancia para llegar al objetivo sin que el pico supere el techo"""
+    if levels.loudness_dbfs is None or levels.peak_dbfs is None:
+        return 0.0
+    gain = target_dbfs - levels.loudness_dbfs
+    return min(gain, PEAK_CEILING_DBFS - levels.peak_dbfs)
+
+
+def normalize_wav(path: str, target_dbfs: float = TARGET_DBFS, trim: bool = True) -> bool:
+    """Recorta el silencio de los extremos y ajusta el nivel del WAV en su sitio.
+
+    Se hacen dos pasadas por ventanas (medir y aplicar), así que la memoria se
+    mantiene acotada aunque la narración dure horas. Devuelve True si el
+    archivo se reescribió.
+    """
+    levels = measure_wav(path)
+    if levels is None or levels.loudness_dbfs is None:
+        return False
+
+    with wave.open(path, 'rb') as wav:
+        params = wav.getparams()
+        keep = trimmed_range(levels, params.framerate) if trim else range(0, levels.total_frames)
+        gain_db = normalization_gain_db(levels, target_dbfs)
+        trims = len(keep) < levels.total_frames
+        if abs(gain_db) < MIN_GAIN_DB and not trims:
+            return False
+
+        gain = np.float32(10 ** (gain_db / 20))
+        temp_path = path + ".tmp"
+        with wave.open(temp_path, 'wb') as out:
+            out.setparams(params)
+            for samples in _read_windows(wav, keep.start, keep.stop):
+                scaled = np.clip(samples * gain * FULL_SCALE, -FULL_SCALE, FULL_SCALE - 1)
+                out.writeframes(scaled.astype('<i2').tobytes())
+
+    os.replace(temp_path, path)
+    return True
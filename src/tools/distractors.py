@@ -0,0 +1,211 @@
+import re
+import random
+import unicodedata
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+from .local_flashcards import (CLOZE_BLANK, STEM_CHARS, STOPWORDS, definition_parts, key_phrase, score_sentences,
+                               split_sentences)
+
+# Opciones incorrectas por pregunta
+NUM_DISTRACTORS = 3
+# Vectores de n-gramas de caracteres: tamaño del n-grama y dimensiones del hashing
+NGRAM_SIZE = 3
+HASH_DIMENSIONS = 1024
+# Términos del material considerados como distractores (los de más peso TF-IDF)
+MAX_CANDIDATES = 4000
+# Respuestas comparadas por multiplicación de matrices
+SIMILARITY_BATCH = 512
+# Vecinos revisados por respuesta antes de recorrer toda la fila
+NEIGHBOURS = 4 * NUM_DISTRACTORS + 8
+
+_HASH_MULTIPLIERS = (np.uint64(0x9E3779B97F4A7C15), np.uint64(0xC2B2AE3D27D4EB4F), np.uint64(0x165667B19E3779F9))
+_WORD_RE = re.compile(r"[^\W\d_]+", re.UNICODE)
+
+
+def char_ngram_vectors(texts: Sequence[str]) -> np.ndarray:
+    """Vectores TF-IDF de n-gramas de caracteres (hashing), normalizados: producto = coseno.
+
+    Todos los textos se codifican en un solo arreglo de puntos de código y los
+    n-gramas se calculan con desplazamientos, sin recorrer los textos en Python.
+    """
+    n_texts = len(texts)
+    if not n_texts:
+        return np.zeros((0, HASH_DIMENSIONS), dtype=np.float32)
+    joined = "\x00".join(f" {text.lower()} " for text in texts) + "\x00"
+    codes = np.frombuffer(joined.encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+    separators = codes == 0
+    rows = np.cumsum(separators) - separators  # texto al que pertenece cada posición
+
+    length = len(codes) - NGRAM_SIZE + 1
+    valid = np.ones(length, dtype=bool)
+    hashes = np.zeros(length, dtype=np.uint64)
+    for offset in range(NGRAM_SIZE):
+        window = codes[offset:offset + length]
+        valid &= window != 0
+        hashes ^= window * _HASH_MULTIPLIERS[offset]
+    buckets = (hashes >> np.uint64(32)) % np.uint64(HASH_DIMENSIONS)
+
+    cells = rows[:length][valid].astype(np.int64) * HASH_DIMENSIONS + buckets[valid].astype(np.int64)
+    counts = np.bincount(cells, minlength=n_texts * HASH_DIMENSIONS).reshape(n_texts, HASH_DIMENSIONS)
+
+    document_frequency = np.count_nonzero(counts, axis=0)
+    idf = np.log((n_texts + 1) / (document_frequency + 1)) + 1
+    vectors = (np.log1p(counts) * idf).astype(np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-9)
+
+
+def _stem(text: str) -> str:
+    """Raíz de la primera palabra con contenido, sin tildes ("la célula" y "celular" -> "celul")"""
+    words = _WORD_RE.findall(text.lower())
+    word = next((word for word in words if word not in STOPWORDS), words[0] if words else "")
+    word = "".join(char for char in unicodedata.normalize("NFKD", word) if not unicodedata.combining(char))
+    return word[:STEM_CHARS]
+
+
+def pick_distractors(answers: Sequence[str], candidates: Sequence[str], contexts: Sequence[str],
+                     k: int = NUM_DISTRACTORS) -> List[List[str]]:
+    """Para cada respuesta, los 'k' candidatos más parecidos (coseno) que no la delatan ni la repiten.
+
+    Se descartan los que coinciden con la respuesta, la contienen o están contenidos en ella,
+    comparten raíz con ella u otro distractor, o ya aparecen en la pregunta ('contexts').
+    """
+    if not answers:
+        return []
+    vectors = char_ngram_vectors(list(answers) + list(candidates))
+    answer_vectors, candidate_vectors = vectors[:len(answers)], vectors[len(answers):]
+    lowered = [candidate.lower() for candidate in candidates]
+    stems = [_stem(candidate) for candidate in candidates]
+
+    results: List[List[str]] = []
+    neighbours = min(NEIGHBOURS, len(candidates))
+    for start in range(0, len(answers), SIMILARITY_BATCH):
+        similarity = answer_vectors[start:start + SIMILARITY_BATCH] @ candidate_vectors.T
+        if neighbours < len(candidates):
+            nearest = np.argpartition(-similarity, neighbours - 1, axis=1)[:, :neighbours]
+        else:
+            nearest = np.tile(np.arange(len(candidates)), (len(similarity), 1))
+
+        for row, answer in enumerate(answers[start:start + SIMILARITY_BATCH]):
+            answer_lower = answer.lower()
+            context = contexts[start + row].lower()
+            used_stems = {_stem(answer)}
+            chosen: List[str] = []
+
+            def consider(indices) -> None:
+                for index in indices:
+                    if len(chosen) >= k:
+                        return
+                    candidate = lowered[index]
+                    if candidate in answer_lower or answer_lower in candidate or stems[index] in used_stems \
+                            or candidate in context:
+                        continue
+                    used_stems.add(stems[index])
+                    chosen.append(candidates[index])
+
+            ranked = nearest[row][np.argsort(-similarity[row, nearest[row]], kind='stable')]
+            consider(ranked)
+            if len(chosen) < k and neighbours < len(candidates):
+                # Pocos vecinos válidos: se recorre la fila completa (poco frecuente)
+                consider(np.argsort(-similarity[row], kind='stable'))
+            results.append(chosen)
+    return results
+
+
+def _multiple_choice(question: str, answer: str, distractors: List[str], explanation: str,
+                     rng: random.Random) -> Dict[str, Any]:
+    options = [answer] + distractors
+    rng.shuffle(options)
+    return {
+        "Q": question,
+        "Options": options,
+        "Answer": chr(65 + options.index(answer)),
+        "Explanation": explanation,
+    }
+
+
+def build_multiple_choice(text: str, num_questions: int, topic: str = "",
+                          rng: Optional[random.Random] = None) -> List[Dict[str, Any]]:
+    """Preguntas de opción múltiple sin conexión sobre las oraciones más relevantes del material.
+
+    Las definiciones ("X es ...") se preguntan como "¿Qué es X?" con otras
+    definiciones como distractores; el resto, como oraciones para completar
+    con términos parecidos del mismo material como distractores.
+    """
+    rng = rng or random.Random()
+    sentences = split_sentences(text)
+    if not sentences or num_questions <= 0:
+        return []
+    stats = score_sentences(sentences, topic)
+    ranking = np.argsort(-stats.scores, kind='stable')
+
+    definitions = []   # (posición en el ranking, oración, término, definición, plural)
+    clozes = []        # (posición en el ranking, oración, inicio, fin)
+    used_terms: set = set()
+    questions: Dict[int, Dict[str, Any]] = {}
+    rank = 0
+    wanted = num_questions
+
+    # Algunas oraciones no dan pregunta (sin distractores suficientes): se siguen
+    # recorriendo por relevancia hasta tener las pedidas o agotar el material
+    while len(questions) < num_questions and rank < len(ranking):
+        while rank < len(ranking) and len(definitions) + len(clozes) < wanted:
+            sentence = sentences[ranking[rank]]
+            parts = definition_parts(sentence)
+            if parts is not None:
+                definitions.append((rank, sentence, *parts))
+            else:
+                _add_cloze(clozes, rank, sentence, stats, used_terms)
+            rank += 1
+        questions = _build_questions(definitions, clozes, stats, used_terms, rng)
+        wanted += 2 * (num_questions - len(questions))
+
+    # En el orden de relevancia de las oraciones
+    return [questions[rank] for rank in sorted(questions)][:num_questions]
+
+
+def _add_cloze(clozes: list, rank: int, sentence: str, stats, used_terms: set) -> None:
+    phrase = key_phrase(sentence, stats, used_terms)
+    if phrase is not None and phrase[1] - phrase[0] <= len(sentence) / 2:
+        used_terms.add(phrase[2])
+        clozes.append((rank, sentence, phrase[0], phrase[1]))
+
+
+def _build_questions(definitions: list, clozes: list, stats, used_terms: set,
+                     rng: random.Random) -> Dict[int, Dict[str, Any]]:
+    """Preguntas (por posición en el ranking) de las definiciones y huecos reunidos hasta ahora"""
+    # Con muy pocas definiciones no hay distractores del mismo tipo: se preguntan como huecos
+    if len(definitions) <= NUM_DISTRACTORS:
+        clozes = list(clozes)
+        used_terms = set(used_terms)
+        for rank, sentence, *_ in definitions:
+            _add_cloze(clozes, rank, sentence, stats, used_terms)
+        definitions = []
+
+    questions: Dict[int, Dict[str, Any]] = {}
+
+    if definitions:
+        texts = [definition for _, _, _, definition, _ in definitions]
+        prompts = [f"¿Qué {'son' if plural else 'es'} {term}?" for _, _, term, _, plural in definitions]
+        for (rank, sentence, _, definition, _), prompt, wrong in zip(
+                definitions, prompts, pick_distractors(texts, texts, prompts)):
+            if len(wrong) >= 2:
+                questions[rank] = _multiple_choice(prompt, definition, wrong, sentence, rng)
+
+    if clozes:
+        answers = [sentence[start:end] for _, sentence, start, end in clozes]
+        vocabulary = list(stats.vocabulary)
+        top_terms = [vocabulary[i] for i in np.argsort(-stats.weights, kind='stable')[:MAX_CANDIDATES]
+                     if stats.weights[i] > 0 and len(vocabulary[i]) >= 4]
+        candidates = list(dict.fromkeys(top_terms + answers))
+        contexts = [sentence for _, sentence, _, _ in clozes]
+        for (rank, sentence, start, end), answer, wrong in zip(
+                clozes, answers, pick_distractors(answers, candidates, contexts)):
+            if len(wrong) < 2:
+                continue
+            if answer[:1].isupper():
+                wrong = [option[:1].upper() + option[1:] for option in wrong]
+            prompt = f"Completa: {sentence[:start]}{CLOZE_BLANK}{sentence[end:]}"
+            questions[rank] = _multiple_choice(prompt, answer, wrong, sentence, rng)
+
+    return questions
@@ -0,0 +1,193 @@
+import re
+import unicodedata
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from .flashcard_store import FlashcardStore
+
+# Firma MinHash: NUM_BANDS bandas de ROWS_PER_BAND valores
+NUM_BANDS = 16
+ROWS_PER_BAND = 4
+NUM_PERMUTATIONS = NUM_BANDS * ROWS_PER_BAND
+
+# Longitud de los shingles de caracteres sobre el texto normalizado
+SHINGLE_SIZE = 4
+
+# Similitud (Jaccard estimada) a partir de la cual dos tarjetas se consideran repetidas
+DUPLICATE_THRESHOLD = 0.7
+
+# Tarjetas por tramo al calcular firmas en bloque
+SIGNATURE_CHUNK = 256
+
+# Semilla fija: las firmas guardadas deben seguir siendo comparables entre sesiones
+_rng = np.random.RandomState(20240601)
+# Permutaciones por multiplicación-desplazamiento: ((a * x + b) mod 2^64) >> 32, con 'a' impar
+_A = _rng.randint(0, 2 ** 63, size=NUM_PERMUTATIONS, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+_B = _rng.randint(0, 2 ** 63, size=NUM_PERMUTATIONS, dtype=np.uint64)
+_SHIFT = np.uint64(32)
+_BAND_SEEDS = _rng.randint(1, 2 ** 62, size=NUM_BANDS, dtype=np.uint64)
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+_COMBINING_MARKS = re.compile(r"[\u0300-\u036f]")
+# Puntuación y espacios se reducen a un único espacio
+_SEPARATORS = re.compile(r"[\W_]+")
+
+
+def normalize_card_text(text: str) -> str:
+    """Minúsculas, sin tildes, sin puntuación y con espacios simples"""
+    text = text.lower()
+    if not text.isascii():
+        text = _COMBINING_MARKS.sub("", unicodedata.normalize('NFKD', text))
+    return _SEPARATORS.sub(" ", text).strip()
+
+
+def card_shingles(card: Dict[str, Any]) -> np.ndarray:
+    """Shingles de pregunta + respuesta, cada uno como entero de 32 bits (sus 4 bytes)"""
+    data = np.frombuffer(normalize_card_text(f"{card['Q']} {card['A']}").encode('utf-8'), dtype=np.uint8)
+    if len(data) < SHINGLE_SIZE:
+        data = np.concatenate([data, np.zeros(SHINGLE_SIZE - len(data), dtype=np.uint8)])
+    # Ventanas deslizantes de 4 bytes empaquetadas en un entero, sin bucle en Python
+    data = data.astype(np.uint64)
+    end = len(data) - SHINGLE_SIZE + 1
+    packed = (data[:end] << np.uint64(24)) | (data[1:end + 1] << np.uint64(16)) \
+        | (data[2:end + 2] << np.uint64(8)) | data[3:end + 3]
+    return np.unique(packed)
+
+
+def minhash_signatures(shingle_sets: List[np.ndarray]) -> np.ndarray:
+    """Firmas de muchas tarjetas a la vez (filas), por tramos para acotar la memoria"""
+    signatures = np.empty((len(shingle_sets), NUM_PERMUTATIONS), dtype=np.uint32)
+    for start in range(0, len(shingle_sets), SIGNATURE_CHUNK):
+        chunk = shingle_sets[start:start + SIGNATURE_CHUNK]
+        lengths = np.array([len(shingles) for shingles in chunk])
+        with np.errstate(over='ignore'):
+            hashed = ((_A[:, None] * np.concatenate(chunk)[None, :] + _B[:, None]) >> _SHIFT).astype(np.uint32)
+        # Mínimo por tarjeta: cada segmento de columnas corresponde a una tarjeta
+        offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+        signatures[start:start + len(chunk)] = np.minimum.reduceat(hashed, offsets, axis=1).T
+    return signatures
+
+
+def band_buckets(signature: np.ndarray) -> List[int]:
+    """Una cubeta por banda; dos tarjetas son candidatas si coinciden en alguna"""
+    # Mezcla polinómica de las filas de cada banda (aritmética módulo 2^64); el número
+    # de banda entra en la mezcla para que bandas distintas no compartan cubetas
+    with np.errstate(over='ignore'):
+        rows = signature.reshape(NUM_BANDS, ROWS_PER_BAND).astype(np.uint64)
+        mixed = _BAND_SEEDS.copy()
+        for column in range(ROWS_PER_BAND):
+            mixed = mixed * _MIX + rows[:, column]
+    return mixed.view(np.int64).tolist()
+
+
+def signature_similarity(first: np.ndarray, second: np.ndarray) -> float:
+    """Jaccard estimada: fracción de permutaciones con el mismo mínimo"""
+    return float(np.mean(first == second))
+
+
+class FlashcardDeduplicator:
+    """Detecta tarjetas casi repetidas con MinHash + LSH sobre todos los mazos guardados"""
+
+    def __init__(self, store: FlashcardStore, threshold: float = DUPLICATE_THRESHOLD):
+        self.store = store
+        self.threshold = threshold
+        self._indexed = False
+
+    def ensure_index(self) -> None:
+        """Calcula las firmas que falten (tarjetas importadas o de versiones anteriores)"""
+        if self._indexed:
+            return
+        missing = self.store.cards_without_signature()
+        if len(missing) > 1000:
+            print(f"🔍 Indexando {len(missing)} flashcards para detectar repetidas...")
+        self.index_cards(missing)
+        self._indexed = True
+
+    def index_cards(self, cards: List[Dict[str, Any]]) -> None:
+        """Guarda firma y cubetas de tarjetas ya guardadas (con 'id')"""
+        signatures = minhash_signatures([card_shingles(card) for card in cards])
+        entries = [(card["id"], signature.tobytes(), band_buckets(signature))
+                   for card, signature in zip(cards, signatures)]
+        if entries:
+            self.store.save_signatures(entries)
+
+    def find_duplicates(self, cards: List[Dict[str, Any]]) -> List[Optional[Tuple[str, Any, float]]]:
+        """Para cada tarjeta nueva, la repetida más parecida o None.
+
+        Devuelve ("guardada", id, similitud) si coincide con una tarjeta ya guardada
+        o ("lote", índice, similitud) si repite una tarjeta anterior del mismo lote.
+        """
+        self.ensure_index()
+
+        signatures = minhash_signatures([card_shingles(card) for card in cards])
+        buckets = [band_buckets(signature) for signature in signatures]
+
+        # Una sola consulta por índice para las cubetas de todo el lote
+        stored = self.store.cards_in_buckets([bucket for card_buckets in buckets for bucket in card_buckets])
+        candidate_ids = {card_id for ids in stored.values() for card_id in ids}
+        stored_signatures = {
+            card_id: np.frombuffer(blob, dtype=np.uint32)
+            for card_id, blob in self.store.get_signatures(list(candidate_ids)).items()
+        }
+
+        batch_buckets: Dict[int, List[int]] = {}
+        results: List[Optional[Tuple[str, Any, float]]] = []
+        for index, (signature, card_buckets) in enumerate(zip(signatures, buckets)):
+            best: Optional[Tuple[str, Any, float]] = None
+
+            for card_id in {card_id for bucket in card_buckets for card_id in stored.get(bucket, [])}:
+                if card_id in stored_signatures:
+                    similarity = signature_similarity(signature, stored_signatures[card_id])
+                    if similarity >= self.threshold and (best is None or similarity > best[2]):
+                        best = ("guardada", card_id, similarity)
+
+            for other in {other for bucket in card_buckets for other in batch_buckets.get(bucket, [])}:
+                similarity = signature_similarity(signature, signatures[other])
+                if similarity >= self.threshold and (best is None or similarity > best[2]):
+                    best = ("lote", other, similarity)
+
+            results.append(best)
+            if best is None or best[0] != "lote":
+                # Solo las tarjetas que se quedan en el lote sirven de referencia a las siguientes
+                for bucket in card_buckets:
+                    batch_buckets.setdefault(bucket, []).append(index)
+
+        return results
+
+
+def merge_answers(kept: str, incoming: str) -> str:
+    """Respuesta combinada: se conserva la más completa de las dos"""
+    if normalize_card_text(incoming) in normalize_card_text(kept):
+        return kept
+    if normalize_card_text(kept) in normalize_card_text(incoming):
+        return incoming
+    return incoming if len(incoming) > len(kept) else kept
+
+
+def unique_cards(cards: List[Dict[str, Any]], threshold: float = DUPLICATE_THRESHOLD) -> List[Dict[str, Any]]:
+    """Quita las tarjetas casi repetidas dentro de una lista (conserva la primera, con la respuesta más completa)"""
+    if not cards:
+        return []
+
+    signatures = minhash_signatures([card_shingles(card) for card in cards])
+    buckets: Dict[int, List[int]] = {}
+    kept: List[Dict[str, Any]] = []
+    kept_index: Dict[int, int] = {}
+
+    for index, signature in enumerate(signatures):
+        card_buckets = band_buckets(signature)
+        duplicate_of = None
+        for other in {other for bucket in card_buckets for other in buckets.get(bucket, [])}:
+            if signature_similarity(signature, signatures[other]) >= threshold:
+                duplicate_of = other
+                break
+
+        if duplicate_of is None:
+            kept_index[index] = len(kept)
+            kept.append(dict(cards[index]))
+            for bucket in card_buckets:
+                buckets.setdefault(bucket, []).append(index)
+        else:
+            target = kept[kept_index[duplicate_of]]
+            target['A'] = merge_answers(target['A'], cards[index]['A'])
+
+    return kept
@@ -0,0 +1,196 @@
+import os
+import csv
+import html
+import json
+import time
+import sqlite3
+import hashlib
+import tempfile
+import zipfile
+from typing import Any, Dict, Iterator, Optional, Tuple
+from .flashcard_store import FlashcardStore
+
+# Identificadores fijos: al reimportar en Anki las notas se actualizan en vez de duplicarse
+ANKI_MODEL_ID = 1607392319
+ANKI_DECK_ID_BASE = 1 << 40
+ANKI_NOTE_ID_BASE = 1 << 41
+ANKI_DECK_PREFIX = "StudyBox"
+
+# Separador de campos de las notas de Anki
+_FIELD_SEPARATOR = "\x1f"
+
+_ANKI_SCHEMA = """
+    CREATE TABLE col (
+        id integer primary key, crt integer not null, mod integer not null, scm integer not null,
+        ver integer not null, dty integer not null, usn integer not null, ls integer not null,
+        conf text not null, models text not null, decks text not null, dconf text not null, tags text not null
+    );
+    CREATE TABLE notes (
+        id integer primary key, guid text not null, mid integer not null, mod integer not null,
+        usn integer not null, tags text not null, flds text not null, sfld integer not null,
+        csum integer not null, flags integer not null, data text not null
+    );
+    CREATE TABLE cards (
+        id integer primary key, nid integer not null, did integer not null, ord integer not null,
+        mod integer not null, usn integer not null, type integer not null, queue integer not null,
+        due integer not null, ivl integer not null, factor integer not null, reps integer not null,
+        lapses integer not null, left integer not null, odue integer not null, odid integer not null,
+        flags integer not null, data text not null
+    );
+    CREATE TABLE revlog (
+        id integer primary key, cid integer not null, usn integer not null, ease integer not null,
+        ivl integer not null, lastIvl integer not null, factor integer not null, time integer not null,
+        type integer not null
+    );
+    CREATE TABLE graves (usn integer not null, oid integer not null, type integer not null);
+"""
+
+# Los índices se crean al final: insertar primero y ordenar una vez es más rápido
+_ANKI_INDEXES = """
+    CREATE INDEX ix_notes_usn on notes (usn);
+    CREATE INDEX ix_cards_usn on cards (usn);
+    CREATE INDEX ix_revlog_usn on revlog (usn);
+    CREATE INDEX ix_cards_nid on cards (nid);
+    CREATE INDEX ix_cards_sched on cards (did, queue, due);
+    CREATE INDEX ix_revlog_cid on revlog (cid);
+    CREATE INDEX ix_notes_csum on notes (csum);
+"""
+
+
+def export_csv(store: FlashcardStore, path: str, deck_id: Optional[int] = None) -> int:
+    """Escribe las tarjetas como CSV fila a fila; devuelve cuántas se exportaron"""
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Pregunta', 'Respuesta', 'Mazo'])
+        for card in store.iter_cards(deck_id):
+            writer.writerow([card['Q'], card['A'], card['deck']])
+            count += 1
+    return count
+
+
+def _anki_deck_id(deck_id: int) -> int:
+    return ANKI_DECK_ID_BASE + deck_id
+
+
+def _anki_field(text: str) -> str:
+    # Los campos de Anki son HTML
+    return html.escape(text).replace("\n", "<br>")
+
+
+def _anki_rows(cards: Iterator[Dict[str, Any]], now: int) -> Iterator[Tuple[tuple, tuple]]:
+    """Nota y tarjeta de Anki para cada flashcard (nuevas, en el orden del mazo)"""
+    for due, card in enumerate(cards):
+        note_id = ANKI_NOTE_ID_BASE + card["id"]
+        question = _anki_field(card["Q"])
+        guid = hashlib.sha1(f"studybox-{card['id']}".encode('utf-8')).hexdigest()[:16]
+        checksum = int(hashlib.sha1(card["Q"].encode('utf-8')).hexdigest()[:8], 16)
+        note = (note_id, guid, ANKI_MODEL_ID, now, -1, "studybox",
+                question + _FIELD_SEPARATOR + _anki_field(card["A"]), question, checksum, 0, "")
+        anki_card = (note_id, note_id, _anki_deck_id(card["deck_id"]), 0, now, -1,
+                     0, 0, due, 0, 0, 0, 0, 0, 0, 0, 0, "")
+        yield note, anki_card
+
+
+def _anki_collection(decks: Dict[int, str], now: int) -> tuple:
+    """Fila 'col' con el modelo Pregunta/Respuesta y un mazo de Anki por cada mazo exportado"""
+    model = {
+        "id": ANKI_MODEL_ID, "name": "StudyBox Pregunta/Respuesta", "type": 0, "mod": now, "usn": -1,
+        "sortf": 0, "did": _anki_deck_id(next(iter(decks))) if decks else 1, "tags": [], "vers": [],
+        "flds": [
+            {"name": "Pregunta", "ord": 0, "sticky": False, "rtl": False, "font": "Arial", "size": 20, "media": []},
+            {"name": "Respuesta", "ord": 1, "sticky": False, "rtl": False, "font": "Arial", "size": 20, "media": []},
+        ],
+        "tmpls": [{
+            "name": "Tarjeta 1", "ord": 0, "qfmt": "{{Pregunta}}",
+            "afmt": "{{FrontSide}}<hr id=answer>{{Respuesta}}", "did": None, "bqfmt": "", "bafmt": "",
+        }],
+        "req": [[0, "all", [0]]],
+        "css": ".card { font-family: arial; font-size: 20px; text-align: center; color: black; background-color: white; }",
+        "latexPre": "\\documentclass[12pt]{article}\n\\special{papersize=3in,5in}\n\\usepackage[utf8]{inputenc}\n"
+                    "\\usepackage{amssymb,amsmath}\n\\pagestyle{empty}\n\\setlength{\\parindent}{0in}\n\\begin{document}\n",
+        "latexPost": "\\end{document}",
+    }
+
+    def deck_entry(anki_id: int, name: str) -> Dict[str, Any]:
+        return {
+            "id": anki_id, "name": name, "desc": "", "mod": now, "usn": -1, "conf": 1, "dyn": 0,
+            "collapsed": False, "extendNew": 10, "extendRev": 50,
+            "newToday": [0, 0], "revToday": [0, 0], "lrnToday": [0, 0], "timeToday": [0, 0],
+        }
+
+    anki_decks = {"1": deck_entry(1, "Default")}
+    for deck_id, name in decks.items():
+        anki_id = _anki_deck_id(deck_id)
+        anki_decks[str(anki_id)] = deck_entry(anki_id, f"{ANKI_DECK_PREFIX}::{name}")
+
+    conf = {
+        "nextPos": 1, "estTimes": True, "activeDecks": [1], "sortType": "noteFld", "timeLim": 0,
+        "sortBackwards": False, "addToCur": True, "curDeck": 1, "newBury": True, "newSpread": 0,
+        "dueCounts": True, "curModel": str(ANKI_MODEL_ID), "collapseTime": 1200,
+    }
+    dconf = {"1": {
+        "id": 1, "name": "Default", "mod": 0, "usn": 0, "maxTaken": 60, "autoplay": True, "timer": 0,
+        "replayq": True, "dyn": False,
+        "new": {"delays": [1, 10], "ints": [1, 4, 7], "initialFactor": 2500, "order": 1, "perDay": 20,
+                "separate": True, "bury": True},
+        "lapse": {"delays": [10], "mult": 0, "minInt": 1, "leechFails": 8, "leechAction": 0},
+        "rev": {"perDay": 100, "ease4": 1.3, "fuzz": 0.05, "minSpace": 1, "ivlFct": 1, "maxIvl": 36500,
+                "bury": True},
+    }}
+    return (1, now, now * 1000, now * 1000, 11, 0, 0, 0, json.dumps(conf),
+            json.dumps({str(ANKI_MODEL_ID): model}), json.dumps(anki_decks), json.dumps(dconf), "{}")
+
+
+def export_apkg(store: FlashcardStore, path: str, deck_id: Optional[int] = None) -> int:
+    """Escribe un paquete de Anki (.apkg): colección SQLite + índice de medios, en un zip.
+
+    Las tarjetas pasan del almacén a la colección por un cursor, así que la
+    memoria no depende del tamaño del mazo; la colección se arma en un archivo
+    temporal y se comprime por bloques.
+    """
+    now = int(time.time())
+    decks = {deck["id"]: deck["name"] for deck in store.get_decks(deck_id)}
+
+    fd, collection_path = tempfile.mkstemp(suffix=".anki2", dir=os.path.dirname(os.path.abspath(path)))
+    os.close(fd)
+    count = 0
+    try:
+        conn = sqlite3.connect(collection_path)
+        try:
+            # Archivo temporal: no hace falta diario ni sincronizar con el disco
+            conn.execute("PRAGMA journal_mode=OFF")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.executescript(_ANKI_SCHEMA)
+            conn.execute("INSERT INTO col VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                         _anki_collection(decks, now))
+
+            batch_notes, batch_cards = [], []
+            for note, anki_card in _anki_rows(store.iter_cards(deck_id), now):
+                batch_notes.append(note)
+                batch_cards.append(anki_card)
+                if len(batch_notes) >= 1000:
+                    conn.executemany("INSERT INTO notes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", batch_notes)
+                    conn.executemany("INSERT INTO cards VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                     batch_cards)
+                    count += len(batch_notes)
+                    batch_notes, batch_cards = [], []
+            if batch_notes:
+                conn.executemany("INSERT INTO notes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", batch_notes)
+                conn.executemany("INSERT INTO cards VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                 batch_cards)
+                count += len(batch_notes)
+
+            conn.executescript(_ANKI_INDEXES)
+            conn.commit()
+        finally:
+            conn.close()
+
+        with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as package:
+            package.write(collection_path, "collection.anki2")
+            # Sin imágenes ni audio: índice de medios vacío
+            package.writestr("media", "{}")
+    finally:
+        os.remove(collection_path)
+
+    return count
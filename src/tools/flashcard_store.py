@@ -0,0 +1,412 @@
+import os
+import json
+import sqlite3
+import hashlib
+import threading
+import datetime
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+from .search_index import FTS_TOKENIZER, HIGHLIGHT_OPEN, HIGHLIGHT_CLOSE, SEARCH_LIMIT, build_fts_query, fts5_available
+
+
+class FlashcardStore:
+    """Almacén SQLite de mazos, tarjetas, estado de repaso y material de origen"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        if db_path is None:
+            storage_dir = os.path.join(os.path.dirname(__file__), "..", "storage")
+            os.makedirs(storage_dir, exist_ok=True)
+            db_path = os.path.join(storage_dir, "flashcards.db")
+
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self.search_available = False
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Conexión corta por operación, igual que la cola de trabajos de audio
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    def _init_db(self) -> None:
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS decks (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name TEXT NOT NULL,
+                    source_file TEXT UNIQUE,
+                    subject TEXT,
+                    created_at TEXT NOT NULL
+                );
+
+                CREATE TABLE IF NOT EXISTS cards (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    deck_id INTEGER NOT NULL REFERENCES decks(id) ON DELETE CASCADE,
+                    position INTEGER NOT NULL,
+                    question TEXT NOT NULL,
+                    answer TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_cards_deck ON cards(deck_id, position);
+
+                CREATE TABLE IF NOT EXISTS card_state (
+                    card_id INTEGER PRIMARY KEY REFERENCES cards(id) ON DELETE CASCADE,
+                    ease REAL NOT NULL,
+                    interval INTEGER NOT NULL,
+                    reps INTEGER NOT NULL,
+                    lapses INTEGER NOT NULL,
+                    due REAL NOT NULL,
+                    last_review REAL
+                );
+                CREATE INDEX IF NOT EXISTS idx_card_state_due ON card_state(due);
+
+                CREATE TABLE IF NOT EXISTS reviews (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    card_id INTEGER NOT NULL REFERENCES cards(id) ON DELETE CASCADE,
+                    reviewed_at REAL NOT NULL,
+                    quality INTEGER NOT NULL,
+                    interval INTEGER NOT NULL,
+                    ease REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_reviews_card ON reviews(card_id, reviewed_at);
+
+                CREATE TABLE IF NOT EXISTS sources (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    fingerprint TEXT NOT NULL UNIQUE,
+                    preview TEXT NOT NULL,
+                    created_at TEXT NOT NULL
+                );
+
+                CREATE TABLE IF NOT EXISTS deck_sources (
+                    deck_id INTEGER NOT NULL REFERENCES decks(id) ON DELETE CASCADE,
+                    source_id INTEGER NOT NULL REFERENCES sources(id) ON DELETE CASCADE,
+                    PRIMARY KEY (deck_id, source_id)
+                );
+
+                CREATE TABLE IF NOT EXISTS card_signatures (
+                    card_id INTEGER PRIMARY KEY REFERENCES cards(id) ON DELETE CASCADE,
+                    signature BLOB NOT NULL
+                );
+
+                CREATE TABLE IF NOT EXISTS lsh_buckets (
+                    bucket INTEGER NOT NULL,
+                    card_id INTEGER NOT NULL REFERENCES cards(id) ON DELETE CASCADE
+                );
+                CREATE INDEX IF NOT EXISTS idx_lsh_bucket ON lsh_buckets(bucket);
+                CREATE INDEX IF NOT EXISTS idx_lsh_card ON lsh_buckets(card_id);
+            """)
+            if "subject" not in {row[1] for row in conn.execute("PRAGMA table_info(decks)")}:
+                # Bases creadas antes de guardar el tema de estudio de cada mazo
+                conn.execute("ALTER TABLE decks ADD COLUMN subject TEXT")
+
+            self.search_available = fts5_available(conn)
+            if not self.search_available:
+                # Sin FTS5 los triggers fallarían en cada escritura: se quitan y el índice se reconstruye después
+                conn.executescript("""
+                    DROP TRIGGER IF EXISTS cards_fts_insert;
+                    DROP TRIGGER IF EXISTS cards_fts_delete;
+                    DROP TRIGGER IF EXISTS cards_fts_update;
+                """)
+                return
+
+            has_triggers = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'cards_fts_insert'"
+            ).fetchone() is not None
+            # Índice de texto completo sobre las tarjetas, mantenido por triggers
+            conn.executescript(f"""
+                CREATE VIRTUAL TABLE IF NOT EXISTS cards_fts USING fts5(
+                    question, answer, content='cards', content_rowid='id', tokenize='{FTS_TOKENIZER}'
+                );
+
+                CREATE TRIGGER IF NOT EXISTS cards_fts_insert AFTER INSERT ON cards BEGIN
+                    INSERT INTO cards_fts(rowid, question, answer) VALUES (new.id, new.question, new.answer);
+                END;
+                CREATE TRIGGER IF NOT EXISTS cards_fts_delete AFTER DELETE ON cards BEGIN
+                    INSERT INTO cards_fts(cards_fts, rowid, question, answer)
+                    VALUES ('delete', old.id, old.question, old.answer);
+                END;
+                CREATE TRIGGER IF NOT EXISTS cards_fts_update AFTER UPDATE OF question, answer ON cards BEGIN
+                    INSERT INTO cards_fts(cards_fts, rowid, question, answer)
+                    VALUES ('delete', old.id, old.question, old.answer);
+                    INSERT INTO cards_fts(rowid, question, answer) VALUES (new.id, new.question, new.answer);
+                END;
+            """)
+            if not has_triggers:
+                # Bases creadas antes del índice (o editadas sin FTS5): se indexan las tarjetas existentes
+                conn.execute("INSERT INTO cards_fts(cards_fts) VALUES ('rebuild')")
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.datetime.now().isoformat(timespec="seconds")
+
+    @staticmethod
+    def fingerprint(text: str) -> str:
+        """Huella del material de origen (mismo texto -> misma huella)"""
+        return hashlib.sha1(text.strip().encode('utf-8')).hexdigest()
+
+    # Mazos y tarjetas
+    def create_deck(self, name: str, cards: List[Dict[str, str]], sources: Optional[List[str]] = None,
+                    source_file: Optional[str] = None, subject: Optional[str] = None) -> int:
+        """Crea un mazo con sus tarjetas (y los textos de los que salió) en una transacción"""
+        now = self._now()
+        with self._lock, self._connect() as conn:
+            return self._insert_deck(conn, name, cards, sources or [], source_file, now, subject)
+
+    def _insert_deck(self, conn: sqlite3.Connection, name: str, cards: List[Dict[str, str]],
+                     sources: List[str], source_file: Optional[str], now: str,
+                     subject: Optional[str] = None) -> int:
+        deck_id = conn.execute(
+            "INSERT INTO decks (name, source_file, subject, created_at) VALUES (?, ?, ?, ?)",
+            (name, source_file, subject, now)
+        ).lastrowid
+        conn.executemany(
+            "INSERT INTO cards (deck_id, position, question, answer, updated_at) VALUES (?, ?, ?, ?, ?)",
+            [(deck_id, i, card["Q"], card["A"], now) for i, card in enumerate(cards)]
+        )
+
+        for text in sources:
+            fingerprint = self.fingerprint(text)
+            conn.execute(
+                "INSERT OR IGNORE INTO sources (fingerprint, preview, created_at) VALUES (?, ?, ?)",
+                (fingerprint, text.strip()[:200], now)
+            )
+            conn.execute(
+                "INSERT OR IGNORE INTO deck_sources (deck_id, source_id) "
+                "SELECT ?, id FROM sources WHERE fingerprint = ?",
+                (deck_id, fingerprint)
+            )
+        return deck_id
+
+    def get_deck_cards(self, deck_id: int) -> List[Dict[str, Any]]:
+        """Tarjetas del mazo en orden, con su id para editarlas o repasarlas"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT c.id, c.question, c.answer, d.name AS deck, d.subject FROM cards c "
+                "JOIN decks d ON d.id = c.deck_id WHERE c.deck_id = ? ORDER BY c.position", (deck_id,)
+            ).fetchall()
+        return [self._card_row(row) for row in rows]
+
+    def iter_cards(self, deck_id: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """Recorre las tarjetas (de un mazo o de todos) sin cargarlas en memoria"""
+        conn = self._connect()
+        try:
+            query = ("SELECT c.id, c.question, c.answer, c.position, d.id AS deck_id, d.name AS deck "
+                     "FROM cards c JOIN decks d ON d.id = c.deck_id")
+            if deck_id is None:
+                rows = conn.execute(query + " ORDER BY c.deck_id, c.position")
+            else:
+                rows = conn.execute(query + " WHERE c.deck_id = ? ORDER BY c.position", (deck_id,))
+            for row in rows:
+                yield {"id": row["id"], "Q": row["question"], "A": row["answer"], "position": row["position"],
+                       "deck_id": row["deck_id"], "deck": row["deck"]}
+        finally:
+            conn.close()
+
+    def get_decks(self, deck_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        with self._connect() as conn:
+            if deck_id is None:
+                rows = conn.execute("SELECT id, name FROM decks ORDER BY id").fetchall()
+            else:
+                rows = conn.execute("SELECT id, name FROM decks WHERE id = ?", (deck_id,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_card(self, card_id: int) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT c.id, c.question, c.answer, d.name AS deck, d.subject FROM cards c "
+                "JOIN decks d ON d.id = c.deck_id WHERE c.id = ?", (card_id,)
+            ).fetchone()
+        return self._card_row(row) if row is not None else None
+
+    @staticmethod
+    def _card_row(row: sqlite3.Row) -> Dict[str, Any]:
+        # El tema de estudio solo se conoce en los mazos generados desde la app
+        return {"id": row["id"], "Q": row["question"], "A": row["answer"], "deck": row["deck"],
+                "subject": row["subject"] or "general"}
+
+    def search_cards(self, text: str, limit: int = SEARCH_LIMIT) -> List[Dict[str, Any]]:
+        """Tarjetas que coinciden con el texto, de la más a la menos relevante (BM25)"""
+        query = build_fts_query(text)
+        if query is None or not self.search_available:
+            return []
+        with self._connect() as conn:
+            rows = conn.execute(f"""
+                SELECT c.id, d.name AS deck,
+                       highlight(cards_fts, 0, '{HIGHLIGHT_OPEN}', '{HIGHLIGHT_CLOSE}') AS question,
+                       snippet(cards_fts, 1, '{HIGHLIGHT_OPEN}', '{HIGHLIGHT_CLOSE}', '…', 16) AS answer
+                FROM cards_fts
+                JOIN cards c ON c.id = cards_fts.rowid
+                JOIN decks d ON d.id = c.deck_id
+                WHERE cards_fts MATCH ? ORDER BY rank LIMIT ?
+            """, (query, limit)).fetchall()
+        return [dict(row) for row in rows]
+
+    def update_card(self, card_id: int, question: Optional[str] = None, answer: Optional[str] = None) -> bool:
+        """Edita una sola tarjeta (una fila) sin reescribir el mazo"""
+        with self._lock, self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE cards SET question = COALESCE(?, question), answer = COALESCE(?, answer), "
+                "updated_at = ? WHERE id = ?",
+                (question, answer, self._now(), card_id)
+            )
+            return cursor.rowcount > 0
+
+    def list_decks(self, now: float) -> List[Dict[str, Any]]:
+        """Mazos con número de tarjetas y pendientes, calculados por la base de datos"""
+        with self._connect() as conn:
+            rows = conn.execute("""
+                SELECT d.id, d.name, d.created_at,
+                       COUNT(c.id) AS card_count,
+                       COALESCE(SUM(s.due <= ?), 0) AS due_count,
+                       COALESCE(SUM(s.card_id IS NULL AND c.id IS NOT NULL), 0) AS new_count
+                FROM decks d
+                LEFT JOIN cards c ON c.deck_id = d.id
+                LEFT JOIN card_state s ON s.card_id = c.id
+                GROUP BY d.id ORDER BY d.id
+            """, (now,)).fetchall()
+        return [dict(row) for row in rows]
+
+    # Estado de repaso
+    def get_state(self, card_id: int) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT ease, interval, reps, lapses, due, last_review FROM card_state WHERE card_id = ?",
+                (card_id,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def record_review(self, card_id: int, state: Dict[str, Any], quality: int) -> None:
+        """Guarda el nuevo estado y el registro de la respuesta en una transacción"""
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO card_state (card_id, ease, interval, reps, lapses, due, last_review) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (card_id, state["ease"], state["interval"], state["reps"], state["lapses"],
+                 state["due"], state["last_review"])
+            )
+            conn.execute(
+                "INSERT INTO reviews (card_id, reviewed_at, quality, interval, ease) VALUES (?, ?, ?, ?, ?)",
+                (card_id, state["last_review"], quality, state["interval"], state["ease"])
+            )
+
+    def due_card_batch(self, now: float, after: Optional[Tuple[float, int]] = None,
+                       limit: int = 100) -> List[Dict[str, Any]]:
+        """Siguiente lote de tarjetas vencidas por fecha (índice sobre due), con su contenido.
+
+        'after' es la (fecha, id) de la última tarjeta del lote anterior: se sigue desde ahí.
+        """
+        after_due, after_id = after if after is not None else (float("-inf"), 0)
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT c.id, c.question, c.answer, d.name AS deck, d.subject, s.due FROM card_state s "
+                "JOIN cards c ON c.id = s.card_id JOIN decks d ON d.id = c.deck_id "
+                "WHERE s.due <= ? AND (s.due, s.card_id) > (?, ?) ORDER BY s.due, s.card_id LIMIT ?",
+                (now, after_due, after_id, limit)
+            ).fetchall()
+        return [dict(self._card_row(row), due=row["due"]) for row in rows]
+
+    def new_cards(self, limit: int) -> List[Dict[str, Any]]:
+        """Hasta 'limit' tarjetas nunca repasadas, en el orden de los mazos, con su contenido"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT c.id, c.question, c.answer, d.name AS deck, d.subject FROM cards c "
+                "JOIN decks d ON d.id = c.deck_id LEFT JOIN card_state s ON s.card_id = c.id "
+                "WHERE s.card_id IS NULL ORDER BY c.deck_id, c.position LIMIT ?", (limit,)
+            ).fetchall()
+        return [self._card_row(row) for row in rows]
+
+    def count_cards(self, now: float) -> Dict[str, int]:
+        with self._connect() as conn:
+            total = conn.execute("SELECT COUNT(*) FROM cards").fetchone()[0]
+            due = conn.execute("SELECT COUNT(*) FROM card_state WHERE due <= ?", (now,)).fetchone()[0]
+            scheduled = conn.execute("SELECT COUNT(*) FROM card_state").fetchone()[0]
+        return {"total": total, "due": due, "new": total - scheduled}
+
+    # Firmas MinHash y cubetas LSH para detectar tarjetas casi repetidas
+    def save_signatures(self, entries: List[Tuple[int, bytes, List[int]]]) -> None:
+        """Guarda (o reemplaza) la firma y las cubetas de cada tarjeta"""
+        with self._lock, self._connect() as conn:
+            conn.executemany("DELETE FROM lsh_buckets WHERE card_id = ?", [(card_id,) for card_id, _, _ in entries])
+            conn.executemany(
+                "INSERT OR REPLACE INTO card_signatures (card_id, signature) VALUES (?, ?)",
+                [(card_id, signature) for card_id, signature, _ in entries]
+            )
+            conn.executemany(
+                "INSERT INTO lsh_buckets (bucket, card_id) VALUES (?, ?)",
+                [(bucket, card_id) for card_id, _, buckets in entries for bucket in buckets]
+            )
+
+    def cards_in_buckets(self, buckets: List[int]) -> Dict[int, List[int]]:
+        """Tarjetas que comparten cada cubeta (búsqueda por índice, sin recorrer todas)"""
+        result: Dict[int, List[int]] = {}
+        if not buckets:
+            return result
+        with self._connect() as conn:
+            unique = list(set(buckets))
+            # SQLite limita la cantidad de parámetros por consulta
+            for start in range(0, len(unique), 500):
+                chunk = unique[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT bucket, card_id FROM lsh_buckets WHERE bucket IN ({','.join('?' * len(chunk))})",
+                    chunk
+                )
+                for bucket, card_id in rows:
+                    result.setdefault(bucket, []).append(card_id)
+        return result
+
+    def get_signatures(self, card_ids: List[int]) -> Dict[int, bytes]:
+        result: Dict[int, bytes] = {}
+        with self._connect() as conn:
+            unique = list(set(card_ids))
+            for start in range(0, len(unique), 500):
+                chunk = unique[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT card_id, signature FROM card_signatures WHERE card_id IN ({','.join('?' * len(chunk))})",
+                    chunk
+                )
+                result.update({card_id: signature for card_id, signature in rows})
+        return result
+
+    def cards_without_signature(self) -> List[Dict[str, Any]]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT c.id, c.question, c.answer FROM cards c "
+                "LEFT JOIN card_signatures s ON s.card_id = c.id WHERE s.card_id IS NULL"
+            ).fetchall()
+        return [{"id": row["id"], "Q": row["question"], "A": row["answer"]} for row in rows]
+
+    # Importación de los mazos JSON anteriores
+    def import_json_decks(self, decks_dir: str) -> int:
+        """Importa una sola vez cada mazo JSON"""
+        if not os.path.isdir(decks_dir):
+            return 0
+
+        with self._connect() as conn:
+            imported = {row[0] for row in conn.execute("SELECT source_file FROM decks WHERE source_file IS NOT NULL")}
+
+        pending = sorted(f for f in os.listdir(decks_dir) if f.endswith('.json') and f not in imported)
+        if not pending:
+            return 0
+
+        count = 0
+        for filename in pending:
+            try:
+                with open(os.path.join(decks_dir, filename), 'r', encoding='utf-8') as f:
+                    deck = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ No se pudo importar {filename}: {e}")
+                continue
+
+            cards = [card for card in deck if isinstance(card, dict) and "Q" in card and "A" in card] \
+                if isinstance(deck, list) else []
+            created_at = datetime.datetime.fromtimestamp(
+                os.path.getmtime(os.path.join(decks_dir, filename))
+            ).isoformat(timespec="seconds")
+
+            with self._lock, self._connect() as conn:
+                self._insert_deck(conn, os.path.splitext(filename)[0], cards, [], filename, created_at)
+            count += 1
+
+        return count
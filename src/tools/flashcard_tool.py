@@ -1,11 +1,37 @@
 import os
-import json
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Dict, Any, Optional
 import google.generativeai as genai
 from dotenv import load_dotenv
+from .ai_json import parse_ai_items, response_chunks
+from .flashcard_store import FlashcardStore
+from .flashcard_dedup import FlashcardDeduplicator, merge_answers, unique_cards
+from .flashcard_export import export_apkg, export_csv
+from .local_flashcards import generate_local_flashcards
+from .search_index import FTS_UNAVAILABLE_MESSAGE
+from .spaced_repetition import SpacedRepetitionScheduler, GRADES, DAY_SECONDS
+from .study_log import KIND_FLASHCARD, get_study_log, subject_label
 
 load_dotenv()
 
+# Tamaño de cada parte del material enviada en una petición (presupuesto del prompt)
+CHUNK_CHARS = 8000
+# Una flashcard por cada tanto texto, con mínimo y máximo por parte
+CHARS_PER_CARD = 1000
+MIN_CARDS_PER_CHUNK = 2
+MAX_CARDS_PER_CHUNK = 12
+# Peticiones simultáneas a la IA al cubrir todo el material
+AI_CONCURRENCY = max(1, int(os.getenv('STUDYBOX_AI_CONCURRENCY', '8')))
+
+# Tipos de flashcards: opción del menú -> (nombre, instrucción para la IA, prefijo del mazo)
+FLASHCARD_TYPES = {
+    "1": ("Automáticas", "automáticas", "automaticas"),
+    "2": ("Conceptos clave", "conceptos clave y definiciones importantes", "conceptos"),
+    "3": ("Definiciones", "definiciones y términos importantes", "definiciones"),
+    "4": ("Ejemplos", "ejemplos prácticos y casos de uso", "ejemplos"),
+}
+
 class FlashcardTool:
     def __init__(self):
         """Inicializa el generador de flashcards con IA"""
@@ -27,6 +53,21 @@ class FlashcardTool:
         # Directorio para almacenar flashcards
         self.storage_dir = os.path.join(os.path.dirname(__file__), "..", "storage", "flashcards")
         os.makedirs(self.storage_dir, exist_ok=True)
+        
+        # Mazos, tarjetas y progreso de repaso en SQLite (los JSON anteriores se importan una vez)
+        self.store = FlashcardStore()
+        imported = self.store.import_json_decks(self.storage_dir)
+        if imported:
+            print(f"📁 {imported} mazo(s) JSON importado(s) a la base de flashcards")
+        
+        # Repetición espaciada (SM-2) sobre todos los mazos guardados
+        self.scheduler = SpacedRepetitionScheduler(self.store)
+        
+        # Detección de tarjetas casi repetidas entre mazos (MinHash + LSH)
+        self.deduplicator = FlashcardDeduplicator(self.store)
+        
+        # Registro de cada repaso para el panel de progreso
+        self.study_log = get_study_log()
 
     def generate_flashcards(self, processed_texts: List[str]) -> None:
         """Genera flashcards inteligentes usando IA"""
@@ -49,6 +90,8 @@ class FlashcardTool:
         print("3. Conceptos clave")
         print("4. Definiciones")
         print("5. Ejemplos")
+        print("6. Todo el material (por partes, en paralelo)")
+        print("7. 🔍 Buscar en flashcards guardadas")
         print("0. Volver")
         
         while True:
@@ -73,8 +116,14 @@ class FlashcardTool:
                 elif choice == "5":
                     self._generate_example_flashcards(processed_texts)
                     break
+                elif choice == "6":
+                    self._generate_full_coverage_flashcards(processed_texts)
+                    break
+                elif choice == "7":
+                    self.search_flashcards()
+                    break
                 else:
-                    print("Opción inválida. Selecciona 1-5 o 0.")
+                    print("Opción inválida. Selecciona 1-7 o 0.")
                     
             except KeyboardInterrupt:
                 print("\n👋 Regresando al menú principal...")
@@ -90,12 +139,12 @@ class FlashcardTool:
         context = combined_text[:8000]  # Limitar contexto
         
         if not self.ai_available:
-            flashcards = self._generate_simple_flashcards(context)
+            flashcards = self._generate_simple_flashcards(combined_text)
         else:
             flashcards = self._generate_ai_flashcards(context, "automáticas")
         
         if flashcards:
-            self._save_and_display_flashcards(flashcards, "automaticas")
+            self._save_and_display_flashcards(flashcards, "automaticas", texts)
         else:
             print("No se pudieron generar flashcards.")
 
@@ -112,12 +161,12 @@ class FlashcardTool:
         context = combined_text[:8000]
         
         if not self.ai_available:
-            flashcards = self._generate_simple_flashcards(context, topic)
+            flashcards = self._generate_simple_flashcards(combined_text, topic)
         else:
             flashcards = self._generate_ai_flashcards(context, f"sobre el tema: {topic}")
         
         if flashcards:
-            self._save_and_display_flashcards(flashcards, f"tema_{topic.replace(' ', '_')}")
+            self._save_and_display_flashcards(flashcards, f"tema_{topic.replace(' ', '_')}", texts, topic)
         else:
             print("No se pudieron generar flashcards.")
 
@@ -129,12 +178,12 @@ class FlashcardTool:
         context = combined_text[:8000]
         
         if not self.ai_available:
-            flashcards = self._generate_simple_flashcards(context, "conceptos")
+            flashcards = self._generate_simple_flashcards(combined_text, "conceptos")
         else:
             flashcards = self._generate_ai_flashcards(context, "conceptos clave y definiciones importantes")
         
         if flashcards:
-            self._save_and_display_flashcards(flashcards, "conceptos")
+            self._save_and_display_flashcards(flashcards, "conceptos", texts)
         else:
             print("No se pudieron generar flashcards.")
 
@@ -146,12 +195,12 @@ class FlashcardTool:
         context = combined_text[:8000]
         
         if not self.ai_available:
-            flashcards = self._generate_simple_flashcards(context, "definiciones")
+            flashcards = self._generate_simple_flashcards(combined_text, "definiciones")
         else:
             flashcards = self._generate_ai_flashcards(context, "definiciones y términos importantes")
         
         if flashcards:
-            self._save_and_display_flashcards(flashcards, "definiciones")
+            self._save_and_display_flashcards(flashcards, "definiciones", texts)
         else:
             print("No se pudieron generar flashcards.")
 
@@ -163,20 +212,106 @@ class FlashcardTool:
         context = combined_text[:8000]
         
         if not self.ai_available:
-            flashcards = self._generate_simple_flashcards(context, "ejemplos")
+            flashcards = self._generate_simple_flashcards(combined_text, "ejemplos")
         else:
             flashcards = self._generate_ai_flashcards(context, "ejemplos prácticos y casos de uso")
         
         if flashcards:
-            self._save_and_display_flashcards(flashcards, "ejemplos")
+            self._save_and_display_flashcards(flashcards, "ejemplos", texts)
+        else:
+            print("No se pudieron generar flashcards.")
+
+    def _generate_full_coverage_flashcards(self, texts: List[str]) -> None:
+        """Genera flashcards de todo el material: una petición por parte, en paralelo"""
+        print("\nTipo de flashcards:")
+        for key, (name, _, _) in FLASHCARD_TYPES.items():
+            print(f"{key}. {name}")
+        choice = input("\nSelecciona tipo: ").strip()
+        if choice not in FLASHCARD_TYPES:
+            print("❌ Opción inválida.")
+            return
+        _, prompt_type, prefix = FLASHCARD_TYPES[choice]
+        
+        chunks = self._split_corpus(texts)
+        if not chunks:
+            print("❌ No hay contenido para generar flashcards.")
+            return
+        
+        counts = [self._cards_for_chunk(chunk) for chunk in chunks]
+        print(f"\nGenerando ~{sum(counts)} flashcards de {len(chunks)} parte(s) del material...")
+        
+        results: List[List[Dict[str, str]]] = [[] for _ in chunks]
+        workers = min(AI_CONCURRENCY, len(chunks)) if self.ai_available else 1
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="flashcards") as executor:
+            futures = {
+                executor.submit(self._generate_chunk_flashcards, chunk, prompt_type, count): index
+                for index, (chunk, count) in enumerate(zip(chunks, counts))
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                index = futures[future]
+                try:
+                    results[index] = future.result()
+                except Exception as e:
+                    print(f"\n⚠️ Error en la parte {index + 1}: {e}")
+                print(f"\r📦 Partes procesadas: {done}/{len(chunks)}", end="", flush=True)
+        print()
+        
+        # Unir en el orden del material y quitar las repetidas entre partes
+        generated = [card for cards in results for card in cards]
+        flashcards = unique_cards(generated)
+        if len(flashcards) < len(generated):
+            print(f"🧹 {len(generated) - len(flashcards)} flashcard(s) repetida(s) entre partes eliminada(s)")
+        
+        if flashcards:
+            self._save_and_display_flashcards(flashcards, f"completo_{prefix}", texts)
         else:
             print("No se pudieron generar flashcards.")
 
-    def _generate_ai_flashcards(self, text: str, prompt_type: str) -> List[Dict[str, str]]:
+    def _split_corpus(self, texts: List[str], chunk_chars: int = CHUNK_CHARS) -> List[str]:
+        """Divide el material en partes de hasta 'chunk_chars', cortando entre párrafos u oraciones"""
+        pieces: List[str] = []
+        for text in texts:
+            for paragraph in re.split(r"\n\s*\n", text):
+                paragraph = paragraph.strip()
+                if not paragraph:
+                    continue
+                if len(paragraph) <= chunk_chars:
+                    pieces.append(paragraph)
+                    continue
+                # Párrafo demasiado largo: se corta por oraciones (o a la fuerza si no las hay)
+                for sentence in re.split(r"(?<=[.!?])\s+", paragraph):
+                    while len(sentence) > chunk_chars:
+                        pieces.append(sentence[:chunk_chars])
+                        sentence = sentence[chunk_chars:]
+                    if sentence:
+                        pieces.append(sentence)
+        
+        chunks: List[str] = []
+        current = ""
+        for piece in pieces:
+            if current and len(current) + len(piece) + 2 > chunk_chars:
+                chunks.append(current)
+                current = piece
+            else:
+                current = f"{current}\n\n{piece}" if current else piece
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def _cards_for_chunk(self, chunk: str) -> int:
+        """Cantidad de flashcards proporcional a la longitud de la parte"""
+        return max(MIN_CARDS_PER_CHUNK, min(MAX_CARDS_PER_CHUNK, round(len(chunk) / CHARS_PER_CARD)))
+
+    def _generate_chunk_flashcards(self, chunk: str, prompt_type: str, count: int) -> List[Dict[str, str]]:
+        if not self.ai_available:
+            return generate_local_flashcards(chunk, count, prompt_type)
+        return self._generate_ai_flashcards(chunk, prompt_type, count)
+
+    def _generate_ai_flashcards(self, text: str, prompt_type: str, count: int = 8) -> List[Dict[str, str]]:
         """Genera flashcards usando IA"""
         try:
             prompt = f"""
-            Genera 8 flashcards educativas de alta calidad basadas en el siguiente contenido:
+            Genera {count} flashcards educativas de alta calidad basadas en el siguiente contenido:
             
             CONTENIDO:
             {text}
@@ -199,77 +334,44 @@ class FlashcardTool:
             IMPORTANTE: Responde únicamente con el JSON, sin texto adicional.
             """
             
-            response = self.model.generate_content(prompt)
-            ai_text = response.text.strip()
-            
-            # Limpiar respuesta si tiene markdown
-            if ai_text.startswith("```json"):
-                ai_text = ai_text[7:]
-            if ai_text.endswith("```"):
-                ai_text = ai_text[:-3]
-            
-            flashcards = json.loads(ai_text)
-            
-            # Validar formato
-            if isinstance(flashcards, list) and all(
-                isinstance(card, dict) and "Q" in card and "A" in card 
-                for card in flashcards
-            ):
+            response = self.model.generate_content(prompt, stream=True)
+            flashcards = parse_ai_items(response_chunks(response), "flashcard", count)
+            if flashcards:
                 return flashcards
-            else:
-                print("⚠️ Formato de respuesta de IA inválido.")
-                return self._generate_simple_flashcards(text)
+            print("⚠️ Formato de respuesta de IA inválido.")
+            return self._generate_simple_flashcards(text, count=count)
                 
-        except json.JSONDecodeError as e:
-            print(f"⚠️ Error parseando respuesta de IA: {e}")
-            return self._generate_simple_flashcards(text)
         except Exception as e:
             print(f"❌ Error generando flashcards con IA: {e}")
-            return self._generate_simple_flashcards(text)
+            return self._generate_simple_flashcards(text, count=count)
 
-    def _generate_simple_flashcards(self, text: str, topic: str = "") -> List[Dict[str, str]]:
-        """Genera flashcards simples como fallback"""
-        print("Generando flashcards básicas...")
-        
-        # Dividir texto en oraciones
-        sentences = [s.strip() for s in text.split('.') if s.strip()]
-        
-        flashcards = []
-        for i, sentence in enumerate(sentences[:8]):  # Máximo 8 flashcards
-            if len(sentence) > 20:
-                # Crear pregunta basada en la oración
-                words = sentence.split()
-                if len(words) > 3:
-                    # Tomar las primeras palabras como pregunta
-                    question_words = words[:3]
-                    question = " ".join(question_words) + "..."
-                    flashcards.append({
-                        "Q": f"¿Qué dice sobre {question}?",
-                        "A": sentence
-                    })
-        
-        # Si no hay suficientes, crear algunas genéricas
-        while len(flashcards) < 5:
-            flashcards.append({
-                "Q": f"¿Cuál es un concepto importante del contenido?",
-                "A": f"Concepto clave {len(flashcards) + 1} del material estudiado."
-            })
-        
-        return flashcards
+    def _generate_simple_flashcards(self, text: str, topic: str = "", count: int = 8) -> List[Dict[str, str]]:
+        """Genera flashcards sin IA: definiciones y huecos en las oraciones más relevantes (TF-IDF)"""
+        print("Generando flashcards básicas (sin conexión)...")
+        return generate_local_flashcards(text, count, topic)
 
-    def _save_and_display_flashcards(self, flashcards: List[Dict[str, str]], filename_prefix: str) -> None:
-        """Guarda y muestra las flashcards generadas"""
+    def _save_and_display_flashcards(self, flashcards: List[Dict[str, str]], filename_prefix: str,
+                                     sources: Optional[List[str]] = None, topic: str = "") -> None:
+        """Guarda el mazo (con el material de origen) y muestra las flashcards generadas"""
         import datetime
         
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"flashcards_{filename_prefix}_{timestamp}.json"
-        filepath = os.path.join(self.storage_dir, filename)
+        deck_name = f"flashcards_{filename_prefix}_{timestamp}"
+        deck_id = None
+        
+        flashcards = self._resolve_duplicates(flashcards)
+        if not flashcards:
+            print("No quedan flashcards nuevas para guardar.")
+            return
         
         # Guardar flashcards
         try:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(flashcards, f, ensure_ascii=False, indent=2)
-            print(f"\n💾 Flashcards guardadas en: {filepath}")
+            deck_id = self.store.create_deck(deck_name, flashcards, sources,
+                                             subject=subject_label(topic, sources or []))
+            # Las tarjetas guardadas llevan su id para editarlas y repasarlas
+            flashcards = self.store.get_deck_cards(deck_id)
+            self.deduplicator.index_cards(flashcards)
+            print(f"\n💾 Flashcards guardadas en el mazo: {deck_name}")
         except Exception as e:
             print(f"❌ Error guardando flashcards: {e}")
         
@@ -284,9 +386,75 @@ class FlashcardTool:
             print("-" * 40)
         
         # Opciones adicionales
-        self._show_flashcard_options(filepath, flashcards)
+        self._show_flashcard_options(deck_id, flashcards)
 
-    def _show_flashcard_options(self, filepath: str, flashcards: List[Dict[str, str]]) -> None:
+    def _resolve_duplicates(self, flashcards: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """Detecta tarjetas casi repetidas y pregunta si combinarlas, omitirlas o guardarlas"""
+        try:
+            matches = self.deduplicator.find_duplicates(flashcards)
+        except Exception as e:
+            print(f"⚠️ No se pudo comprobar si hay flashcards repetidas: {e}")
+            return flashcards
+        
+        repeated = [i for i, match in enumerate(matches) if match]
+        if not repeated:
+            return flashcards
+        
+        print(f"\n🔁 {len(repeated)} flashcard(s) casi repetida(s):")
+        for i in repeated[:10]:
+            kind, ref, similarity = matches[i]
+            if kind == "guardada":
+                existing = self.store.get_card(ref)
+                other, where = existing['Q'], f"mazo {existing['deck']}"
+            else:
+                other, where = flashcards[ref]['Q'], f"flashcard {ref + 1} de este lote"
+            print(f"• {flashcards[i]['Q'][:60]}")
+            print(f"  ≈ {other[:60]} ({where}, {similarity:.0%})")
+        if len(repeated) > 10:
+            print(f"  ... y {len(repeated) - 10} más")
+        
+        print("\n1. 🔗 Combinar con la existente")
+        print("2. ⏭️ Omitir las repetidas")
+        print("3. 💾 Guardar igualmente")
+        choice = input("\nSelecciona opción: ").strip()
+        while choice not in ("1", "2", "3"):
+            choice = input("Responde 1, 2 o 3: ").strip()
+        
+        if choice == "3":
+            return flashcards
+        
+        kept: Dict[int, Dict[str, str]] = {}
+        merged: Dict[int, Dict[str, Any]] = {}
+        for i, card in enumerate(flashcards):
+            match = matches[i]
+            if match is None:
+                kept[i] = dict(card)
+                continue
+            if choice == "2":
+                continue
+            
+            kind, ref, _ = match
+            if kind == "lote" and matches[ref] is not None:
+                # La tarjeta de referencia ya se combinó con una guardada: se combina con esa
+                kind, ref, _ = matches[ref]
+            if kind == "guardada":
+                target = merged.get(ref) or self.store.get_card(ref)
+                target['A'] = merge_answers(target['A'], card['A'])
+                merged[ref] = target
+            elif ref in kept:
+                kept[ref]['A'] = merge_answers(kept[ref]['A'], card['A'])
+        
+        for card_id, card in merged.items():
+            self.store.update_card(card_id, answer=card['A'])
+        self.deduplicator.index_cards(list(merged.values()))
+        
+        if choice == "1":
+            print(f"🔗 {len(repeated)} flashcard(s) combinada(s) con las existentes")
+        else:
+            print(f"⏭️ {len(repeated)} flashcard(s) omitida(s)")
+        return list(kept.values())
+
+    def _show_flashcard_options(self, deck_id: Optional[int], flashcards: List[Dict[str, Any]]) -> None:
         """Muestra opciones adicionales para las flashcards"""
         print(f"\nOpciones:")
         print("1. 🔄 Generar más flashcards")
@@ -306,13 +474,13 @@ class FlashcardTool:
                     print("🔄 Redirigiendo a generación de más flashcards...")
                     return  # Volver al menú principal de flashcards
                 elif choice == "2":
-                    self._modify_flashcards(filepath, flashcards)
+                    self._modify_flashcards(flashcards)
                     break
                 elif choice == "3":
                     self._interactive_study_mode(flashcards)
                     break
                 elif choice == "4":
-                    self._export_flashcards(filepath, flashcards)
+                    self._export_flashcards(deck_id, flashcards)
                     break
                 else:
                     print("❌ Opción inválida.")
@@ -323,7 +491,7 @@ class FlashcardTool:
             except Exception as e:
                 print(f"❌ Error: {e}")
 
-    def _modify_flashcards(self, filepath: str, flashcards: List[Dict[str, str]]) -> None:
+    def _modify_flashcards(self, flashcards: List[Dict[str, Any]]) -> None:
         """Permite modificar flashcards existentes"""
         print(f"\nModificar flashcards:")
         print("Selecciona la flashcard a modificar (número) o '0' para cancelar:")
@@ -347,11 +515,13 @@ class FlashcardTool:
                 if new_answer:
                     card['A'] = new_answer
                 
-                # Guardar cambios
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    json.dump(flashcards, f, ensure_ascii=False, indent=2)
-                
-                print("Flashcard modificada y guardada.")
+                # Guardar cambios: solo se actualiza la fila de esta tarjeta
+                if "id" in card:
+                    self.store.update_card(card["id"], new_question or None, new_answer or None)
+                    self.deduplicator.index_cards([card])
+                    print("Flashcard modificada y guardada.")
+                else:
+                    print("⚠️ Flashcard modificada solo en esta sesión (el mazo no se pudo guardar).")
             else:
                 print("❌ Número inválido.")
         except ValueError:
@@ -359,8 +529,8 @@ class FlashcardTool:
         except Exception as e:
             print(f"❌ Error: {e}")
 
-    def _interactive_study_mode(self, flashcards: List[Dict[str, str]]) -> None:
-        """Modo de estudio interactivo"""
+    def _interactive_study_mode(self, flashcards: List[Dict[str, Any]]) -> None:
+        """Modo de estudio interactivo (las tarjetas guardadas se reprograman con cada respuesta)"""
         print(f"\nModo estudio interactivo")
         print("-"*50)
         print("📚 Estudia tus flashcards de forma interactiva")
@@ -392,13 +562,17 @@ class FlashcardTool:
                 if correct in ['s', 'si', 'sí', 'y', 'yes']:
                     correct_answers += 1
                     print("Correcto")
+                    self._record_review(card, GRADES["3"][1])
                     break
                 elif correct in ['n', 'no']:
                     print("Sigue practicando esta tarjeta.")
+                    self._record_review(card, GRADES["1"][1])
                     break
                 else:
                     print("Responde 's' o 'n'.")
         
+        self.study_log.flush()
+        
         # Mostrar resultados
         if total_questions > 0:
             percentage = (correct_answers / total_questions) * 100
@@ -413,12 +587,82 @@ class FlashcardTool:
             else:
                 print("Necesitas repasar más. ¡Ánimo!")
 
-    def _export_flashcards(self, filepath: str, flashcards: List[Dict[str, str]]) -> None:
+    def _record_review(self, card: Dict[str, Any], quality: int) -> Optional[Dict[str, Any]]:
+        """Guarda el resultado de una tarjeta en el programador de repasos y en el registro de estudio"""
+        if "id" not in card:
+            return None
+        
+        previous = self.store.get_state(card["id"])
+        state = self.scheduler.record(card["id"], quality)
+        
+        elapsed_days = -1.0
+        if previous and previous.get("last_review"):
+            elapsed_days = (state["last_review"] - previous["last_review"]) / DAY_SECONDS
+        self.study_log.record(KIND_FLASHCARD, card["id"], card.get("subject", "general"),
+                              quality >= 3, quality, elapsed_days)
+        return state
+
+    def review_due_cards(self) -> None:
+        """Sesión de repaso con las tarjetas pendientes de todos los mazos"""
+        print("\nRepaso con repetición espaciada")
+        print("-"*50)
+        
+        self.scheduler.build_queue()
+        counts = self.scheduler.counts()
+        if not counts["total"]:
+            print("❌ No hay flashcards guardadas.")
+            return
+        
+        print(f"📚 {counts['total']} tarjetas | 🔁 {counts['due']} para repasar | 🆕 {counts['new']} nuevas")
+        print("• Presiona Enter para ver la respuesta")
+        print("• Califica: " + ", ".join(f"{key} {name}" for key, (name, _) in GRADES.items()))
+        print("• Escribe 'salir' para terminar")
+        print("="*50)
+        
+        reviewed = 0
+        remembered = 0
+        try:
+            for card_id, card in self.scheduler.due_cards():
+                label = "🆕 Nueva" if self.scheduler.is_new(card_id) else "🔁 Repaso"
+                print(f"\n{label} · {card['deck']}")
+                print(f"❓ Pregunta: {card['Q']}")
+                
+                if input("\nPresiona Enter para ver la respuesta: ").strip().lower() == "salir":
+                    break
+                print(f"✅ Respuesta: {card['A']}")
+                
+                grade = input("\nCalificación (1-4): ").strip()
+                while grade not in GRADES and grade != "salir":
+                    grade = input("Responde 1, 2, 3 o 4: ").strip()
+                if grade == "salir":
+                    break
+                
+                name, quality = GRADES[grade]
+                state = self._record_review(card, quality)
+                reviewed += 1
+                remembered += quality >= 3
+                if state["interval"]:
+                    print(f"📅 {name}: próxima revisión en {state['interval']} día(s)")
+                else:
+                    print(f"📅 {name}: volverá a salir en unos minutos")
+        except KeyboardInterrupt:
+            print("\n👋 Terminando repaso...")
+        finally:
+            self.study_log.flush()
+        
+        if reviewed:
+            print(f"\nRepasadas: {reviewed} | Recordadas: {remembered} ({remembered / reviewed * 100:.0f}%)")
+        else:
+            print("\n✅ No hay tarjetas pendientes por ahora.")
+
+    def _export_flashcards(self, deck_id: Optional[int], flashcards: List[Dict[str, Any]]) -> None:
         """Exporta flashcards en diferentes formatos"""
         print(f"\nExportar flashcards:")
         print("1. 📄 Exportar como texto plano")
         print("2. 📊 Exportar como CSV")
         print("3. 📋 Copiar al portapapeles")
+        print("4. 🃏 Exportar como paquete de Anki (.apkg)")
+        print("5. 🗃️ Exportar todos los mazos a Anki (.apkg)")
         print("0. Cancelar")
         
         try:
@@ -427,9 +671,16 @@ class FlashcardTool:
             if choice == "1":
                 self._export_as_text(flashcards)
             elif choice == "2":
-                self._export_as_csv(flashcards)
+                self._export_as_csv(flashcards, deck_id)
             elif choice == "3":
                 self._copy_to_clipboard(flashcards)
+            elif choice == "4":
+                if deck_id is None:
+                    print("❌ El mazo no está guardado; no se puede exportar a Anki.")
+                else:
+                    self._export_as_apkg(deck_id)
+            elif choice == "5":
+                self._export_as_apkg(None)
             elif choice == "0":
                 print("Exportación cancelada.")
             else:
@@ -460,8 +711,8 @@ class FlashcardTool:
         except Exception as e:
             print(f"❌ Error exportando como texto: {e}")
 
-    def _export_as_csv(self, flashcards: List[Dict[str, str]]) -> None:
-        """Exporta flashcards como CSV"""
+    def _export_as_csv(self, flashcards: List[Dict[str, Any]], deck_id: Optional[int] = None) -> None:
+        """Exporta flashcards como CSV (desde la base de datos si el mazo está guardado)"""
         import datetime
         import csv
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -469,17 +720,34 @@ class FlashcardTool:
         filepath = os.path.join(self.storage_dir, filename)
         
         try:
-            with open(filepath, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerow(['Pregunta', 'Respuesta'])
-                
-                for card in flashcards:
-                    writer.writerow([card['Q'], card['A']])
+            if deck_id is not None:
+                export_csv(self.store, filepath, deck_id)
+            else:
+                with open(filepath, 'w', newline='', encoding='utf-8') as f:
+                    writer = csv.writer(f)
+                    writer.writerow(['Pregunta', 'Respuesta'])
+                    
+                    for card in flashcards:
+                        writer.writerow([card['Q'], card['A']])
             
             print(f"Flashcards exportadas como CSV: {filepath}")
         except Exception as e:
             print(f"❌ Error exportando como CSV: {e}")
 
+    def _export_as_apkg(self, deck_id: Optional[int]) -> None:
+        """Exporta un mazo (o todos, si deck_id es None) como paquete de Anki"""
+        import datetime
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        scope = "todos" if deck_id is None else "mazo"
+        filepath = os.path.join(self.storage_dir, f"flashcards_anki_{scope}_{timestamp}.apkg")
+        
+        try:
+            count = export_apkg(self.store, filepath, deck_id)
+            print(f"Flashcards exportadas para Anki ({count} tarjetas): {filepath}")
+            print("💡 En Anki: Archivo > Importar y selecciona el archivo .apkg")
+        except Exception as e:
+            print(f"❌ Error exportando a Anki: {e}")
+
     def _copy_to_clipboard(self, flashcards: List[Dict[str, str]]) -> None:
         """Copia flashcards al portapapeles"""
         try:
@@ -496,28 +764,55 @@ class FlashcardTool:
         except Exception as e:
             print(f"❌ Error copiando al portapapeles: {e}")
 
-    def list_saved_flashcards(self) -> None:
-        """Lista todas las flashcards guardadas"""
-        print("\nFlashcards guardadas:")
-        print("-"*40)
+    def search_flashcards(self) -> None:
+        """Busca texto en las preguntas y respuestas de todos los mazos"""
+        import time
         
-        if not os.path.exists(self.storage_dir):
-            print("❌ No hay flashcards guardadas.")
+        print("\nBuscar en flashcards guardadas")
+        print("-"*50)
+        if not self.store.search_available:
+            print(FTS_UNAVAILABLE_MESSAGE)
             return
+        print("• Escribe palabras (la última puede estar incompleta)")
+        print("• Enter vacío para terminar")
         
-        files = [f for f in os.listdir(self.storage_dir) if f.endswith('.json')]
+        while True:
+            text = input("\n🔍 Buscar: ").strip()
+            if not text:
+                break
+            
+            start = time.perf_counter()
+            try:
+                results = self.store.search_cards(text)
+            except Exception as e:
+                print(f"❌ Error buscando: {e}")
+                continue
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            
+            if not results:
+                print(f"Sin resultados ({elapsed_ms:.1f} ms)")
+                continue
+            
+            print(f"{len(results)} resultado(s) en {elapsed_ms:.1f} ms:")
+            for i, card in enumerate(results, 1):
+                print(f"\n{i}. 📋 {card['deck']}")
+                print(f"   ❓ {card['question']}")
+                print(f"   ✅ {card['answer']}")
+
+    def list_saved_flashcards(self) -> None:
+        """Lista los mazos guardados (conteos calculados por la base de datos)"""
+        import time
         
-        if not files:
+        print("\nFlashcards guardadas:")
+        print("-"*40)
+        
+        decks = self.store.list_decks(time.time())
+        if not decks:
             print("❌ No hay flashcards guardadas.")
             return
         
-        for i, filename in enumerate(files, 1):
-            filepath = os.path.join(self.storage_dir, filename)
-            try:
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    flashcards = json.load(f)
-                print(f"{i}. {filename} ({len(flashcards)} tarjetas)")
-            except Exception as e:
-                print(f"{i}. {filename} (error leyendo)")
+        for i, deck in enumerate(decks, 1):
+            print(f"{i}. {deck['name']} ({deck['card_count']} tarjetas, "
+                  f"{deck['due_count']} para repasar, {deck['new_count']} nuevas)")
         
-        print(f"\nTotal: {len(files)} archivos de flashcards")
+        print(f"\nTotal: {len(decks)} mazos de flashcards")
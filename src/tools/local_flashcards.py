@@ -0,0 +1,226 @@
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import numpy as np
+
+# Palabras vacías (español e inglés): no cuentan para la relevancia ni forman frases clave
+STOPWORDS = frozenset("""
+a al algo algunas algunos ante antes aquel aquella aquellas aquellos aqui así asi aun aunque cada casi como con
+contra cual cuales cuando cuanto de del desde donde dos el él ella ellas ello ellos en entre era eran es esa esas
+ese eso esos esta está estaba estado estan están estar este esto estos fue fueron ha había habia han hasta hay
+la las le les lo los más mas me mi mientras muy nada ni no nos nosotros o otra otras otro otros para pero poco
+por porque puede pueden que qué se según segun ser sera será si sí sido sin sino sobre son su sus también tambien
+tan tanto te tiene tienen todo todos tras tu tus un una unas uno unos ya yo cual cuyo cuya hacia mediante
+durante cómo donde dónde cuándo quien quién quienes cuál vez veces además ademas solo sólo bien cosa cosas
+the of and to in is are was were be been it its this that these those for on with as by at from or an not
+but which who what when where how can will would should could has have had do does did than then there their
+they them he she his her we our you your i me my so if into about such
+""".split())
+
+# Conectores que pueden ir dentro de una frase clave ("ciclo de Krebs")
+PHRASE_CONNECTORS = frozenset({"de", "del"})
+# Longitud máxima de la frase clave (palabras con contenido)
+MAX_PHRASE_WORDS = 3
+# Veces que dos palabras deben aparecer juntas en el material para tratarse como una frase
+MIN_PHRASE_COUNT = 2
+
+# Longitud aceptada de las oraciones usadas como tarjeta
+MIN_SENTENCE_CHARS = 40
+MAX_SENTENCE_CHARS = 300
+MIN_SENTENCE_WORDS = 6
+
+# Refuerzo de las oraciones que mencionan el tema pedido
+TOPIC_BOOST = 1.0
+# Prefijo usado como raíz al comparar con el tema ("ejemplos" ~ "ejemplo")
+STEM_CHARS = 5
+
+CLOZE_BLANK = "_____"
+
+# Marca (letras que no aparecen en apuntes) para separar oraciones al tokenizar todo de una vez
+SENTENCE_MARK = "ǀǀǀ"
+
+_WORD_RE = re.compile(r"[^\W\d_]+", re.UNICODE)
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+(?=[¿¡\"'(«]?[A-ZÁÉÍÓÚÑ0-9])|\n+")
+_DEFINITION_RE = re.compile(
+    r"^(?:(?:el|la|los|las|un|una|the|an?)\s+)?(?P<term>[^,;:()]{3,60}?)\s+"
+    r"(?P<verb>es|son|se define como|se definen como|se denomina|se denominan|se conoce como|consiste en|"
+    r"significa|se refiere a|is|are|refers to|means)\s+(?P<definition>.{15,})$",
+    re.IGNORECASE,
+)
+# Sujetos que no son términos definibles ("Esto es...", "Lo importante es...")
+_VAGUE_SUBJECTS = frozenset({"esto", "eso", "esta", "este", "ello", "lo", "que", "it", "this", "that", "there"})
+
+
+def split_sentences(text: str) -> List[str]:
+    """Oraciones del texto (también separa por saltos de línea, como viñetas o títulos)"""
+    sentences = []
+    for sentence in _SENTENCE_END_RE.split(text):
+        if len(sentence) < MIN_SENTENCE_CHARS:
+            continue
+        sentence = " ".join(sentence.split()).strip("-•* ")
+        if MIN_SENTENCE_CHARS <= len(sentence) <= MAX_SENTENCE_CHARS and \
+                sentence.count(" ") + 1 >= MIN_SENTENCE_WORDS:
+            sentences.append(sentence)
+    return sentences
+
+
+def _is_content(word: str) -> bool:
+    return len(word) >= 3 and word not in STOPWORDS
+
+
+class SentenceScores(NamedTuple):
+    scores: np.ndarray          # relevancia de cada oración
+    vocabulary: Dict[str, int]  # palabra -> id de término
+    weights: np.ndarray         # peso TF-IDF de cada término
+    pairs: np.ndarray           # códigos ordenados de pares contiguos "a b"
+    linked_pairs: np.ndarray    # códigos ordenados de pares unidos por conector "a de b"
+
+    def pair_count(self, first: str, second: str, linked: bool = False) -> int:
+        """Veces que aparece el par en el material (para decidir si forma una frase)"""
+        a, b = self.vocabulary.get(first), self.vocabulary.get(second)
+        if a is None or b is None:
+            return 0
+        codes = self.linked_pairs if linked else self.pairs
+        code = a * len(self.vocabulary) + b
+        return int(np.searchsorted(codes, code, side='right') - np.searchsorted(codes, code, side='left'))
+
+
+def score_sentences(sentences: List[str], topic: str = "") -> SentenceScores:
+    """Relevancia TF-IDF de cada oración (vectorizada) y peso de cada término.
+
+    Cada término pesa log(1 + frecuencia en el texto) * idf (tomando cada oración
+    como documento): destacan los términos que se repiten en el material sin
+    aparecer en todas partes. Una oración vale la suma de los pesos de sus
+    términos, normalizada por la raíz de su longitud.
+    """
+    n_docs = len(sentences)
+    # Una sola pasada de la expresión regular sobre todo el texto; la marca separa oraciones
+    words = _WORD_RE.findall(SENTENCE_MARK + " " + f" {SENTENCE_MARK} ".join(sentences).lower())
+    vocabulary: Dict[str, int] = {SENTENCE_MARK: 0}
+    ids = np.array([vocabulary.setdefault(word, len(vocabulary)) for word in words], dtype=np.int64)
+    n_terms = len(vocabulary)
+
+    content = np.array([_is_content(word) for word in vocabulary], dtype=bool)
+    content[0] = False
+    connector = np.zeros(n_terms, dtype=bool)
+    for word in PHRASE_CONNECTORS:
+        if word in vocabulary:
+            connector[vocabulary[word]] = True
+
+    token_docs = np.cumsum(ids == 0) - 1
+    is_content = content[ids]
+    terms, docs = ids[is_content], token_docs[is_content]
+    if not len(terms):
+        empty = np.zeros(0, dtype=np.int64)
+        return SentenceScores(np.zeros(n_docs), vocabulary, np.zeros(n_terms), empty, empty)
+
+    term_frequency = np.bincount(terms, minlength=n_terms)
+    # Frecuencia de documento: pares (oración, término) distintos
+    doc_terms = np.sort(docs * n_terms + terms)
+    distinct = np.concatenate([[True], doc_terms[1:] != doc_terms[:-1]])
+    document_frequency = np.bincount(doc_terms[distinct] % n_terms, minlength=n_terms)
+    idf = np.log((n_docs + 1) / (document_frequency + 1)) + 1
+    weights = np.log1p(term_frequency) * idf
+    weights[~content] = 0
+
+    lengths = np.bincount(docs, minlength=n_docs)
+    scores = np.bincount(docs, weights=weights[terms], minlength=n_docs) / np.sqrt(np.maximum(lengths, 1))
+
+    topic_stems = {word[:STEM_CHARS] for word in _WORD_RE.findall(topic.lower()) if _is_content(word)}
+    if topic_stems:
+        stems = np.array([word[:STEM_CHARS] in topic_stems for word in vocabulary], dtype=np.float64)
+        mentions = np.bincount(docs, weights=stems[terms], minlength=n_docs) > 0
+        scores = scores * (1 + TOPIC_BOOST * mentions)
+
+    # Pares de palabras con contenido (la marca de oración no es contenido, así que no cruzan oraciones)
+    adjacent = is_content[:-1] & is_content[1:]
+    pairs = np.sort(ids[:-1][adjacent] * n_terms + ids[1:][adjacent])
+    linked = is_content[:-2] & connector[ids[1:-1]] & is_content[2:]
+    linked_pairs = np.sort(ids[:-2][linked] * n_terms + ids[2:][linked])
+
+    return SentenceScores(scores, vocabulary, weights, pairs, linked_pairs)
+
+
+def definition_parts(sentence: str) -> Optional[Tuple[str, str, bool]]:
+    """(término, definición, plural) si la oración tiene forma de definición ("X es ...")"""
+    match = _DEFINITION_RE.match(sentence)
+    if not match:
+        return None
+    term = match.group("term").strip()
+    words = term.split()
+    if len(words) > 6 or words[0].lower() in _VAGUE_SUBJECTS:
+        return None
+    plural = match.group("verb").lower() in ("son", "se definen como", "se denominan", "are")
+    return term, match.group("definition").strip(), plural
+
+
+def _definition_card(sentence: str) -> Optional[Dict[str, str]]:
+    """Tarjeta "¿Qué es X?" si la oración tiene forma de definición"""
+    parts = definition_parts(sentence)
+    if parts is None:
+        return None
+    term, _, plural = parts
+    question = f"¿Qué son {term}?" if plural else f"¿Qué es {term}?"
+    return {"Q": question, "A": sentence}
+
+
+def key_phrase(sentence: str, stats: SentenceScores, used: set) -> Optional[Tuple[int, int, str]]:
+    """Frase clave de la oración: el término de más peso (no usado antes) y los vecinos con los
+    que se repite en el material ("dióxido de carbono", "respiración celular")"""
+    tokens = [(m.start(), m.end(), m.group().lower()) for m in _WORD_RE.finditer(sentence)]
+    best, best_weight = None, 0.0
+    for i, (_, _, word) in enumerate(tokens):
+        term = stats.vocabulary.get(word)
+        if term is not None and len(word) >= 4 and word not in used and stats.weights[term] > best_weight:
+            best, best_weight = i, stats.weights[term]
+    if best is None:
+        return None
+
+    start = end = best
+    for _ in range(MAX_PHRASE_WORDS - 1):
+        if end + 1 < len(tokens) and \
+                stats.pair_count(tokens[end][2], tokens[end + 1][2]) >= MIN_PHRASE_COUNT:
+            end += 1
+        elif end + 2 < len(tokens) and tokens[end + 1][2] in PHRASE_CONNECTORS and \
+                stats.pair_count(tokens[end][2], tokens[end + 2][2], linked=True) >= MIN_PHRASE_COUNT:
+            end += 2
+        elif start > 0 and stats.pair_count(tokens[start - 1][2], tokens[start][2]) >= MIN_PHRASE_COUNT:
+            start -= 1
+        else:
+            break
+
+    return tokens[start][0], tokens[end][1], tokens[best][2]
+
+
+def generate_local_flashcards(text: str, count: int = 8, topic: str = "") -> List[Dict[str, str]]:
+    """Flashcards sin conexión: definiciones y huecos (cloze) en las oraciones más relevantes"""
+    sentences = split_sentences(text)
+    if not sentences or count <= 0:
+        return []
+
+    stats = score_sentences(sentences, topic)
+    flashcards: List[Dict[str, str]] = []
+    used_terms: set = set()
+    used_questions: set = set()
+
+    for index in np.argsort(-stats.scores, kind='stable'):
+        if len(flashcards) >= count:
+            break
+        sentence = sentences[index]
+
+        card = _definition_card(sentence)
+        if card is None:
+            phrase = key_phrase(sentence, stats, used_terms)
+            if phrase is None:
+                continue
+            start, end, anchor = phrase
+            answer = sentence[start:end]
+            if len(answer) > len(sentence) / 2:
+                continue
+            used_terms.add(anchor)
+            card = {"Q": f"Completa: {sentence[:start]}{CLOZE_BLANK}{sentence[end:]}", "A": answer}
+
+        if card["Q"] not in used_questions:
+            used_questions.add(card["Q"])
+            flashcards.append(card)
+
+    return flashcards
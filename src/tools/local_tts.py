@@ -0,0 +1,52 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+
+# pyttsx3 no es thread-safe y pyttsx3.init() devuelve un motor compartido (y en Windows
+# ligado al hilo que lo creó): toda la síntesis local pasa por este único hilo
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pyttsx3")
+
+# Motor creado y usado solo dentro del hilo de síntesis
+_engine: Optional[Any] = None
+
+# Velocidad y volumen de la voz local
+VOICE_RATE = 150
+VOICE_VOLUME = 0.9
+
+
+def _get_engine() -> Any:
+    """Motor pyttsx3 configurado con voz en español (se crea la primera vez)"""
+    global _engine
+    if _engine is None:
+        try:
+            import pyttsx3
+        except ImportError as e:
+            raise ImportError("pyttsx3 no está instalado (pip install pyttsx3)") from e
+
+        engine = pyttsx3.init()
+        for voice in engine.getProperty('voices'):
+            if 'spanish' in voice.name.lower() or 'es' in voice.id.lower():
+                engine.setProperty('voice', voice.id)
+                break
+
+        engine.setProperty('rate', VOICE_RATE)
+        engine.setProperty('volume', VOICE_VOLUME)
+        _engine = engine
+    return _engine
+
+
+def _synthesize(text: str, path: str) -> bool:
+    engine = _get_engine()
+    engine.save_to_file(text, path)
+    engine.runAndWait()
+    return os.path.exists(path) and os.path.getsize(path) > 0
+
+
+def synthesize_to_file(text: str, path: str) -> bool:
+    """Sintetiza el texto a un WAV en el hilo de síntesis y espera el resultado.
+
+    Se puede llamar desde cualquier hilo (menú o cola de trabajos); las
+    llamadas concurrentes se atienden de a una. Los errores de pyttsx3 se
+    propagan al llamador; si no está instalado, con un ImportError que lo indica.
+    """
+    return _executor.submit(_synthesize, text, path).result()
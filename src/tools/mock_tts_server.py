@@ -0,0 +1,155 @@
+"""
+Servidor TTS simulado para pruebas y benchmarks sin conexión.
+
+Imita los endpoints usados por AudioGeneratorTool:
+    GET  /translate_tts?q=...              (Google TTS)
+    POST /v1/text-to-speech/<voice_id>     (ElevenLabs)
+
+Uso:
+    python -m src.tools.mock_tts_server --port 8765
+    python -m src.tools.mock_tts_server --bench 200 --handshake-ms 30
+
+Para que la aplicación use el servidor simulado, define en el .env:
+    GOOGLE_TTS_URL=http://127.0.0.1:8765/translate_tts
+    ELEVENLABS_API_URL=http://127.0.0.1:8765
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import urlparse, parse_qs
+
+# Cabecera de frame MP3 (MPEG-1 Layer III, 128 kbps, 44.1 kHz) usada como relleno
+_FAKE_FRAME = b'\xff\xfb\x90\x64' + b'\x00' * 413
+
+# Bytes de audio simulados por carácter de texto
+BYTES_PER_CHAR = 400
+
+
+class MockTTSHandler(BaseHTTPRequestHandler):
+    """Responde con audio MP3 simulado, manteniendo conexiones keep-alive"""
+
+    protocol_version = "HTTP/1.1"
+    handshake_delay = 0.0
+
+    def setup(self) -> None:
+        super().setup()
+        # Simula el coste de TCP+TLS por cada conexión nueva
+        if self.handshake_delay:
+            time.sleep(self.handshake_delay)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        parsed = urlparse(self.path)
+        if parsed.path != "/translate_tts":
+            self._send_error(404)
+            return
+
+        text = parse_qs(parsed.query).get('q', [''])[0]
+        self._send_audio(len(text))
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length) if length else b''
+
+        if not self.path.startswith("/v1/text-to-speech/"):
+            self._send_error(404)
+            return
+
+        try:
+            text = json.loads(body or b'{}').get('text', '')
+        except ValueError:
+            self._send_error(400)
+            return
+
+        self._send_audio(len(text))
+
+    def _send_audio(self, num_chars: int) -> None:
+        size = max(1, num_chars) * BYTES_PER_CHAR
+        frames = size // len(_FAKE_FRAME) + 1
+        payload = (_FAKE_FRAME * frames)[:size]
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'audio/mpeg')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_error(self, status: int) -> None:
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+
+def start_server(port: int = 8765, handshake_ms: float = 0.0) -> ThreadingHTTPServer:
+    """Inicia el servidor simulado en un hilo de fondo"""
+    MockTTSHandler.handshake_delay = handshake_ms / 1000.0
+    server = ThreadingHTTPServer(("127.0.0.1", port), MockTTSHandler)
+    server.daemon_threads = True
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def run_benchmark(num_chunks: int, handshake_ms: float, port: int = 0) -> None:
+    """Compara peticiones sueltas frente a la sesión compartida"""
+    import requests
+    from .tts_http import TTSHttpSession
+
+    server = start_server(port, handshake_ms)
+    url = f"http://127.0.0.1:{server.server_address[1]}/translate_tts"
+    chunk_text = "x" * 200
+
+    print(f"Benchmark TTS simulado: {num_chunks} chunks, handshake {handshake_ms:.0f} ms")
+
+    start = time.perf_counter()
+    for _ in range(num_chunks):
+        response = requests.get(url, params={'q': chunk_text}, timeout=10)
+        response.content
+    bare_time = time.perf_counter() - start
+
+    session = TTSHttpSession()
+    start = time.perf_counter()
+    for _ in range(num_chunks):
+        response = session.get(url, params={'q': chunk_text})
+        response.content
+    pooled_time = time.perf_counter() - start
+    session.close()
+
+    server.shutdown()
+
+    print(f"   requests.get sin sesión: {bare_time:.2f}s ({num_chunks / bare_time:.1f} chunks/s)")
+    print(f"   Sesión compartida:       {pooled_time:.2f}s ({num_chunks / pooled_time:.1f} chunks/s)")
+    print(f"   Mejora: x{bare_time / pooled_time:.1f}")
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Servidor TTS simulado de StudyBox")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--handshake-ms', type=float, default=0.0,
+                        help="Retardo simulado por conexión nueva (TCP+TLS)")
+    parser.add_argument('--bench', type=int, default=0, metavar='N',
+                        help="Ejecuta un benchmark con N chunks y termina")
+    args = parser.parse_args(argv)
+
+    if args.bench:
+        run_benchmark(args.bench, args.handshake_ms)
+        return
+
+    server = start_server(args.port, args.handshake_ms)
+    print(f"Servidor TTS simulado en http://127.0.0.1:{args.port} (Ctrl+C para salir)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
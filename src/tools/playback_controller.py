@@ -0,0 +1,476 @@
+import builtins
+import io
+import queue
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import pygame
+from .audio_metadata import AudioLibraryIndex, format_duration, parse_timestamp
+from .audio_output import AudioOutputManager
+from .time_stretch import MAX_SPEED, MIN_SPEED, StretchedPlayback
+
+# Evento que pygame emite al terminar una pista
+MUSIC_END_EVENT = pygame.USEREVENT + 1
+
+# Espera máxima por comando: los controles responden en milisegundos
+COMMAND_TICK = 0.05
+
+# Salto de los comandos '+' y '-' (segundos)
+SEEK_STEP = 10.0
+
+
+class ConsoleCommandReader:
+    """Hilo único y persistente que lee comandos de la consola durante la reproducción"""
+
+    _instance: Optional["ConsoleCommandReader"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self):
+        self.commands: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._listening = threading.Event()
+        self._lock = threading.Lock()
+        self._reading = False
+        self._closed = False
+        self._stop_commands: Tuple[str, ...] = ()
+        # Línea que se estaba leyendo al terminar la reproducción: se entrega al menú
+        self._handoff = False
+        self._handoff_lines: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._console_input = builtins.input
+
+        self._thread = threading.Thread(target=self._run, daemon=True, name="console-commands")
+        self._thread.start()
+
+    @classmethod
+    def get(cls) -> "ConsoleCommandReader":
+        """Devuelve el lector compartido (se crea una sola vez por proceso)"""
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = ConsoleCommandReader()
+            return cls._instance
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._listening.wait()
+            with self._lock:
+                if not self._listening.is_set():
+                    continue
+                self._reading = True
+
+            try:
+                line: Optional[str] = self._console_input()
+            except EOFError:
+                # Entrada cerrada: no hay más comandos posibles
+                line = None
+                self._closed = True
+
+            with self._lock:
+                self._reading = False
+                if self._handoff:
+                    # La reproducción ya terminó: la línea es la respuesta al menú
+                    self._handoff = False
+                    self._handoff_lines.put(line)
+                    continue
+                command = line.strip().lower() if line is not None else None
+                # Tras un comando de fin no se vuelve a leer: la consola queda para el menú
+                if command is None or command in self._stop_commands:
+                    self._listening.clear()
+            self.commands.put(command)
+
+    def start_listening(self, stop_commands: Tuple[str, ...] = ()) -> None:
+        """Empieza a entregar comandos a la cola (descarta los antiguos)"""
+        with self._lock:
+            # Una lectura pendiente del menú anterior vuelve a ser un comando
+            self._handoff = False
+            builtins.input = self._console_input
+        for pending in (self.commands, self._handoff_lines):
+            while not pending.empty():
+                pending.get_nowait()
+        self._stop_commands = stop_commands
+        self._listening.set()
+
+    def stop_listening(self) -> None:
+        """Deja de leer; si hay una lectura en curso, su línea será la próxima entrada del menú"""
+        with self._lock:
+            self._listening.clear()
+            if self._reading and not self._closed:
+                self._handoff = True
+                builtins.input = self._handoff_input
+
+    def _handoff_input(self, prompt: Any = "") -> str:
+        """input() del menú mientras hay una lectura en curso: toma la línea de ese hilo"""
+        builtins.input = self._console_input
+        print(prompt, end="", flush=True)
+        line = self._handoff_lines.get()
+        if line is None:
+            raise EOFError
+        return line
+
+    def next_command(self, timeout: float) -> Optional[str]:
+        """Espera un comando hasta 'timeout' segundos (None si no llegó ninguno)"""
+        try:
+            command = self.commands.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        return "q" if command is None else command
+
+
+class _FileSlice(io.RawIOBase):
+    """Vista de solo lectura de un archivo a partir de un byte (el decodificador empieza ahí)"""
+
+    def __init__(self, path: str, offset: int):
+        self._file = open(path, 'rb')
+        self._offset = offset
+        self._file.seek(offset)
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        return self._file.readinto(buffer)
+
+    def seek(self, pos: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            pos += self._offset
+        return self._file.seek(pos, whence) - self._offset
+
+    def tell(self) -> int:
+        return self._file.tell() - self._offset
+
+    def close(self) -> None:
+        self._file.close()
+        super().close()
+
+
+class Playlist:
+    """Orden de reproducción de una lista, con modo aleatorio y repetición"""
+
+    def __init__(self, items: List[str], shuffle: bool = False, repeat: bool = False):
+        self.items = list(items)
+        self.shuffle = shuffle
+        self.repeat = repeat
+        self._order = self._new_order()
+        self._next_cycle: Optional[List[int]] = None
+        self.position = 0
+
+    def _new_order(self) -> List[int]:
+        order = list(range(len(self.items)))
+        if self.shuffle:
+            random.shuffle(order)
+        return order
+
+    def current(self) -> Optional[str]:
+        if not self._order:
+            return None
+        return self.items[self._order[self.position]]
+
+    def peek_next(self) -> Optional[str]:
+        """Pista que sonará después de la actual (sin avanzar)"""
+        if self.position + 1 < len(self._order):
+            return self.items[self._order[self.position + 1]]
+        if not self.repeat or not self.items:
+            return None
+
+        # La vuelta siguiente se baraja ya, para que la pista precargada sea la que suene
+        if self._next_cycle is None:
+            self._next_cycle = self._new_order()
+        return self.items[self._next_cycle[0]]
+
+    def advance(self) -> Optional[str]:
+        """Avanza a la siguiente pista; None al terminar la lista"""
+        if self.position + 1 < len(self._order):
+            self.position += 1
+        elif self.repeat and self.items:
+            self._order = self._next_cycle or self._new_order()
+            self._next_cycle = None
+            self.position = 0
+        else:
+            return None
+        return self.current()
+
+
+class PlaybackController:
+    """Bucle de reproducción dirigido por eventos de fin de pista y una cola de comandos"""
+
+    def __init__(self, library: Optional[AudioLibraryIndex] = None, output: Optional[AudioOutputManager] = None):
+        self.reader = ConsoleCommandReader.get()
+        self.library = library
+        self.output = output
+        self.paused = False
+        self.stopped = False
+        self.end_event_enabled = self._enable_end_event()
+        self._open_slice: Optional[_FileSlice] = None
+        # Velocidad de reproducción; distinta de 1 se reproduce con time-stretch
+        self.speed = 1.0
+        self._stretched: Optional[StretchedPlayback] = None
+
+    def _enable_end_event(self) -> bool:
+        """Activa el evento de fin de pista (requiere el subsistema de eventos de pygame)"""
+        try:
+            if not pygame.display.get_init():
+                pygame.display.init()
+            pygame.mixer.music.set_endevent(MUSIC_END_EVENT)
+            return True
+        except pygame.error:
+            # Sin subsistema de eventos se comprueba el estado del mezclador en cada tick
+            return False
+
+    def _track_ended(self) -> bool:
+        if self._stretched is not None:
+            self._stretched.pump()
+            return self._stretched.finished()
+        if self.end_event_enabled:
+            return bool(pygame.event.get(MUSIC_END_EVENT))
+        return not self.paused and not pygame.mixer.music.get_busy()
+
+    def _start_track(self, playlist: Playlist) -> None:
+        """Carga la pista actual y deja la siguiente en cola para que entre sin pausa"""
+        self._stop_stretched()
+        if self.output and self.output.prepare(playlist.current()):
+            # Reiniciar el mezclador anula el evento de fin configurado
+            self.end_event_enabled = self._enable_end_event()
+        self.paused = False
+
+        if self.speed != 1.0:
+            self._stretched = StretchedPlayback(playlist.current(), 0.0, self.speed)
+            self._stretched.pump()
+            return
+
+        pygame.mixer.music.load(playlist.current())
+        self._release_slice()
+        pygame.mixer.music.play()
+        if self.end_event_enabled:
+            # load/stop también emiten el evento de fin
+            pygame.event.clear(MUSIC_END_EVENT)
+        self._queue_next(playlist)
+        self._prepare_seek_index(playlist.current())
+
+    def _stop_stretched(self) -> None:
+        if self._stretched is not None:
+            self._stretched.stop()
+            self._stretched = None
+
+    def _set_paused(self, paused: bool) -> None:
+        if self._stretched is not None:
+            self._stretched.pause() if paused else self._stretched.unpause()
+        elif paused:
+            pygame.mixer.music.pause()
+        else:
+            pygame.mixer.music.unpause()
+        self.paused = paused
+
+    def _prepare_seek_index(self, path: str) -> None:
+        # El índice se calcula en segundo plano para que el primer salto sea inmediato
+        if self.library:
+            threading.Thread(target=self.library.get_seek_index, args=(path,), daemon=True).start()
+
+    def _release_slice(self) -> None:
+        # Se cierra después de cargar otra pista: el mezclador ya no la lee
+        if self._open_slice is not None:
+            self._open_slice.close()
+            self._open_slice = None
+
+    def _track_info(self, path: str) -> Dict[str, Any]:
+        if self.library is None:
+            return {}
+        return self.library.get(path) or {}
+
+    def _seek(self, playlist: Playlist, target: float) -> float:
+        """Salta a 'target' segundos de la pista actual y devuelve la posición real"""
+        path = playlist.current()
+        duration = self._track_info(path).get("duration")
+        target = max(0.0, min(target, duration - 0.5) if duration else target)
+
+        self._stop_stretched()
+        if self.speed != 1.0:
+            # El time-stretch decodifica desde el instante pedido
+            pygame.mixer.music.stop()
+            self._stretched = StretchedPlayback(path, target, self.speed)
+            self._stretched.pump()
+            if self.paused:
+                self._stretched.pause()
+            return target
+
+        seek_index = self.library.get_seek_index(path) if self.library else None
+        offsets = seek_index.get("offsets") if seek_index else None
+
+        if seek_index and seek_index["method"] == "byte_offset" and offsets:
+            # MP3: el índice da el byte del frame; se reproduce desde ahí sin recorrer el archivo
+            slot = min(int(target // seek_index["step"]), len(offsets) - 1)
+            file_slice = _FileSlice(path, offsets[slot])
+            pygame.mixer.music.load(file_slice, "mp3")
+            self._release_slice()
+            self._open_slice = file_slice
+            pygame.mixer.music.play()
+            target = slot * seek_index["step"]
+        else:
+            pygame.mixer.music.load(path)
+            self._release_slice()
+            pygame.mixer.music.play(start=target)
+
+        if self.end_event_enabled:
+            pygame.event.clear(MUSIC_END_EVENT)
+        self._queue_next(playlist)
+        if self.paused:
+            pygame.mixer.music.pause()
+        if self.output:
+            self.output.reset_measurement()
+        return target
+
+    def _queue_next(self, playlist: Playlist) -> None:
+        # Sin evento de fin no se distingue el paso a la pista en cola: carga pista a pista
+        next_path = playlist.peek_next()
+        if self.speed != 1.0:
+            return
+        if self.output and next_path and not self.output.matches(next_path):
+            # Otro formato: se cargará al terminar la actual, con el mezclador reconfigurado
+            return
+        if next_path and self.end_event_enabled:
+            try:
+                pygame.mixer.music.queue(next_path)
+            except pygame.error as e:
+                print(f"\n⚠️ No se pudo precargar {next_path}: {e}")
+
+    def play_files(self, file_paths: List[str], on_track_start: Optional[Callable[[int, str], None]] = None,
+                   shuffle: bool = False, repeat: bool = False) -> bool:
+        """Reproduce las pistas sin pausas entre ellas con controles de consola; devuelve False si se detuvo"""
+        self.paused = False
+        self.stopped = False
+
+        playlist = Playlist(file_paths, shuffle=shuffle, repeat=repeat)
+        if playlist.current() is None:
+            return True
+
+        print("\nReproducción en consola")
+        print("• ENTER: pausar/reanudar")
+        if len(file_paths) > 1 or repeat:
+            print("• n + ENTER: siguiente pista")
+        print("• + / - + ENTER: adelantar/retroceder 10s")
+        print("• ir mm:ss + ENTER: saltar a un instante")
+        print(f"• v 1.5 + ENTER: velocidad ({MIN_SPEED}x–{MAX_SPEED}x, sin cambiar el tono)")
+        print("• s + ENTER: detener")
+        print("• q + ENTER: salir")
+
+        self.reader.start_listening(stop_commands=('s', 'q'))
+        try:
+            if on_track_start:
+                on_track_start(playlist.position, playlist.current())
+            self._start_track(playlist)
+
+            while True:
+                skipped = self._run_track(playlist)
+                if self.stopped or playlist.advance() is None:
+                    break
+
+                if on_track_start:
+                    on_track_start(playlist.position, playlist.current())
+
+                if not skipped and pygame.mixer.music.get_busy():
+                    # La pista en cola ya está sonando: solo se precarga la siguiente
+                    self._queue_next(playlist)
+                    self._prepare_seek_index(playlist.current())
+                    if self.output:
+                        self.output.reset_measurement()
+                else:
+                    self._start_track(playlist)
+        finally:
+            self._stop_stretched()
+            pygame.mixer.music.stop()
+            pygame.mixer.music.unload()
+            self._release_slice()
+            print()
+            self.reader.stop_listening()
+
+        if not self.stopped:
+            print("Reproducción completada")
+        return not self.stopped
+
+    def _run_track(self, playlist: Playlist) -> bool:
+        """Atiende comandos hasta el fin de la pista actual; devuelve True si se saltó con 'n'"""
+        duration = self._track_info(playlist.current()).get("duration")
+        # Posición = instante del último salto + tiempo reproducido desde entonces
+        base_position = 0.0
+        start_time = time.monotonic()
+        # get_pos() sigue contando al pasar a la pista en cola: se mide desde el inicio de esta
+        mixed_origin = max(0.0, pygame.mixer.music.get_pos() / 1000)
+        paused_at = 0.0
+        paused_total = 0.0
+        last_shown = -1
+
+        def position() -> float:
+            now = paused_at if self.paused else time.monotonic()
+            return base_position + (now - start_time - paused_total) * self.speed
+
+        while True:
+            command = self.reader.next_command(COMMAND_TICK)
+
+            if command is not None:
+                target = None
+                if command == '':
+                    if self.paused:
+                        paused_total += time.monotonic() - paused_at
+                        print("▶️ Reproducción reanudada")
+                    else:
+                        paused_at = time.monotonic()
+                        print("⏸️ Reproducción pausada")
+                    self._set_paused(not self.paused)
+                elif command in ('s', 'q'):
+                    pygame.mixer.music.stop()
+                    self.stopped = True
+                    print("⏹️ Reproducción detenida")
+                    return False
+                elif command == 'n':
+                    return True
+                elif command in ('+', '-'):
+                    target = position() + (SEEK_STEP if command == '+' else -SEEK_STEP)
+                elif command.startswith('ir '):
+                    target = parse_timestamp(command[3:])
+                    if target is None:
+                        print("\n❌ Usa el formato 'ir mm:ss'")
+                elif command.startswith('v '):
+                    speed = self._parse_speed(command[2:])
+                    if speed is None:
+                        print(f"\n❌ Velocidad no válida (entre {MIN_SPEED} y {MAX_SPEED})")
+                    elif speed != self.speed:
+                        # Se retoma en el mismo instante con el modo de reproducción adecuado
+                        target = position()
+                        self.speed = speed
+                        print(f"\n⏩ Velocidad {speed}x")
+                else:
+                    print("\n❌ Comando no reconocido")
+
+                if target is not None:
+                    try:
+                        base_position = self._seek(playlist, target)
+                    except (pygame.error, OSError) as e:
+                        print(f"\n❌ No se pudo saltar: {e}")
+                        continue
+                    start_time = paused_at = time.monotonic()
+                    mixed_origin = max(0.0, pygame.mixer.music.get_pos() / 1000)
+                    paused_total = 0.0
+                    last_shown = -1
+
+            if self._track_ended():
+                return False
+
+            if not self.paused:
+                if self.output and self._stretched is None:
+                    mixed = pygame.mixer.music.get_pos() / 1000
+                    if mixed >= 0:
+                        self.output.observe(position() - base_position, mixed - mixed_origin)
+                shown = int(position())
+                if shown != last_shown:
+                    last_shown = shown
+                    total = f" / {format_duration(duration)}" if duration else ""
+                    print(f"\rReproduciendo... {format_duration(shown)}{total}", end="", flush=True)
+
+    @staticmethod
+    def _parse_speed(text: str) -> Optional[float]:
+        try:
+            speed = round(float(text.strip().rstrip('x').replace(',', '.')), 2)
+        except ValueError:
+            return None
+        return speed if MIN_SPEED <= speed <= MAX_SPEED else None
@@ -0,0 +1,65 @@
+import time
+from .study_log import (
+    KIND_FLASHCARD, KIND_QUIZ, concept_accuracy, daily_activity, get_study_log, retention_curve, study_streaks
+)
+
+# Ancho de las barras del panel
+BAR_WIDTH = 20
+# Temas mostrados en el panel
+TOP_CONCEPTS = 10
+
+
+def _bar(fraction: float) -> str:
+    filled = int(round(fraction * BAR_WIDTH))
+    return "█" * filled + "░" * (BAR_WIDTH - filled)
+
+
+class ProgressTool:
+    """Panel de progreso calculado sobre el registro de repasos y respuestas de quiz"""
+
+    def __init__(self):
+        self.log = get_study_log()
+
+    def show_dashboard(self) -> None:
+        """Muestra actividad, rachas, curva de retención y aciertos por tema"""
+        print("\n📊 PANEL DE PROGRESO")
+        print("="*60)
+
+        start = time.perf_counter()
+        columns = self.log.load()
+        total = len(columns["ts"])
+        if not total:
+            print("❌ Todavía no hay repasos ni quizzes registrados.")
+            print("💡 Estudia flashcards o toma un quiz para empezar a ver tu progreso.")
+            return
+
+        flashcards = int((columns["kind"] == KIND_FLASHCARD).sum())
+        quizzes = int((columns["kind"] == KIND_QUIZ).sum())
+        accuracy = float(columns["correct"].mean())
+        current_streak, best_streak = study_streaks(columns)
+        activity = daily_activity(columns)
+        curve = retention_curve(columns)
+        concepts = concept_accuracy(columns, self.log.concepts)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        print(f"📚 Respuestas registradas: {total} ({flashcards} flashcards, {quizzes} preguntas de quiz)")
+        print(f"✅ Aciertos: {accuracy * 100:.1f}%")
+        print(f"🔥 Racha actual: {current_streak} día(s) | 🏆 Mejor racha: {best_streak} día(s)")
+
+        print("\n📅 Últimos 7 días:")
+        busiest = max(activity) or 1
+        for days_ago, count in zip(range(len(activity) - 1, -1, -1), activity):
+            label = "Hoy" if days_ago == 0 else f"-{days_ago} d"
+            print(f"   {label:>5} {_bar(count / busiest)} {count}")
+
+        if curve:
+            print("\n🧠 Retención según días desde el repaso anterior:")
+            for label, count, recalled in curve:
+                print(f"   {label:>8} {_bar(recalled)} {recalled * 100:5.1f}% ({count})")
+
+        if concepts:
+            print("\n🎯 Aciertos por tema:")
+            for name, count, hits in concepts[:TOP_CONCEPTS]:
+                print(f"   {name[:24]:<24} {_bar(hits)} {hits * 100:5.1f}% ({count})")
+
+        print(f"\n⏱️ Calculado en {elapsed_ms:.0f} ms")
@@ -0,0 +1,85 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+from .study_log import question_id
+
+# Tipos de pregunta del banco (el de tema lleva el tema: "tema:fotosintesis")
+QTYPE_MULTIPLE_CHOICE = "opcion_multiple"
+QTYPE_TRUE_FALSE = "verdadero_falso"
+QTYPE_FILL_BLANK = "completar_espacios"
+QTYPE_OPEN = "preguntas_abiertas"
+QTYPE_MIXED = "mixto"
+
+
+def topic_qtype(topic: str) -> str:
+    """Tipo de banco para un quiz por tema (sin distinguir mayúsculas ni espacios sobrantes)"""
+    return "tema:" + " ".join(topic.lower().split())
+
+
+class QuestionBank:
+    """Preguntas ya generadas, por huella del material y tipo, para armar quizzes sin llamar al modelo"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        if db_path is None:
+            db_path = os.path.join(os.path.dirname(__file__), "..", "storage", "quizzes.db")
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_db(self) -> None:
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS bank_questions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    fingerprint TEXT NOT NULL,
+                    qtype TEXT NOT NULL,
+                    item INTEGER NOT NULL,
+                    data TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    UNIQUE (fingerprint, qtype, item)
+                );
+            """)
+
+    @staticmethod
+    def fingerprint(text: str) -> str:
+        """Huella del material de origen (mismo texto -> misma huella)"""
+        return hashlib.sha1(text.strip().encode('utf-8')).hexdigest()
+
+    def count(self, fingerprint: str, qtype: str) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM bank_questions WHERE fingerprint = ? AND qtype = ?",
+                                (fingerprint, qtype)).fetchone()[0]
+
+    def sample(self, fingerprint: str, qtype: str, count: int) -> List[Dict[str, Any]]:
+        """Hasta 'count' preguntas al azar del banco para ese material y tipo"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT data FROM bank_questions WHERE fingerprint = ? AND qtype = ? ORDER BY random() LIMIT ?",
+                (fingerprint, qtype, count)
+            ).fetchall()
+        return [json.loads(row["data"]) for row in rows]
+
+    def add(self, fingerprint: str, qtype: str, questions: List[Dict[str, Any]]) -> int:
+        """Guarda preguntas nuevas (las repetidas se ignoran); devuelve cuántas se agregaron"""
+        now = time.time()
+        rows = [
+            (fingerprint, qtype, question_id(str(question["Q"])), json.dumps(question, ensure_ascii=False), now)
+            for question in questions if isinstance(question, dict) and "Q" in question
+        ]
+        with self._lock, self._connect() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO bank_questions (fingerprint, qtype, item, data, created_at) "
+                "VALUES (?, ?, ?, ?, ?)", rows
+            )
+            return conn.total_changes - before
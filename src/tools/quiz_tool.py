@@ -1,12 +1,30 @@
 import os
 import json
-import random
-from typing import List, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
 import google.generativeai as genai
 from dotenv import load_dotenv
+from .ai_json import parse_ai_items, response_chunks, validate_item
+from .adaptive_quiz import (
+    ItemBank, AdaptiveSelector, estimate_ability, TARGET_SE, MIN_ADAPTIVE_ITEMS, MAX_ADAPTIVE_ITEMS
+)
+from .distractors import build_multiple_choice
+from .question_bank import (
+    QuestionBank, QTYPE_MULTIPLE_CHOICE, QTYPE_TRUE_FALSE, QTYPE_FILL_BLANK, QTYPE_OPEN, QTYPE_MIXED, topic_qtype
+)
+from .search_index import FTS_UNAVAILABLE_MESSAGE, QuizSearchIndex
+from .study_log import KIND_QUIZ, get_study_log, question_id, subject_label
 
 load_dotenv()
 
+# Peticiones simultáneas a la IA (la misma variable que usan las flashcards)
+AI_CONCURRENCY = max(1, int(os.getenv('STUDYBOX_AI_CONCURRENCY', '8')))
+# Preguntas por petición en el quiz mixto: los lotes pequeños vuelven completos y con JSON válido
+MIXED_BATCH_SIZE = 5
+# Tipos del quiz mixto, en el orden en que se intercalan
+MIXED_TYPES = ("multiple_choice", "true_false", "fill_blank")
+
+
 class QuizTool:
     def __init__(self):
         """Inicializa el generador de quiz con IA"""
@@ -28,6 +46,18 @@ class QuizTool:
         # Directorio para almacenar quizzes
         self.storage_dir = os.path.join(os.path.dirname(__file__), "..", "storage", "quizzes")
         os.makedirs(self.storage_dir, exist_ok=True)
+        
+        # Índice de búsqueda sobre las preguntas guardadas
+        self.search_index = QuizSearchIndex(self.storage_dir)
+        
+        # Registro de cada respuesta para el panel de progreso
+        self.study_log = get_study_log()
+        
+        # Dificultad de cada pregunta y habilidad estimada (modo adaptativo)
+        self.item_bank = ItemBank(os.path.join(self.storage_dir, "..", "quizzes.db"))
+        
+        # Banco de preguntas por material y tipo: el modelo solo completa lo que falta
+        self.question_bank = QuestionBank(os.path.join(self.storage_dir, "..", "quizzes.db"))
 
     def generate_quiz(self, processed_texts: List[str]) -> None:
         """Genera quizzes inteligentes usando IA"""
@@ -51,6 +81,8 @@ class QuizTool:
         print("4. Preguntas abiertas")
         print("5. Mixto")
         print("6. Por tema específico")
+        print("7. 🔍 Buscar en quizzes guardados")
+        print("8. 🎯 Quiz adaptativo (con las preguntas guardadas)")
         print("0. Volver")
         
         while True:
@@ -78,8 +110,14 @@ class QuizTool:
                 elif choice == "6":
                     self._generate_topic_quiz(processed_texts)
                     break
+                elif choice == "7":
+                    self.search_quizzes()
+                    break
+                elif choice == "8":
+                    self.take_adaptive_quiz()
+                    break
                 else:
-                    print("Opción inválida. Selecciona 1-6 o 0.")
+                    print("Opción inválida. Selecciona 1-8 o 0.")
                     
             except KeyboardInterrupt:
                 print("\n👋 Regresando al menú principal...")
@@ -95,13 +133,11 @@ class QuizTool:
         combined_text = "\n\n".join(texts)
         context = combined_text[:8000]
         
-        if not self.ai_available:
-            quiz = self._generate_simple_multiple_choice(context, num_questions)
-        else:
-            quiz = self._generate_ai_multiple_choice(context, num_questions)
+        quiz = self._assemble_quiz(context, QTYPE_MULTIPLE_CHOICE, num_questions,
+                                   self._generate_ai_multiple_choice, self._generate_simple_multiple_choice)
         
         if quiz:
-            self._save_and_display_quiz(quiz, "opcion_multiple")
+            self._save_and_display_quiz(quiz, "opcion_multiple", subject_label(texts=texts))
         else:
             print("No se pudo generar el quiz.")
 
@@ -113,13 +149,11 @@ class QuizTool:
         combined_text = "\n\n".join(texts)
         context = combined_text[:8000]
         
-        if not self.ai_available:
-            quiz = self._generate_simple_true_false(context, num_questions)
-        else:
-            quiz = self._generate_ai_true_false(context, num_questions)
+        quiz = self._assemble_quiz(context, QTYPE_TRUE_FALSE, num_questions,
+                                   self._generate_ai_true_false, self._generate_simple_true_false)
         
         if quiz:
-            self._save_and_display_quiz(quiz, "verdadero_falso")
+            self._save_and_display_quiz(quiz, "verdadero_falso", subject_label(texts=texts))
         else:
             print("No se pudo generar el quiz.")
 
@@ -131,13 +165,11 @@ class QuizTool:
         combined_text = "\n\n".join(texts)
         context = combined_text[:8000]
         
-        if not self.ai_available:
-            quiz = self._generate_simple_fill_blank(context, num_questions)
-        else:
-            quiz = self._generate_ai_fill_blank(context, num_questions)
+        quiz = self._assemble_quiz(context, QTYPE_FILL_BLANK, num_questions,
+                                   self._generate_ai_fill_blank, self._generate_simple_fill_blank)
         
         if quiz:
-            self._save_and_display_quiz(quiz, "completar_espacios")
+            self._save_and_display_quiz(quiz, "completar_espacios", subject_label(texts=texts))
         else:
             print("No se pudo generar el quiz.")
 
@@ -149,13 +181,11 @@ class QuizTool:
         combined_text = "\n\n".join(texts)
         context = combined_text[:8000]
         
-        if not self.ai_available:
-            quiz = self._generate_simple_open_questions(context, num_questions)
-        else:
-            quiz = self._generate_ai_open_questions(context, num_questions)
+        quiz = self._assemble_quiz(context, QTYPE_OPEN, num_questions,
+                                   self._generate_ai_open_questions, self._generate_simple_open_questions)
         
         if quiz:
-            self._save_and_display_quiz(quiz, "preguntas_abiertas")
+            self._save_and_display_quiz(quiz, "preguntas_abiertas", subject_label(texts=texts))
         else:
             print("No se pudo generar el quiz.")
 
@@ -167,13 +197,10 @@ class QuizTool:
         combined_text = "\n\n".join(texts)
         context = combined_text[:8000]
         
-        if not self.ai_available:
-            quiz = self._generate_simple_mixed(context, num_questions)
-        else:
-            quiz = self._generate_ai_mixed(context, num_questions)
+        quiz = self._assemble_mixed_quiz(context, num_questions)
         
         if quiz:
-            self._save_and_display_quiz(quiz, "mixto")
+            self._save_and_display_quiz(quiz, "mixto", subject_label(texts=texts))
         else:
             print("No se pudo generar el quiz.")
 
@@ -190,16 +217,122 @@ class QuizTool:
         combined_text = "\n\n".join(texts)
         context = combined_text[:8000]
         
-        if not self.ai_available:
-            quiz = self._generate_simple_topic(context, num_questions, topic)
-        else:
-            quiz = self._generate_ai_topic(context, num_questions, topic)
+        quiz = self._assemble_quiz(
+            context, topic_qtype(topic), num_questions,
+            lambda text, n, exclude: self._generate_ai_topic(text, n, topic, exclude),
+            lambda text, n: self._generate_simple_topic(text, n, topic)
+        )
         
         if quiz:
-            self._save_and_display_quiz(quiz, f"tema_{topic.replace(' ', '_')}")
+            self._save_and_display_quiz(quiz, f"tema_{topic.replace(' ', '_')}", subject_label(topic))
         else:
             print("No se pudo generar el quiz.")
 
+    def _assemble_quiz(self, context: str, qtype: str, num_questions: int,
+                       generate_ai: Callable[[str, int, List[str]], List[Dict[str, Any]]],
+                       generate_simple: Callable[[str, int], List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Arma el quiz con preguntas del banco y pide al modelo solo las que faltan"""
+        fingerprint = self.question_bank.fingerprint(context)
+        quiz = self._sample_bank(fingerprint, qtype, num_questions)
+        
+        missing = num_questions - len(quiz)
+        if missing <= 0:
+            return quiz
+        
+        asked = {question_id(str(question["Q"])) for question in quiz}
+        if self.ai_available:
+            print(f"🤖 Generando {missing} pregunta(s) nueva(s)...")
+            new_questions: List[Dict[str, Any]] = []
+            try:
+                new_questions = generate_ai(context, missing, [str(question["Q"]) for question in quiz])
+            except Exception as e:
+                print(f"❌ Error generando preguntas con IA: {e}")
+            self._bank_questions(fingerprint, qtype, new_questions)
+            self._add_unique(quiz, new_questions, asked, num_questions)
+        
+        # Lo que falte (también si el modelo repitió preguntas del banco) lo completa el quiz básico
+        if len(quiz) < num_questions:
+            self._add_unique(quiz, generate_simple(context, num_questions - len(quiz)), asked, num_questions)
+        return quiz
+
+    def _assemble_mixed_quiz(self, context: str, num_questions: int) -> List[Dict[str, Any]]:
+        """Arma el quiz mixto respetando la mezcla pedida: banco, modelo y quiz básico, cada tipo por separado"""
+        fingerprint = self.question_bank.fingerprint(context)
+        quotas = self._mixed_quotas(num_questions)
+        results: Dict[str, List[Dict[str, Any]]] = {kind: [] for kind in MIXED_TYPES}
+        asked: set = set()
+        for question in self._sample_bank(fingerprint, QTYPE_MIXED, num_questions):
+            kind = question.get("Type")
+            if kind in results:
+                self._add_unique(results[kind], [question], asked, quotas[kind])
+        
+        shortfall = {kind: quotas[kind] - len(results[kind]) for kind in MIXED_TYPES}
+        if self.ai_available and any(shortfall.values()):
+            print(f"🤖 Generando {sum(shortfall.values())} pregunta(s) nueva(s)...")
+            exclude = [str(question["Q"]) for questions in results.values() for question in questions]
+            new_questions: Dict[str, List[Dict[str, Any]]] = {kind: [] for kind in MIXED_TYPES}
+            try:
+                new_questions = self._generate_ai_mixed(context, shortfall, exclude)
+            except Exception as e:
+                print(f"❌ Error generando preguntas con IA: {e}")
+            self._bank_questions(fingerprint, QTYPE_MIXED,
+                                 [question for questions in new_questions.values() for question in questions])
+            for kind in MIXED_TYPES:
+                self._add_unique(results[kind], new_questions[kind], asked, quotas[kind])
+            shortfall = {kind: quotas[kind] - len(results[kind]) for kind in MIXED_TYPES}
+        
+        # Cada tipo que quedó corto se completa con su propio generador básico
+        if any(shortfall.values()):
+            basic = self._generate_simple_mixed(context, shortfall)
+            for kind in MIXED_TYPES:
+                self._add_unique(results[kind], basic[kind], asked, quotas[kind])
+        
+        return self._interleave_types(results)
+
+    def _sample_bank(self, fingerprint: str, qtype: str, count: int) -> List[Dict[str, Any]]:
+        """Preguntas guardadas para este material y tipo (ninguna si el banco no se puede leer)"""
+        try:
+            quiz = self.question_bank.sample(fingerprint, qtype, count)
+        except Exception as e:
+            print(f"⚠️ No se pudo leer el banco de preguntas: {e}")
+            return []
+        if quiz:
+            print(f"📦 {len(quiz)} pregunta(s) tomadas del banco para este material")
+        return quiz
+
+    def _bank_questions(self, fingerprint: str, qtype: str, questions: List[Dict[str, Any]]) -> None:
+        """Guarda en el banco las preguntas nuevas del modelo.
+
+        Solo se guarda lo que produjo el modelo: las preguntas básicas se regeneran al instante
+        y no deben impedir que el modelo complete el banco cuando vuelva a estar disponible.
+        """
+        if not questions:
+            return
+        try:
+            added = self.question_bank.add(fingerprint, qtype, questions)
+            if added:
+                print(f"💾 {added} pregunta(s) nueva(s) guardada(s) en el banco")
+        except Exception as e:
+            print(f"⚠️ No se pudo actualizar el banco de preguntas: {e}")
+
+    @staticmethod
+    def _add_unique(quiz: List[Dict[str, Any]], questions: List[Dict[str, Any]], asked: set, limit: int) -> None:
+        """Agrega al quiz las preguntas que todavía no tiene, hasta 'limit'"""
+        for question in questions:
+            if len(quiz) >= limit:
+                break
+            if isinstance(question, dict) and "Q" in question and question_id(str(question["Q"])) not in asked:
+                asked.add(question_id(str(question["Q"])))
+                quiz.append(question)
+
+    @staticmethod
+    def _exclusion_note(exclude: Sequence[str]) -> str:
+        """Sección del prompt con las preguntas que ya tiene el quiz, para que el modelo no las repita"""
+        if not exclude:
+            return ""
+        listed = "\n".join(f"        - {question}" for question in exclude)
+        return f"\n        NO REPITAS ESTAS PREGUNTAS (ya están en el quiz):\n{listed}\n"
+
     def _get_quiz_length(self) -> int:
         """Obtiene el número de preguntas para el quiz"""
         while True:
@@ -216,104 +349,52 @@ class QuizTool:
             except ValueError:
                 print("❌ Ingresa un número válido.")
 
-    def _generate_ai_multiple_choice(self, text: str, num_questions: int) -> List[Dict[str, Any]]:
-        """Genera quiz de opción múltiple usando IA"""
-        try:
-            prompt = f"""
-            Genera {num_questions} preguntas de opción múltiple de alta calidad basadas en el siguiente contenido:
-            
-            CONTENIDO:
-            {text}
-            
-            FORMATO REQUERIDO:
-            - Cada pregunta debe tener 4 opciones (A, B, C, D)
-            - Solo una respuesta debe ser correcta
-            - Las opciones incorrectas deben ser plausibles pero incorrectas
-            - Las preguntas deben cubrir conceptos importantes del contenido
-            - Usa un lenguaje claro y académico
-            
-            RESPONDE SOLO EN FORMATO JSON:
-            [
-                {{
-                    "Q": "Pregunta 1",
-                    "Options": ["Opción A", "Opción B", "Opción C", "Opción D"],
-                    "Answer": "A",
-                    "Explanation": "Explicación de por qué es correcta"
-                }},
-                ...
-            ]
-            
-            IMPORTANTE: Responde únicamente con el JSON, sin texto adicional.
-            """
-            
-            response = self.model.generate_content(prompt)
-            ai_text = response.text.strip()
-            
-            # Limpiar respuesta si tiene markdown
-            if ai_text.startswith("```json"):
-                ai_text = ai_text[7:]
-            if ai_text.endswith("```"):
-                ai_text = ai_text[:-3]
-            
-            quiz = json.loads(ai_text)
-            
-            # Validar formato
-            if isinstance(quiz, list) and all(
-                isinstance(q, dict) and "Q" in q and "Options" in q and "Answer" in q
-                for q in quiz
-            ):
-                return quiz
-            else:
-                print("⚠️ Formato de respuesta de IA inválido.")
-                return self._generate_simple_multiple_choice(text, num_questions)
-                
-        except json.JSONDecodeError as e:
-            print(f"⚠️ Error parseando respuesta de IA: {e}")
-            return self._generate_simple_multiple_choice(text, num_questions)
-        except Exception as e:
-            print(f"❌ Error generando quiz con IA: {e}")
-            return self._generate_simple_multiple_choice(text, num_questions)
+    def _request_ai_items(self, prompt: str, kind: str, num_questions: int) -> List[Dict[str, Any]]:
+        """Pide preguntas al modelo sin respaldo básico: lanza una excepción si no llega ninguna válida"""
+        response = self.model.generate_content(prompt, stream=True)
+        quiz = parse_ai_items(response_chunks(response), kind, num_questions)
+        if not quiz:
+            raise ValueError("formato de respuesta de IA inválido")
+        return quiz
 
-    def _generate_simple_multiple_choice(self, text: str, num_questions: int) -> List[Dict[str, Any]]:
-        """Genera quiz simple de opción múltiple como fallback"""
-        print("📝 Generando quiz básico de opción múltiple...")
-        
-        sentences = [s.strip() for s in text.split('.') if s.strip()]
-        quiz = []
+    def _generate_ai_multiple_choice(self, text: str, num_questions: int,
+                                     exclude: Sequence[str] = ()) -> List[Dict[str, Any]]:
+        """Genera quiz de opción múltiple usando IA"""
+        prompt = f"""
+        Genera {num_questions} preguntas de opción múltiple de alta calidad basadas en el siguiente contenido:
         
-        for i in range(min(num_questions, len(sentences))):
-            if i < len(sentences):
-                sentence = sentences[i]
-                if len(sentence) > 20:
-                    quiz.append({
-                        "Q": f"¿Qué información importante se menciona en: '{sentence[:50]}...'?",
-                        "Options": [
-                            sentence[:30] + "...",
-                            "Información relacionada",
-                            "Datos complementarios", 
-                            "Información adicional"
-                        ],
-                        "Answer": "A",
-                        "Explanation": f"La respuesta correcta es la primera opción basada en el contenido."
-                    })
+        CONTENIDO:
+        {text}
+        {self._exclusion_note(exclude)}
+        FORMATO REQUERIDO:
+        - Cada pregunta debe tener 4 opciones (A, B, C, D)
+        - Solo una respuesta debe ser correcta
+        - Las opciones incorrectas deben ser plausibles pero incorrectas
+        - Las preguntas deben cubrir conceptos importantes del contenido
+        - Usa un lenguaje claro y académico
         
-        # Completar con preguntas genéricas si no hay suficientes
-        while len(quiz) < num_questions:
-            quiz.append({
-                "Q": f"¿Cuál es un concepto importante del contenido estudiado?",
-                "Options": [
-                    "Concepto clave del material",
-                    "Información secundaria",
-                    "Datos irrelevantes",
-                    "Información desactualizada"
-                ],
+        RESPONDE SOLO EN FORMATO JSON:
+        [
+            {{
+                "Q": "Pregunta 1",
+                "Options": ["Opción A", "Opción B", "Opción C", "Opción D"],
                 "Answer": "A",
-                "Explanation": "La primera opción representa un concepto clave del material."
-            })
+                "Explanation": "Explicación de por qué es correcta"
+            }},
+            ...
+        ]
         
-        return quiz
+        IMPORTANTE: Responde únicamente con el JSON, sin texto adicional.
+        """
+        
+        return self._request_ai_items(prompt, "multiple_choice", num_questions)
+
+    def _generate_simple_multiple_choice(self, text: str, num_questions: int) -> List[Dict[str, Any]]:
+        """Genera quiz de opción múltiple sin IA: distractores tomados del propio material"""
+        print("📝 Generando quiz básico de opción múltiple...")
+        return build_multiple_choice(text, num_questions)
 
-    def _save_and_display_quiz(self, quiz: List[Dict[str, Any]], filename_prefix: str) -> None:
+    def _save_and_display_quiz(self, quiz: List[Dict[str, Any]], filename_prefix: str, subject: str) -> None:
         """Guarda y muestra el quiz generado"""
         import datetime
         
@@ -326,6 +407,7 @@ class QuizTool:
             with open(filepath, 'w', encoding='utf-8') as f:
                 json.dump(quiz, f, ensure_ascii=False, indent=2)
             print(f"\n💾 Quiz guardado en: {filepath}")
+            self._index_quiz(filepath, quiz, subject)
         except Exception as e:
             print(f"❌ Error guardando quiz: {e}")
         
@@ -348,9 +430,9 @@ class QuizTool:
             print("-" * 40)
         
         # Opciones adicionales
-        self._show_quiz_options(filepath, quiz)
+        self._show_quiz_options(filepath, quiz, subject)
 
-    def _show_quiz_options(self, filepath: str, quiz: List[Dict[str, Any]]) -> None:
+    def _show_quiz_options(self, filepath: str, quiz: List[Dict[str, Any]], subject: str = "general") -> None:
         """Muestra opciones adicionales para el quiz"""
         print(f"\n🎯 OPCIONES ADICIONALES:")
         print("1. 🎮 Tomar el quiz ahora")
@@ -367,7 +449,7 @@ class QuizTool:
                     print("✅ Generación de quiz completada.")
                     break
                 elif choice == "1":
-                    self._take_quiz_interactive(quiz)
+                    self._take_quiz_interactive(quiz, subject)
                     break
                 elif choice == "2":
                     print("🔄 Redirigiendo a generación de otro quiz...")
@@ -387,8 +469,8 @@ class QuizTool:
             except Exception as e:
                 print(f"❌ Error: {e}")
 
-    def _take_quiz_interactive(self, quiz: List[Dict[str, Any]]) -> None:
-        """Permite tomar el quiz de forma interactiva"""
+    def _take_quiz_interactive(self, quiz: List[Dict[str, Any]], subject: str = "general") -> None:
+        """Permite tomar el quiz de forma interactiva (cada respuesta queda registrada)"""
         print(f"\nTomando quiz interactivo")
         print("-"*50)
         print("📚 Responde las preguntas del quiz")
@@ -401,32 +483,17 @@ class QuizTool:
         
         for i, question in enumerate(quiz, 1):
             print(f"\n📋 Pregunta {i}/{total_questions}")
-            print(f"❓ {question['Q']}")
-            
-            if 'Options' in question:
-                for j, option in enumerate(question['Options']):
-                    letter = chr(65 + j)
-                    print(f"   {letter}. {option}")
-            
-            user_answer = input("\nTu respuesta: ").strip().upper()
-            
-            if user_answer == "SALIR":
+            is_correct = self._ask_question(question)
+            if is_correct is None:
                 print("Terminando quiz...")
                 break
-            
-            correct_answer = question['Answer'].upper()
-            
-            if user_answer == correct_answer:
+            if is_correct:
                 correct_answers += 1
-                print("🎉 ¡Correcto!")
-            else:
-                print(f"❌ Incorrecto. La respuesta correcta es: {correct_answer}")
-            
-            if 'Explanation' in question:
-                print(f"💡 Explicación: {question['Explanation']}")
-            
+            self._record_answer(question, subject, is_correct)
             print("-" * 30)
         
+        self.study_log.flush()
+        
         # Mostrar resultados
         if total_questions > 0:
             percentage = (correct_answers / total_questions) * 100
@@ -443,6 +510,174 @@ class QuizTool:
             else:
                 print("📖 Te recomiendo estudiar más el material.")
 
+    def _ask_question(self, question: Dict[str, Any]) -> Optional[bool]:
+        """Muestra una pregunta y corrige la respuesta; None si el usuario escribe 'salir'"""
+        print(f"❓ {question['Q']}")
+        
+        if 'Options' in question:
+            for j, option in enumerate(question['Options']):
+                letter = chr(65 + j)
+                print(f"   {letter}. {option}")
+        
+        user_answer = input("\nTu respuesta: ").strip().upper()
+        
+        if user_answer == "SALIR":
+            return None
+        
+        correct_answer = question['Answer'].upper()
+        
+        is_correct = user_answer == correct_answer
+        if is_correct:
+            print("🎉 ¡Correcto!")
+        else:
+            print(f"❌ Incorrecto. La respuesta correcta es: {correct_answer}")
+        
+        if 'Explanation' in question:
+            print(f"💡 Explicación: {question['Explanation']}")
+        return is_correct
+
+    def _record_answer(self, question: Dict[str, Any], subject: str, is_correct: bool) -> None:
+        """Registra la respuesta para el panel de progreso y recalibra la dificultad de la pregunta"""
+        item = question_id(question['Q'])
+        self.study_log.record(KIND_QUIZ, item, subject, is_correct, int(is_correct))
+        try:
+            self.item_bank.update(item, is_correct)
+        except Exception as e:
+            print(f"⚠️ No se pudo actualizar la dificultad de la pregunta: {e}")
+
+    def take_adaptive_quiz(self) -> None:
+        """Quiz adaptativo: cada pregunta es la más informativa para el nivel estimado hasta ahora"""
+        print("\n🎯 QUIZ ADAPTATIVO")
+        print("="*50)
+        
+        try:
+            self.search_index.sync()
+        except Exception as e:
+            print(f"⚠️ No se pudo actualizar el índice de búsqueda: {e}")
+        
+        topic = input("Tema (parte del nombre o tema del quiz, Enter para todos): ").strip()
+        
+        # Banco: preguntas guardadas sin repetir (la misma pregunta puede estar en varios quizzes).
+        # Solo las que se corrigen por coincidencia exacta: opción múltiple y verdadero/falso; una
+        # respuesta libre mal calificada como incorrecta falsearía la dificultad y la habilidad
+        questions: Dict[int, Tuple[str, Dict[str, Any]]] = {}
+        for row in self.search_index.questions(topic):
+            if not row["options"] and row["answer"] not in ("Verdadero", "Falso"):
+                continue
+            question = {"Q": row["question"], "Answer": row["answer"]}
+            if row["options"]:
+                question["Options"] = row["options"].split("\n")
+            if row["explanation"]:
+                question["Explanation"] = row["explanation"]
+            questions.setdefault(question_id(row["question"]), (row["subject"], question))
+        
+        if not questions:
+            print("❌ No hay preguntas guardadas para ese tema.")
+            print("💡 Genera algunos quizzes primero.")
+            return
+        
+        # Ítems sin calibrar: dificultad inicial a partir del historial de respuestas
+        self.item_bank.fit_from_history(self.study_log.load(), list(questions))
+        known = self.item_bank.difficulties(list(questions))
+        start_ability, _ = self.item_bank.ability()
+        selector = AdaptiveSelector({
+            item: known[item][0] if item in known else start_ability for item in questions
+        })
+        
+        print(f"📚 Banco: {len(selector)} preguntas")
+        print("• Las preguntas se ajustan a tu nivel; el quiz termina cuando la estimación es confiable")
+        print("• Escribe 'salir' para terminar")
+        print("="*50)
+        
+        difficulties: List[float] = []
+        responses: List[bool] = []
+        ability, standard_error = start_ability, float('inf')
+        
+        while len(responses) < MAX_ADAPTIVE_ITEMS:
+            item = selector.next_item(ability)
+            if item is None:
+                print("\n📭 No quedan más preguntas en el banco.")
+                break
+            
+            subject, question = questions[item]
+            difficulty = known[item][0] if item in known else start_ability
+            print(f"\n📋 Pregunta {len(responses) + 1} (dificultad {difficulty:+.1f})")
+            is_correct = self._ask_question(question)
+            if is_correct is None:
+                print("Terminando quiz...")
+                break
+            
+            self._record_answer(question, subject, is_correct)
+            difficulties.append(difficulty)
+            responses.append(is_correct)
+            ability, standard_error = estimate_ability(difficulties, responses, prior_mean=start_ability)
+            print(f"📈 Nivel estimado: {ability:+.2f} ± {standard_error:.2f}")
+            print("-" * 30)
+            
+            if len(responses) >= MIN_ADAPTIVE_ITEMS and standard_error <= TARGET_SE:
+                print("\n✅ Estimación confiable alcanzada.")
+                break
+        
+        self.study_log.flush()
+        
+        if responses:
+            print(f"\n📊 RESULTADOS DEL QUIZ ADAPTATIVO:")
+            print(f"✅ Respuestas correctas: {sum(responses)}/{len(responses)}")
+            print(f"📈 Nivel estimado: {ability:+.2f} ± {standard_error:.2f}")
+            print(f"🎯 Aciertos esperados en todo el banco: {selector.mastery(ability) * 100:.1f}%")
+
+    def _index_quiz(self, filepath: str, quiz: List[Dict[str, Any]], subject: Optional[str] = None) -> None:
+        """Actualiza el índice de búsqueda con el quiz recién guardado"""
+        try:
+            self.search_index.index_quiz(os.path.basename(filepath), quiz, subject=subject)
+        except Exception as e:
+            print(f"⚠️ No se pudo actualizar el índice de búsqueda: {e}")
+
+    def search_quizzes(self) -> None:
+        """Busca texto en las preguntas, opciones y explicaciones de todos los quizzes"""
+        import time
+        
+        print("\n🔍 BUSCAR EN QUIZZES GUARDADOS:")
+        print("="*50)
+        if not self.search_index.search_available:
+            print(FTS_UNAVAILABLE_MESSAGE)
+            return
+        print("• Escribe palabras (la última puede estar incompleta)")
+        print("• Enter vacío para terminar")
+        
+        try:
+            self.search_index.sync()
+        except Exception as e:
+            print(f"⚠️ No se pudo actualizar el índice de búsqueda: {e}")
+        
+        while True:
+            text = input("\n🔍 Buscar: ").strip()
+            if not text:
+                break
+            
+            start = time.perf_counter()
+            try:
+                results = self.search_index.search(text)
+            except Exception as e:
+                print(f"❌ Error buscando: {e}")
+                continue
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            
+            if not results:
+                print(f"Sin resultados ({elapsed_ms:.1f} ms)")
+                continue
+            
+            print(f"{len(results)} resultado(s) en {elapsed_ms:.1f} ms:")
+            for i, result in enumerate(results, 1):
+                print(f"\n{i}. 📋 {result['filename']} (pregunta {result['position'] + 1})")
+                print(f"   ❓ {result['question']}")
+                if result['options']:
+                    for j, option in enumerate(result['options'].split("\n")):
+                        print(f"      {chr(65 + j)}. {option}")
+                print(f"   ✅ Respuesta: {result['answer']}")
+                if result['explanation']:
+                    print(f"   💡 {result['explanation']}")
+
     def list_saved_quizzes(self) -> None:
         """Lista todos los quizzes guardados"""
         print("\n📚 QUIZZES GUARDADOS:")
@@ -470,48 +705,35 @@ class QuizTool:
         print(f"\nTotal: {len(files)} archivos de quiz")
 
     # Métodos para generar otros tipos de quiz
-    def _generate_ai_true_false(self, text: str, num_questions: int) -> List[Dict[str, Any]]:
+    def _generate_ai_true_false(self, text: str, num_questions: int,
+                                exclude: Sequence[str] = ()) -> List[Dict[str, Any]]:
         """Genera quiz de verdadero/falso usando IA"""
-        try:
-            prompt = f"""
-            Genera {num_questions} preguntas de verdadero/falso basadas en el siguiente contenido:
-            
-            CONTENIDO:
-            {text}
-            
-            FORMATO REQUERIDO:
-            - Cada pregunta debe ser una afirmación clara
-            - La respuesta debe ser "Verdadero" o "Falso"
-            - Las afirmaciones deben ser específicas y verificables
-            - Usa un lenguaje claro y académico
-            
-            RESPONDE SOLO EN FORMATO JSON:
-            [
-                {{
-                    "Q": "Afirmación 1",
-                    "Answer": "Verdadero",
-                    "Explanation": "Explicación de por qué es verdadero/falso"
-                }},
-                ...
-            ]
-            
-            IMPORTANTE: Responde únicamente con el JSON, sin texto adicional.
-            """
-            
-            response = self.model.generate_content(prompt)
-            ai_text = response.text.strip()
-            
-            if ai_text.startswith("```json"):
-                ai_text = ai_text[7:]
-            if ai_text.endswith("```"):
-                ai_text = ai_text[:-3]
-            
-            quiz = json.loads(ai_text)
-            return quiz if isinstance(quiz, list) else self._generate_simple_true_false(text, num_questions)
-                
-        except Exception as e:
-            print(f"❌ Error generando quiz V/F con IA: {e}")
-            return self._generate_simple_true_false(text, num_questions)
+        prompt = f"""
+        Genera {num_questions} preguntas de verdadero/falso basadas en el siguiente contenido:
+        
+        CONTENIDO:
+        {text}
+        {self._exclusion_note(exclude)}
+        FORMATO REQUERIDO:
+        - Cada pregunta debe ser una afirmación clara
+        - La respuesta debe ser "Verdadero" o "Falso"
+        - Las afirmaciones deben ser específicas y verificables
+        - Usa un lenguaje claro y académico
+        
+        RESPONDE SOLO EN FORMATO JSON:
+        [
+            {{
+                "Q": "Afirmación 1",
+                "Answer": "Verdadero",
+                "Explanation": "Explicación de por qué es verdadero/falso"
+            }},
+            ...
+        ]
+        
+        IMPORTANTE: Responde únicamente con el JSON, sin texto adicional.
+        """
+        
+        return self._request_ai_items(prompt, "true_false", num_questions)
 
     def _generate_simple_true_false(self, text: str, num_questions: int) -> List[Dict[str, Any]]:
         """Genera quiz simple de verdadero/falso"""
@@ -534,47 +756,34 @@ class QuizTool:
         
         return quiz
 
-    def _generate_ai_fill_blank(self, text: str, num_questions: int) -> List[Dict[str, Any]]:
+    def _generate_ai_fill_blank(self, text: str, num_questions: int,
+                                exclude: Sequence[str] = ()) -> List[Dict[str, Any]]:
         """Genera quiz de completar espacios usando IA"""
-        try:
-            prompt = f"""
-            Genera {num_questions} preguntas de completar espacios basadas en el siguiente contenido:
-            
-            CONTENIDO:
-            {text}
-            
-            FORMATO REQUERIDO:
-            - Cada pregunta debe tener un espacio en blanco marcado con "_____"
-            - La respuesta debe ser la palabra o frase que completa el espacio
-            - Las preguntas deben ser educativas y claras
-            
-            RESPONDE SOLO EN FORMATO JSON:
-            [
-                {{
-                    "Q": "Pregunta con _____ en blanco",
-                    "Answer": "respuesta_correcta",
-                    "Explanation": "Explicación de la respuesta"
-                }},
-                ...
-            ]
-            
-            IMPORTANTE: Responde únicamente con el JSON, sin texto adicional.
-            """
-            
-            response = self.model.generate_content(prompt)
-            ai_text = response.text.strip()
-            
-            if ai_text.startswith("```json"):
-                ai_text = ai_text[7:]
-            if ai_text.endswith("```"):
-                ai_text = ai_text[:-3]
-            
-            quiz = json.loads(ai_text)
-            return quiz if isinstance(quiz, list) else self._generate_simple_fill_blank(text, num_questions)
-                
-        except Exception as e:
-            print(f"❌ Error generando quiz de completar con IA: {e}")
-            return self._generate_simple_fill_blank(text, num_questions)
+        prompt = f"""
+        Genera {num_questions} preguntas de completar espacios basadas en el siguiente contenido:
+        
+        CONTENIDO:
+        {text}
+        {self._exclusion_note(exclude)}
+        FORMATO REQUERIDO:
+        - Cada pregunta debe tener un espacio en blanco marcado con "_____"
+        - La respuesta debe ser la palabra o frase que completa el espacio
+        - Las preguntas deben ser educativas y claras
+        
+        RESPONDE SOLO EN FORMATO JSON:
+        [
+            {{
+                "Q": "Pregunta con _____ en blanco",
+                "Answer": "respuesta_correcta",
+                "Explanation": "Explicación de la respuesta"
+            }},
+            ...
+        ]
+        
+        IMPORTANTE: Responde únicamente con el JSON, sin texto adicional.
+        """
+        
+        return self._request_ai_items(prompt, "fill_blank", num_questions)
 
     def _generate_simple_fill_blank(self, text: str, num_questions: int) -> List[Dict[str, Any]]:
         """Genera quiz simple de completar espacios"""
@@ -599,47 +808,34 @@ class QuizTool:
         
         return quiz
 
-    def _generate_ai_open_questions(self, text: str, num_questions: int) -> List[Dict[str, Any]]:
+    def _generate_ai_open_questions(self, text: str, num_questions: int,
+                                    exclude: Sequence[str] = ()) -> List[Dict[str, Any]]:
         """Genera quiz de preguntas abiertas usando IA"""
-        try:
-            prompt = f"""
-            Genera {num_questions} preguntas abiertas basadas en el siguiente contenido:
-            
-            CONTENIDO:
-            {text}
-            
-            FORMATO REQUERIDO:
-            - Cada pregunta debe requerir una respuesta elaborada
-            - Incluye una respuesta modelo como referencia
-            - Las preguntas deben fomentar el pensamiento crítico
-            
-            RESPONDE SOLO EN FORMATO JSON:
-            [
-                {{
-                    "Q": "Pregunta abierta 1",
-                    "Answer": "Respuesta modelo detallada",
-                    "Explanation": "Puntos clave que debe incluir la respuesta"
-                }},
-                ...
-            ]
-            
-            IMPORTANTE: Responde únicamente con el JSON, sin texto adicional.
-            """
-            
-            response = self.model.generate_content(prompt)
-            ai_text = response.text.strip()
-            
-            if ai_text.startswith("```json"):
-                ai_text = ai_text[7:]
-            if ai_text.endswith("```"):
-                ai_text = ai_text[:-3]
-            
-            quiz = json.loads(ai_text)
-            return quiz if isinstance(quiz, list) else self._generate_simple_open_questions(text, num_questions)
-                
-        except Exception as e:
-            print(f"❌ Error generando preguntas abiertas con IA: {e}")
-            return self._generate_simple_open_questions(text, num_questions)
+        prompt = f"""
+        Genera {num_questions} preguntas abiertas basadas en el siguiente contenido:
+        
+        CONTENIDO:
+        {text}
+        {self._exclusion_note(exclude)}
+        FORMATO REQUERIDO:
+        - Cada pregunta debe requerir una respuesta elaborada
+        - Incluye una respuesta modelo como referencia
+        - Las preguntas deben fomentar el pensamiento crítico
+        
+        RESPONDE SOLO EN FORMATO JSON:
+        [
+            {{
+                "Q": "Pregunta abierta 1",
+                "Answer": "Respuesta modelo detallada",
+                "Explanation": "Puntos clave que debe incluir la respuesta"
+            }},
+            ...
+        ]
+        
+        IMPORTANTE: Responde únicamente con el JSON, sin texto adicional.
+        """
+        
+        return self._request_ai_items(prompt, "open", num_questions)
 
     def _generate_simple_open_questions(self, text: str, num_questions: int) -> List[Dict[str, Any]]:
         """Genera quiz simple de preguntas abiertas"""
@@ -655,153 +851,119 @@ class QuizTool:
         
         return quiz
 
-    def _generate_ai_mixed(self, text: str, num_questions: int) -> List[Dict[str, Any]]:
-        """Genera quiz mixto usando IA"""
-        try:
-            prompt = f"""
-            Genera {num_questions} preguntas mixtas basadas en el siguiente contenido:
-            
-            CONTENIDO:
-            {text}
-            
-            FORMATO REQUERIDO:
-            - Combina diferentes tipos: opción múltiple, verdadero/falso, completar espacios
-            - Cada pregunta debe especificar su tipo
-            - Mantén variedad en los tipos de preguntas
-            
-            RESPONDE SOLO EN FORMATO JSON:
-            [
-                {{
-                    "Q": "Pregunta 1",
-                    "Type": "multiple_choice",
-                    "Options": ["A", "B", "C", "D"],
-                    "Answer": "A",
-                    "Explanation": "Explicación"
-                }},
-                {{
-                    "Q": "Afirmación 2",
-                    "Type": "true_false",
-                    "Answer": "Verdadero",
-                    "Explanation": "Explicación"
-                }},
-                ...
-            ]
-            
-            IMPORTANTE: Responde únicamente con el JSON, sin texto adicional.
-            """
-            
-            response = self.model.generate_content(prompt)
-            ai_text = response.text.strip()
-            
-            if ai_text.startswith("```json"):
-                ai_text = ai_text[7:]
-            if ai_text.endswith("```"):
-                ai_text = ai_text[:-3]
-            
-            quiz = json.loads(ai_text)
-            return quiz if isinstance(quiz, list) else self._generate_simple_mixed(text, num_questions)
-                
-        except Exception as e:
-            print(f"❌ Error generando quiz mixto con IA: {e}")
-            return self._generate_simple_mixed(text, num_questions)
+    def _generate_ai_mixed(self, text: str, quotas: Dict[str, int],
+                           exclude: Sequence[str] = ()) -> Dict[str, List[Dict[str, Any]]]:
+        """Genera con IA las preguntas de cada tipo del quiz mixto, en lotes pequeños y en paralelo.
 
-    def _generate_simple_mixed(self, text: str, num_questions: int) -> List[Dict[str, Any]]:
-        """Genera quiz simple mixto"""
-        print("📝 Generando quiz básico mixto...")
+        Devuelve las preguntas por tipo (hasta su cuota): solo se reintentan (una vez)
+        los lotes que fallaron, y lo que siga faltando de cada tipo lo completa su
+        generador básico al armar el quiz.
+        """
+        generators = {
+            "multiple_choice": self._generate_ai_multiple_choice,
+            "true_false": self._generate_ai_true_false,
+            "fill_blank": self._generate_ai_fill_blank,
+        }
+        results: Dict[str, List[Dict[str, Any]]] = {kind: [] for kind in MIXED_TYPES}
+        seen: Dict[str, set] = {kind: set() for kind in MIXED_TYPES}
         
-        quiz = []
-        for i in range(num_questions):
-            if i % 3 == 0:  # Opción múltiple
-                quiz.append({
-                    "Q": f"Pregunta {i+1} de opción múltiple sobre el contenido",
-                    "Type": "multiple_choice",
-                    "Options": ["Opción A", "Opción B", "Opción C", "Opción D"],
-                    "Answer": "A",
-                    "Explanation": "Explicación de la respuesta correcta."
-                })
-            elif i % 3 == 1:  # Verdadero/Falso
-                quiz.append({
-                    "Q": f"Afirmación {i+1}: El contenido contiene información relevante.",
-                    "Type": "true_false",
-                    "Answer": "Verdadero",
-                    "Explanation": "El contenido estudiado contiene información relevante."
-                })
-            else:  # Completar espacios
-                quiz.append({
-                    "Q": f"El concepto {i+1} es importante para _____ el tema.",
-                    "Type": "fill_blank",
-                    "Answer": "comprender",
-                    "Explanation": "La palabra 'comprender' completa correctamente la oración."
-                })
+        def accept(kind: str, questions: Any) -> None:
+            for question in questions if isinstance(questions, list) else []:
+                question = validate_item(question, kind)
+                if len(results[kind]) >= quotas[kind] or question is None:
+                    continue
+                key = question_id(question["Q"])
+                if key not in seen[kind]:
+                    seen[kind].add(key)
+                    results[kind].append(dict(question, Type=kind))
         
+        batches = [(kind, min(MIXED_BATCH_SIZE, quotas[kind] - start))
+                   for kind in MIXED_TYPES for start in range(0, quotas[kind], MIXED_BATCH_SIZE)]
+        for _ in range(2):
+            if not batches:
+                break
+            failed: List[Tuple[str, int]] = []
+            with ThreadPoolExecutor(max_workers=min(AI_CONCURRENCY, len(batches)),
+                                    thread_name_prefix="quiz") as executor:
+                futures = {executor.submit(generators[kind], text, size, exclude): (kind, size)
+                           for kind, size in batches}
+                for future in as_completed(futures):
+                    kind, size = futures[future]
+                    try:
+                        accept(kind, future.result())
+                    except Exception as e:
+                        print(f"⚠️ Error en un lote de preguntas ({kind}): {e}")
+                        failed.append((kind, size))
+            batches = failed
+        
+        return results
+
+    @staticmethod
+    def _mixed_quotas(num_questions: int) -> Dict[str, int]:
+        """Preguntas de cada tipo en un quiz mixto (repartidas en el orden de MIXED_TYPES)"""
+        return {kind: len(range(i, num_questions, len(MIXED_TYPES))) for i, kind in enumerate(MIXED_TYPES)}
+
+    @staticmethod
+    def _interleave_types(results: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Intercala los tipos en el orden de la mezcla pedida"""
+        quiz = []
+        while any(results.values()):
+            for kind in MIXED_TYPES:
+                if results[kind]:
+                    quiz.append(results[kind].pop(0))
         return quiz
 
-    def _generate_ai_topic(self, text: str, num_questions: int, topic: str) -> List[Dict[str, Any]]:
-        """Genera quiz sobre tema específico usando IA"""
-        try:
-            prompt = f"""
-            Genera {num_questions} preguntas sobre el tema específico "{topic}" basadas en el siguiente contenido:
-            
-            CONTENIDO:
-            {text}
-            
-            TEMA ESPECÍFICO: {topic}
-            
-            FORMATO REQUERIDO:
-            - Todas las preguntas deben estar relacionadas con el tema "{topic}"
-            - Usa diferentes tipos de preguntas
-            - Enfócate en aspectos específicos del tema
-            
-            RESPONDE SOLO EN FORMATO JSON:
-            [
-                {{
-                    "Q": "Pregunta específica sobre {topic}",
-                    "Type": "multiple_choice",
-                    "Options": ["A", "B", "C", "D"],
-                    "Answer": "A",
-                    "Explanation": "Explicación relacionada con {topic}"
-                }},
-                ...
-            ]
-            
-            IMPORTANTE: Responde únicamente con el JSON, sin texto adicional.
-            """
-            
-            response = self.model.generate_content(prompt)
-            ai_text = response.text.strip()
-            
-            if ai_text.startswith("```json"):
-                ai_text = ai_text[7:]
-            if ai_text.endswith("```"):
-                ai_text = ai_text[:-3]
-            
-            quiz = json.loads(ai_text)
-            return quiz if isinstance(quiz, list) else self._generate_simple_topic(text, num_questions, topic)
-                
-        except Exception as e:
-            print(f"❌ Error generando quiz de tema con IA: {e}")
-            return self._generate_simple_topic(text, num_questions, topic)
+    def _generate_simple_mixed(self, text: str, quotas: Dict[str, int]) -> Dict[str, List[Dict[str, Any]]]:
+        """Preguntas sin IA de cada tipo del quiz mixto, con el generador básico de ese tipo"""
+        print("📝 Generando quiz básico mixto...")
+        generators = {
+            "multiple_choice": self._generate_simple_multiple_choice,
+            "true_false": self._generate_simple_true_false,
+            "fill_blank": self._generate_simple_fill_blank,
+        }
+        return {
+            kind: [dict(question, Type=kind) for question in generators[kind](text, quota)] if quota > 0 else []
+            for kind, quota in quotas.items()
+        }
 
-    def _generate_simple_topic(self, text: str, num_questions: int, topic: str) -> List[Dict[str, Any]]:
-        """Genera quiz simple sobre tema específico"""
-        print(f"📝 Generando quiz básico sobre {topic}...")
+    def _generate_ai_topic(self, text: str, num_questions: int, topic: str,
+                           exclude: Sequence[str] = ()) -> List[Dict[str, Any]]:
+        """Genera quiz sobre tema específico usando IA"""
+        prompt = f"""
+        Genera {num_questions} preguntas sobre el tema específico "{topic}" basadas en el siguiente contenido:
         
-        quiz = []
-        for i in range(num_questions):
-            quiz.append({
-                "Q": f"¿Qué información importante se menciona sobre {topic}?",
+        CONTENIDO:
+        {text}
+        {self._exclusion_note(exclude)}
+        TEMA ESPECÍFICO: {topic}
+        
+        FORMATO REQUERIDO:
+        - Todas las preguntas deben estar relacionadas con el tema "{topic}"
+        - Usa diferentes tipos de preguntas
+        - Enfócate en aspectos específicos del tema
+        
+        RESPONDE SOLO EN FORMATO JSON:
+        [
+            {{
+                "Q": "Pregunta específica sobre {topic}",
                 "Type": "multiple_choice",
-                "Options": [
-                    f"Información relevante sobre {topic}",
-                    f"Datos secundarios de {topic}",
-                    f"Información irrelevante",
-                    f"Datos desactualizados"
-                ],
+                "Options": ["A", "B", "C", "D"],
                 "Answer": "A",
-                "Explanation": f"La primera opción contiene información relevante sobre {topic}."
-            })
+                "Explanation": "Explicación relacionada con {topic}"
+            }},
+            ...
+        ]
         
-        return quiz
+        IMPORTANTE: Responde únicamente con el JSON, sin texto adicional.
+        """
+        
+        return self._request_ai_items(prompt, "topic", num_questions)
+
+    def _generate_simple_topic(self, text: str, num_questions: int, topic: str) -> List[Dict[str, Any]]:
+        """Genera quiz simple sobre tema específico (prioriza las oraciones que lo mencionan)"""
+        print(f"📝 Generando quiz básico sobre {topic}...")
+        return [dict(question, Type="multiple_choice")
+                for question in build_multiple_choice(text, num_questions, topic)]
 
     def _modify_quiz(self, filepath: str, quiz: List[Dict[str, Any]]) -> None:
         """Permite modificar preguntas del quiz"""
@@ -830,6 +992,7 @@ class QuizTool:
                 # Guardar cambios
                 with open(filepath, 'w', encoding='utf-8') as f:
                     json.dump(quiz, f, ensure_ascii=False, indent=2)
+                self._index_quiz(filepath, quiz)
                 
                 print("✅ Pregunta modificada y guardada.")
             else:
@@ -0,0 +1,133 @@
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# Acciones posibles para un marcador del script
+REMOVE = "remove"      # Se elimina (marcador de sección)
+PAUSE = "pause"        # Se convierte en una pausa real
+ORDINAL = "ordinal"    # Se lee como ordinal ("Primero,", "Segundo,"...)
+
+# Marcador (sin número) -> (acción, silencio en ms)
+MARKER_TABLE: Dict[str, Tuple[str, int]] = {
+    "INTRODUCCIÓN": (REMOVE, 400),
+    "INTRODUCCION": (REMOVE, 400),
+    "CONTENIDO PRINCIPAL": (REMOVE, 400),
+    "LECTURA PRINCIPAL": (REMOVE, 400),
+    "CONCLUSIÓN": (REMOVE, 400),
+    "CONCLUSION": (REMOVE, 400),
+    "REPASO": (REMOVE, 400),
+    "ESCENA": (REMOVE, 600),
+    "CONCEPTO": (REMOVE, 400),
+    "PREGUNTA": (REMOVE, 400),
+    "PAUSA": (PAUSE, 800),
+    "PASO": (ORDINAL, 300),
+}
+
+ORDINALS = ["Primero", "Segundo", "Tercero", "Cuarto", "Quinto",
+            "Sexto", "Séptimo", "Octavo", "Noveno", "Décimo"]
+
+# Un solo patrón para marcadores y espacios: el script se recorre una vez
+_TOKEN_PATTERN = re.compile(r"\[\s*([^\[\]\n]{1,60}?)\s*\]|\s+")
+_MARKER_NAME = re.compile(r"^(.*?)(?:\s+(\d+))?$")
+
+
+class ScriptPause(NamedTuple):
+    """Pausa en el texto limpio: posición (carácter) y duración del silencio"""
+    position: int
+    duration_ms: int
+
+
+class TTSScript(NamedTuple):
+    """Script listo para TTS con las pausas como datos estructurados"""
+    text: str
+    pauses: List[ScriptPause]
+
+
+def _resolve_marker(content: str) -> Optional[Tuple[str, int, Optional[int]]]:
+    """Busca el marcador en la tabla, aceptando cualquier variante numerada"""
+    match = _MARKER_NAME.match(content.upper())
+    name, number = match.group(1).strip(), match.group(2)
+
+    entry = MARKER_TABLE.get(name)
+    if entry is None:
+        return None
+
+    action, silence_ms = entry
+    return action, silence_ms, int(number) if number else None
+
+
+def _ordinal(number: Optional[int]) -> str:
+    if number and 1 <= number <= len(ORDINALS):
+        return f"{ORDINALS[number - 1]},"
+    return f"Paso {number}," if number else "Luego,"
+
+
+def parse_tts_script(script: str) -> TTSScript:
+    """Reescribe marcadores y espacios del script en una sola pasada.
+
+    Los marcadores conocidos se eliminan, se convierten en pausa o en un
+    ordinal según MARKER_TABLE; los corchetes desconocidos (p. ej.
+    "[Estudiante]") conservan su texto. Devuelve el texto limpio y la
+    posición de cada pausa para que la síntesis inserte silencio real.
+    """
+    parts: List[str] = []
+    pauses: List[ScriptPause] = []
+    length = 0
+    pending_space = False
+    last_end = 0
+
+    def emit(fragment: str) -> None:
+        nonlocal length, pending_space
+        if pending_space and length:
+            parts.append(" ")
+            length += 1
+        pending_space = False
+        parts.append(fragment)
+        length += len(fragment)
+
+    def add_pause(duration_ms: int) -> None:
+        # Pausas consecutivas se fusionan en la más larga
+        if pauses and pauses[-1].position == length:
+            if duration_ms > pauses[-1].duration_ms:
+                pauses[-1] = ScriptPause(length, duration_ms)
+        elif length:
+            pauses.append(ScriptPause(length, duration_ms))
+
+    for match in _TOKEN_PATTERN.finditer(script):
+        if match.start() > last_end:
+            emit(script[last_end:match.start()])
+        last_end = match.end()
+
+        content = match.group(1)
+        if content is None:
+            # Bloque de espacios: se colapsa en un único espacio
+            pending_space = True
+            continue
+
+        resolved = _resolve_marker(content)
+        if resolved is None:
+            emit(content)
+            continue
+
+        action, silence_ms, number = resolved
+        if action == PAUSE:
+            if length and parts[-1][-1:] not in ".!?":
+                # El punto va pegado a la palabra anterior
+                pending_space = False
+                emit(".")
+            add_pause(silence_ms)
+            pending_space = True
+        elif action == ORDINAL:
+            add_pause(silence_ms)
+            emit(_ordinal(number))
+            pending_space = True
+        else:
+            add_pause(silence_ms)
+            pending_space = True
+
+    if last_end < len(script):
+        emit(script[last_end:])
+
+    text = "".join(parts)
+    # Una pausa al final del texto no aporta nada
+    pauses = [p for p in pauses if p.position < len(text)]
+    return TTSScript(text, pauses)
@@ -0,0 +1,207 @@
+import os
+import re
+import json
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+
+# Búsqueda sin distinguir tildes ni mayúsculas ("fotosintesis" encuentra "Fotosíntesis")
+FTS_TOKENIZER = "unicode61 remove_diacritics 2"
+
+# Marcas con las que se resaltan las coincidencias en la consola
+HIGHLIGHT_OPEN = "["
+HIGHLIGHT_CLOSE = "]"
+
+SEARCH_LIMIT = 20
+
+# Aviso cuando el SQLite de Python se compiló sin FTS5
+FTS_UNAVAILABLE_MESSAGE = "⚠️ Búsqueda desactivada: el SQLite de esta instalación de Python no incluye FTS5."
+
+
+def fts5_available(conn: sqlite3.Connection) -> bool:
+    """Indica si el SQLite de esta instalación incluye FTS5 (hay builds que no lo traen)"""
+    try:
+        conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS temp.fts5_probe USING fts5(text)")
+        conn.execute("DROP TABLE temp.fts5_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def build_fts_query(text: str) -> Optional[str]:
+    """Convierte lo que escribe el usuario en una consulta FTS5 segura.
+
+    Cada palabra debe aparecer (AND) y la última se busca como prefijo, así
+    que "fotosin" ya encuentra "fotosíntesis". Las comillas y operadores del
+    usuario se tratan como texto.
+    """
+    words = re.findall(r"\w+", text)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+class QuizSearchIndex:
+    """Índice de texto completo (SQLite FTS5) sobre las preguntas de los quizzes guardados"""
+
+    def __init__(self, quizzes_dir: str, db_path: Optional[str] = None):
+        self.quizzes_dir = quizzes_dir
+        if db_path is None:
+            db_path = os.path.join(quizzes_dir, "..", "quizzes.db")
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self.search_available = False
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_db(self) -> None:
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS quiz_files (
+                    filename TEXT PRIMARY KEY,
+                    mtime REAL NOT NULL,
+                    subject TEXT
+                );
+
+                CREATE TABLE IF NOT EXISTS quiz_questions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    filename TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    question TEXT NOT NULL,
+                    options TEXT NOT NULL,
+                    answer TEXT NOT NULL,
+                    explanation TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_quiz_questions_file ON quiz_questions(filename);
+            """)
+            if "subject" not in {row[1] for row in conn.execute("PRAGMA table_info(quiz_files)")}:
+                # Índices creados antes de guardar el tema de estudio de cada quiz
+                conn.execute("ALTER TABLE quiz_files ADD COLUMN subject TEXT")
+
+            self.search_available = fts5_available(conn)
+            if not self.search_available:
+                # Sin FTS5 los triggers fallarían en cada escritura: se quitan y el índice se reconstruye después
+                conn.executescript("""
+                    DROP TRIGGER IF EXISTS quiz_fts_insert;
+                    DROP TRIGGER IF EXISTS quiz_fts_delete;
+                """)
+                return
+
+            has_triggers = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'quiz_fts_insert'"
+            ).fetchone() is not None
+            conn.executescript(f"""
+                CREATE VIRTUAL TABLE IF NOT EXISTS quiz_fts USING fts5(
+                    question, options, explanation,
+                    content='quiz_questions', content_rowid='id', tokenize='{FTS_TOKENIZER}'
+                );
+
+                CREATE TRIGGER IF NOT EXISTS quiz_fts_insert AFTER INSERT ON quiz_questions BEGIN
+                    INSERT INTO quiz_fts(rowid, question, options, explanation)
+                    VALUES (new.id, new.question, new.options, new.explanation);
+                END;
+                CREATE TRIGGER IF NOT EXISTS quiz_fts_delete AFTER DELETE ON quiz_questions BEGIN
+                    INSERT INTO quiz_fts(quiz_fts, rowid, question, options, explanation)
+                    VALUES ('delete', old.id, old.question, old.options, old.explanation);
+                END;
+            """)
+            if not has_triggers:
+                # Índice nuevo, o preguntas guardadas mientras no había FTS5: se indexa lo existente
+                conn.execute("INSERT INTO quiz_fts(quiz_fts) VALUES ('rebuild')")
+
+    def index_quiz(self, filename: str, quiz: List[Dict[str, Any]], mtime: Optional[float] = None,
+                   subject: Optional[str] = None) -> None:
+        """(Re)indexa un quiz: solo se tocan las filas de ese archivo (el tema de estudio se conserva)"""
+        if mtime is None:
+            path = os.path.join(self.quizzes_dir, filename)
+            mtime = os.path.getmtime(path) if os.path.exists(path) else 0.0
+
+        rows = []
+        for position, question in enumerate(quiz):
+            if not isinstance(question, dict) or "Q" not in question:
+                continue
+            options = question.get("Options") or []
+            rows.append((filename, position, str(question["Q"]),
+                         "\n".join(str(option) for option in options) if isinstance(options, list) else str(options),
+                         str(question.get("Answer", "")), str(question.get("Explanation", ""))))
+
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM quiz_questions WHERE filename = ?", (filename,))
+            conn.executemany(
+                "INSERT INTO quiz_questions (filename, position, question, options, answer, explanation) "
+                "VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+            conn.execute(
+                "INSERT INTO quiz_files (filename, mtime, subject) VALUES (?, ?, ?) "
+                "ON CONFLICT(filename) DO UPDATE SET mtime = excluded.mtime, "
+                "subject = COALESCE(excluded.subject, quiz_files.subject)",
+                (filename, mtime, subject)
+            )
+
+    def sync(self) -> int:
+        """Indexa los quizzes nuevos o modificados fuera de la app y olvida los borrados"""
+        if not os.path.isdir(self.quizzes_dir):
+            return 0
+
+        on_disk = {
+            filename: os.path.getmtime(os.path.join(self.quizzes_dir, filename))
+            for filename in os.listdir(self.quizzes_dir) if filename.endswith('.json')
+        }
+        with self._connect() as conn:
+            indexed = {row["filename"]: row["mtime"] for row in conn.execute("SELECT filename, mtime FROM quiz_files")}
+
+        removed = [filename for filename in indexed if filename not in on_disk]
+        if removed:
+            with self._lock, self._connect() as conn:
+                conn.executemany("DELETE FROM quiz_questions WHERE filename = ?", [(f,) for f in removed])
+                conn.executemany("DELETE FROM quiz_files WHERE filename = ?", [(f,) for f in removed])
+
+        updated = 0
+        for filename, mtime in on_disk.items():
+            if indexed.get(filename) == mtime:
+                continue
+            try:
+                with open(os.path.join(self.quizzes_dir, filename), 'r', encoding='utf-8') as f:
+                    quiz = json.load(f)
+            except (OSError, ValueError):
+                quiz = []
+            self.index_quiz(filename, quiz if isinstance(quiz, list) else [], mtime)
+            updated += 1
+        return updated
+
+    def questions(self, text: str = "") -> List[Dict[str, Any]]:
+        """Preguntas indexadas (opcionalmente solo de los quizzes cuyo nombre o tema contiene el texto)"""
+        text = text.strip().lower()
+        with self._connect() as conn:
+            # instr y no LIKE: "_" y "%" del texto se buscan literalmente
+            rows = conn.execute(
+                "SELECT q.filename, q.position, q.question, q.options, q.answer, q.explanation, "
+                "COALESCE(f.subject, 'general') AS subject "
+                "FROM quiz_questions q LEFT JOIN quiz_files f ON f.filename = q.filename "
+                "WHERE instr(lower(q.filename), ?) > 0 OR instr(lower(COALESCE(f.subject, '')), ?) > 0 "
+                "ORDER BY q.filename, q.position", (text.replace(" ", "_"), text)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def search(self, text: str, limit: int = SEARCH_LIMIT) -> List[Dict[str, Any]]:
+        """Preguntas que coinciden, de la más a la menos relevante (BM25)"""
+        query = build_fts_query(text)
+        if query is None or not self.search_available:
+            return []
+        with self._connect() as conn:
+            rows = conn.execute(f"""
+                SELECT q.filename, q.position, q.answer,
+                       highlight(quiz_fts, 0, '{HIGHLIGHT_OPEN}', '{HIGHLIGHT_CLOSE}') AS question,
+                       highlight(quiz_fts, 1, '{HIGHLIGHT_OPEN}', '{HIGHLIGHT_CLOSE}') AS options,
+                       snippet(quiz_fts, 2, '{HIGHLIGHT_OPEN}', '{HIGHLIGHT_CLOSE}', '…', 12) AS explanation
+                FROM quiz_fts JOIN quiz_questions q ON q.id = quiz_fts.rowid
+                WHERE quiz_fts MATCH ? ORDER BY rank LIMIT ?
+            """, (query, limit)).fetchall()
+        return [dict(row) for row in rows]
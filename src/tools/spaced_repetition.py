@@ -0,0 +1,103 @@
+import time
+from collections import deque
+from typing import Dict, Any, Iterator, Optional, Set, Tuple
+from .flashcard_store import FlashcardStore
+
+# Calificación de la respuesta -> (nombre, calidad SM-2 de 0 a 5)
+GRADES: Dict[str, Tuple[str, int]] = {
+    "1": ("Otra vez", 1),
+    "2": ("Difícil", 3),
+    "3": ("Bien", 4),
+    "4": ("Fácil", 5),
+}
+
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+DAY_SECONDS = 86400
+# Una tarjeta fallada vuelve a salir a los 10 minutos
+RELEARN_SECONDS = 600
+# Tarjetas nuevas que entran en cada sesión de repaso
+NEW_CARDS_PER_SESSION = 20
+# Tarjetas vencidas leídas de la base en cada consulta
+REVIEW_BATCH_SIZE = 50
+
+
+def schedule_review(state: Optional[Dict[str, Any]], quality: int, now: Optional[float] = None) -> Dict[str, Any]:
+    """Aplica SM-2: devuelve el nuevo estado (facilidad, intervalo y próxima fecha)"""
+    now = time.time() if now is None else now
+    state = dict(state or {"ease": DEFAULT_EASE, "interval": 0, "reps": 0, "lapses": 0})
+
+    if quality < 3:
+        state["reps"] = 0
+        state["interval"] = 0
+        state["lapses"] = state.get("lapses", 0) + 1
+        state["due"] = now + RELEARN_SECONDS
+    else:
+        state["reps"] += 1
+        if state["reps"] == 1:
+            state["interval"] = 1
+        elif state["reps"] == 2:
+            state["interval"] = 6
+        else:
+            state["interval"] = round(state["interval"] * state["ease"])
+        state["due"] = now + state["interval"] * DAY_SECONDS
+
+    state["ease"] = max(MIN_EASE, state["ease"] + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    state["last_review"] = now
+    return state
+
+
+class SpacedRepetitionScheduler:
+    """Cola de pendientes de todos los mazos, leída por lotes del almacén (índice por fecha)"""
+
+    def __init__(self, store: FlashcardStore, batch_size: int = REVIEW_BATCH_SIZE):
+        self.store = store
+        self.batch_size = batch_size
+        # Tarjetas entregadas como nuevas en la sesión actual
+        self._new_ids: Set[int] = set()
+
+    def build_queue(self) -> None:
+        """Empieza una sesión de repaso (las tarjetas se leen a medida que se piden)"""
+        self._new_ids = set()
+
+    def is_new(self, card_id: int) -> bool:
+        return card_id in self._new_ids
+
+    def due_cards(self, now: Optional[float] = None,
+                  new_limit: int = NEW_CARDS_PER_SESSION) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """Entrega primero los repasos vencidos, por lotes en orden de fecha, y luego hasta 'new_limit' nuevas.
+
+        Cada lote sigue desde la última tarjeta entregada: las que se reprograman
+        durante la sesión (por ejemplo, al fallarlas) vuelven cuando vencen, y las
+        que se saltan sin calificar no se repiten.
+        """
+        reviews: "deque[Dict[str, Any]]" = deque()
+        new_cards: Optional["deque[Dict[str, Any]]"] = None
+        cursor: Optional[Tuple[float, int]] = None
+        while True:
+            current = time.time() if now is None else now
+            if not reviews:
+                reviews.extend(self.store.due_card_batch(current, cursor, self.batch_size))
+
+            if reviews:
+                card = reviews.popleft()
+                cursor = (card.pop("due"), card["id"])
+                self._new_ids.discard(card["id"])
+            else:
+                if new_cards is None:
+                    new_cards = deque(self.store.new_cards(new_limit))
+                if not new_cards:
+                    break
+                card = new_cards.popleft()
+                self._new_ids.add(card["id"])
+            yield card["id"], card
+
+    def record(self, card_id: int, quality: int, now: Optional[float] = None) -> Dict[str, Any]:
+        """Registra la respuesta, la guarda y reprograma la tarjeta"""
+        state = schedule_review(self.store.get_state(card_id), quality, now)
+        self.store.record_review(card_id, state, quality)
+        return state
+
+    def counts(self, now: Optional[float] = None) -> Dict[str, int]:
+        """Tarjetas totales, pendientes de repaso y nuevas"""
+        return self.store.count_cards(time.time() if now is None else now)
@@ -0,0 +1,263 @@
+import os
+import json
+import hashlib
+import time
+import atexit
+import threading
+import zlib
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+# Tipos de evento
+KIND_FLASHCARD = 0
+KIND_QUIZ = 1
+
+# Eventos acumulados en memoria antes de escribirlos en disco
+BLOCK_EVENTS = 4096
+
+# Columnas: nombre -> (código de array, dtype equivalente de NumPy)
+COLUMNS: Dict[str, Tuple[str, str]] = {
+    "ts": ("d", "<f8"),        # momento de la respuesta (epoch)
+    "kind": ("B", "u1"),       # flashcard o pregunta de quiz
+    "item": ("q", "<i8"),      # id de la tarjeta o hash de la pregunta
+    "concept": ("I", "<u4"),   # tema de estudio (índice en concepts.json)
+    "correct": ("B", "u1"),    # 1 si se recordó / acertó
+    "quality": ("B", "u1"),    # calificación SM-2 (0-5) o 0/1 en quizzes
+    "elapsed": ("f", "<f4"),   # días desde el repaso anterior de la tarjeta (-1 si no lo hubo)
+}
+
+# Tramos de días transcurridos desde el repaso anterior para la curva de retención
+RETENTION_BINS_DAYS = (0, 1, 2, 4, 8, 16, 32)
+
+DAY_SECONDS = 86400
+
+# Largo máximo del nombre de un material en el panel de progreso
+SUBJECT_CHARS = 40
+
+
+def subject_label(topic: str = "", texts: Sequence[str] = ()) -> str:
+    """Tema de estudio de un mazo o quiz: el tema que escribió el usuario o, si no hay, el material.
+
+    El material se nombra con su primera línea y el inicio de su huella, así dos
+    materiales que empiezan igual no se mezclan en el panel de progreso.
+    """
+    topic = " ".join(topic.split())
+    if topic:
+        return topic.lower()
+    material = "\n\n".join(texts).strip()
+    if not material:
+        return "general"
+    name = " ".join(material.splitlines()[0].split())
+    if len(name) > SUBJECT_CHARS:
+        name = name[:SUBJECT_CHARS].rstrip() + "…"
+    return f"{name} ({hashlib.sha1(material.encode('utf-8')).hexdigest()[:6]})"
+
+
+def question_id(text: str) -> int:
+    """Identificador estable de una pregunta de quiz (no tienen id propio)"""
+    return zlib.crc32(text.strip().lower().encode('utf-8'))
+
+
+class StudyEventLog:
+    """Registro columnar de repasos y respuestas: buffers de array en memoria, bloques en disco"""
+
+    def __init__(self, log_dir: Optional[str] = None):
+        if log_dir is None:
+            log_dir = os.path.join(os.path.dirname(__file__), "..", "storage", "registro_estudio")
+        os.makedirs(log_dir, exist_ok=True)
+        self.log_dir = log_dir
+        self._lock = threading.Lock()
+        self._buffers = {name: array(code) for name, (code, _) in COLUMNS.items()}
+        self._concepts_path = os.path.join(log_dir, "concepts.json")
+        self.concepts: List[str] = self._load_concepts()
+        self._concept_ids = {name: i for i, name in enumerate(self.concepts)}
+        atexit.register(self.flush)
+
+    def _load_concepts(self) -> List[str]:
+        try:
+            with open(self._concepts_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data if isinstance(data, list) else []
+        except (OSError, ValueError):
+            return []
+
+    def _column_path(self, name: str) -> str:
+        return os.path.join(self.log_dir, f"{name}.bin")
+
+    def _concept_id(self, concept: str) -> int:
+        concept_id = self._concept_ids.get(concept)
+        if concept_id is None:
+            concept_id = len(self.concepts)
+            self.concepts.append(concept)
+            self._concept_ids[concept] = concept_id
+            self._save_concepts()
+        return concept_id
+
+    def _save_concepts(self) -> None:
+        temp_path = self._concepts_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.concepts, f, ensure_ascii=False)
+        os.replace(temp_path, self._concepts_path)
+
+    def record(self, kind: int, item: int, concept: str, correct: bool, quality: int,
+               elapsed_days: float = -1.0, timestamp: Optional[float] = None) -> None:
+        """Agrega un evento al buffer (O(1)); se escribe en disco al completar un bloque.
+
+        'elapsed_days' se guarda al registrar (el programador ya lo conoce), así la
+        curva de retención no necesita ordenar millones de eventos por tarjeta.
+        """
+        with self._lock:
+            buffers = self._buffers
+            buffers["ts"].append(time.time() if timestamp is None else timestamp)
+            buffers["kind"].append(kind)
+            buffers["item"].append(item)
+            buffers["concept"].append(self._concept_id(concept))
+            buffers["correct"].append(1 if correct else 0)
+            buffers["quality"].append(quality)
+            buffers["elapsed"].append(elapsed_days)
+            if len(buffers["ts"]) >= BLOCK_EVENTS:
+                self._flush_locked()
+
+    def flush(self) -> None:
+        """Escribe en disco los eventos pendientes"""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        if not len(self._buffers["ts"]):
+            return
+        sizes = self._aligned_sizes()
+        try:
+            for name, buffer in self._buffers.items():
+                with open(self._column_path(name), 'ab') as f:
+                    buffer.tofile(f)
+        except OSError as e:
+            # Un bloque escrito solo en algunas columnas las desalinearía: se deshace completo
+            for name, size in sizes.items():
+                try:
+                    if os.path.exists(self._column_path(name)):
+                        os.truncate(self._column_path(name), size)
+                except OSError:
+                    pass
+            print(f"⚠️ No se pudo guardar el registro de estudio: {e}")
+            return
+        for name, (code, _) in COLUMNS.items():
+            self._buffers[name] = array(code)
+
+    def _aligned_sizes(self) -> Dict[str, int]:
+        """Tamaño en bytes de cada columna, recortando las que quedaron más largas que el resto"""
+        rows = {}
+        for name, (code, _) in COLUMNS.items():
+            path = self._column_path(name)
+            rows[name] = (os.path.getsize(path) if os.path.exists(path) else 0) // array(code).itemsize
+        common = min(rows.values())
+        sizes = {}
+        for name, (code, _) in COLUMNS.items():
+            sizes[name] = common * array(code).itemsize
+            if rows[name] != common:
+                try:
+                    os.truncate(self._column_path(name), sizes[name])
+                except OSError:
+                    pass
+        return sizes
+
+    def load(self) -> Dict[str, np.ndarray]:
+        """Todas las columnas (disco + pendientes) como arrays de NumPy"""
+        with self._lock:
+            columns = {}
+            for name, (_, dtype) in COLUMNS.items():
+                path = self._column_path(name)
+                on_disk = np.fromfile(path, dtype=dtype) if os.path.exists(path) else np.zeros(0, dtype=dtype)
+                pending = np.frombuffer(self._buffers[name], dtype=dtype) if len(self._buffers[name]) else on_disk[:0]
+                columns[name] = np.concatenate([on_disk, pending])
+
+        # Un bloque escrito a medias (corte de luz) deja columnas de distinto largo
+        length = min(len(column) for column in columns.values())
+        return {name: column[:length] for name, column in columns.items()}
+
+
+def retention_curve(columns: Dict[str, np.ndarray],
+                    bins_days: Tuple[int, ...] = RETENTION_BINS_DAYS) -> List[Tuple[str, int, float]]:
+    """Porcentaje recordado según los días transcurridos desde el repaso anterior de la misma tarjeta"""
+    # Solo repasos de flashcards con un repaso anterior conocido
+    mask = (columns["kind"] == KIND_FLASHCARD) & (columns["elapsed"] >= 0)
+    elapsed_days = columns["elapsed"][mask]
+    recalled = columns["correct"][mask]
+    if not len(elapsed_days):
+        return []
+
+    edges = np.array(bins_days, dtype=np.float64)
+    bins = np.searchsorted(edges, elapsed_days, side='right') - 1
+    counts = np.bincount(bins, minlength=len(edges))
+    hits = np.bincount(bins, weights=recalled, minlength=len(edges))
+
+    curve = []
+    for i, start in enumerate(bins_days):
+        label = f"{start}-{bins_days[i + 1]} d" if i + 1 < len(bins_days) else f"{start}+ d"
+        if counts[i]:
+            curve.append((label, int(counts[i]), float(hits[i] / counts[i])))
+    return curve
+
+
+def concept_accuracy(columns: Dict[str, np.ndarray], concepts: List[str]) -> List[Tuple[str, int, float]]:
+    """Aciertos por tema, de más a menos practicado"""
+    if not len(columns["concept"]):
+        return []
+    counts = np.bincount(columns["concept"], minlength=len(concepts))
+    hits = np.bincount(columns["concept"], weights=columns["correct"], minlength=len(concepts))
+    practiced = np.flatnonzero(counts)
+    practiced = practiced[np.argsort(-counts[practiced], kind='stable')]
+    return [(concepts[i] if i < len(concepts) else f"#{i}", int(counts[i]), float(hits[i] / counts[i]))
+            for i in practiced]
+
+
+def _day_numbers(ts: np.ndarray, offset: int) -> np.ndarray:
+    # Multiplicar y truncar es bastante más rápido que la división entera en float
+    return ((ts + offset) * (1.0 / DAY_SECONDS)).astype(np.int64)
+
+
+def study_streaks(columns: Dict[str, np.ndarray], now: Optional[float] = None) -> Tuple[int, int]:
+    """(racha actual, mejor racha) en días consecutivos con actividad, en hora local"""
+    if not len(columns["ts"]):
+        return 0, 0
+    now = time.time() if now is None else now
+    offset = time.localtime(now).tm_gmtoff
+
+    # Días con actividad sin ordenar los eventos: conteo por día (el rango de días es pequeño)
+    all_days = _day_numbers(columns["ts"], offset)
+    first_day = int(all_days.min())
+    days = np.flatnonzero(np.bincount(all_days - first_day)) + first_day
+    # Cortes donde la diferencia entre días con actividad no es 1
+    breaks = np.flatnonzero(np.diff(days) != 1)
+    run_starts = np.concatenate([[0], breaks + 1])
+    run_ends = np.concatenate([breaks, [len(days) - 1]])
+    lengths = run_ends - run_starts + 1
+
+    today = int((now + offset) // DAY_SECONDS)
+    # La racha sigue viva si se estudió hoy o ayer
+    current = int(lengths[-1]) if days[-1] >= today - 1 else 0
+    return current, int(lengths.max())
+
+
+def daily_activity(columns: Dict[str, np.ndarray], days: int = 7, now: Optional[float] = None) -> List[int]:
+    """Eventos por día en los últimos 'days' días (el último es hoy)"""
+    now = time.time() if now is None else now
+    offset = time.localtime(now).tm_gmtoff
+    today = int((now + offset) // DAY_SECONDS)
+    day_index = _day_numbers(columns["ts"], offset) - (today - days + 1)
+    recent = day_index[(day_index >= 0) & (day_index < days)]
+    return np.bincount(recent, minlength=days).tolist()
+
+
+_shared_log: Optional[StudyEventLog] = None
+_shared_lock = threading.Lock()
+
+
+def get_study_log() -> StudyEventLog:
+    """Registro compartido: flashcards y quizzes escriben en los mismos bloques"""
+    global _shared_log
+    with _shared_lock:
+        if _shared_log is None:
+            _shared_log = StudyEventLog()
+        return _shared_log
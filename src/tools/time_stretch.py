@@ -0,0 +1,220 @@
+import shutil
+import subprocess
+import wave
+from typing import Optional
+import numpy as np
+import pygame
+
+# Velocidades admitidas para la reproducción acelerada/ralentizada
+MIN_SPEED = 0.5
+MAX_SPEED = 2.5
+
+# Duración de cada bloque de salida entregado al canal (segundos)
+OUTPUT_BLOCK_SECONDS = 0.5
+
+
+class WSOLAStretcher:
+    """Cambia la velocidad sin alterar el tono (WSOLA), procesando el audio bloque a bloque.
+
+    Cada ventana de salida se toma cerca de su posición nominal en la entrada
+    (avance speed * hop), desplazada dentro de una tolerancia hasta la posición
+    que mejor continúa la forma de onda de la ventana anterior.
+    """
+
+    def __init__(self, sample_rate: int, channels: int, speed: float,
+                 frame_ms: float = 40.0, tolerance_ms: float = 10.0):
+        self.channels = channels
+        self.speed = speed
+        self.frame = int(sample_rate * frame_ms / 1000) // 2 * 2
+        self.hop = self.frame // 2
+        self.tolerance = int(sample_rate * tolerance_ms / 1000)
+
+        # Hann periódica: con solape del 50% las ventanas suman exactamente 1
+        n = np.arange(self.frame)
+        self.window = (0.5 - 0.5 * np.cos(2 * np.pi * n / self.frame)).astype(np.float32)[:, None]
+
+        # Se antepone media ventana de silencio para que el audio empiece sin fundido
+        self._input = np.zeros((self.hop, channels), dtype=np.float32)
+        self._input_start = 0
+        self._analysis_pos = 0.0
+        self._previous: Optional[int] = None
+        self._accumulator = np.zeros((self.frame, channels), dtype=np.float32)
+        self._skip = self.hop
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """Agrega muestras int16 (frames x canales) y devuelve la salida ya completa"""
+        self._input = np.concatenate([self._input, block.astype(np.float32)])
+        input_end = self._input_start + len(self._input)
+        mono = self._input.mean(axis=1)
+        outputs = []
+
+        while True:
+            nominal = int(round(self._analysis_pos))
+            low = max(nominal - self.tolerance, self._input_start)
+            high = nominal + self.tolerance
+            needed = high + self.frame
+            if self._previous is not None:
+                needed = max(needed, self._previous + self.hop + self.frame)
+            if needed > input_end:
+                break
+
+            if self._previous is None:
+                best = low
+            else:
+                # Continuación natural de la ventana anterior frente a las candidatas
+                start = self._previous + self.hop - self._input_start
+                template = mono[start:start + self.frame]
+                region = mono[low - self._input_start:high - self._input_start + self.frame]
+                best = low + int(np.argmax(np.correlate(region, template, mode='valid')))
+
+            offset = best - self._input_start
+            self._accumulator += self._input[offset:offset + self.frame] * self.window
+            outputs.append(self._accumulator[:self.hop].copy())
+            self._accumulator = np.concatenate([self._accumulator[self.hop:],
+                                                np.zeros((self.hop, self.channels), dtype=np.float32)])
+            self._previous = best
+            self._analysis_pos += self.hop * self.speed
+
+        # Descartar la entrada que ya no puede volver a usarse
+        keep_from = min(self._previous + self.hop if self._previous is not None else 0,
+                        int(self._analysis_pos) - self.tolerance)
+        drop = max(0, keep_from - self._input_start)
+        if drop:
+            self._input = self._input[drop:]
+            self._input_start += drop
+
+        if not outputs:
+            return np.zeros((0, self.channels), dtype=np.int16)
+
+        output = np.concatenate(outputs)
+        if self._skip:
+            skipped = min(self._skip, len(output))
+            output = output[skipped:]
+            self._skip -= skipped
+        return np.clip(output, -32768, 32767).astype(np.int16)
+
+    def flush(self) -> np.ndarray:
+        """Procesa lo que queda en la entrada completando con silencio"""
+        padding = np.zeros((self.frame + 2 * self.tolerance + self.hop, self.channels), dtype=np.int16)
+        return self.process(padding)
+
+
+class PCMReader:
+    """Entrega el audio decodificado como bloques int16 en el formato del mezclador"""
+
+    def __init__(self, file_path: str, start_seconds: float, sample_rate: int, channels: int):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self._wav: Optional[wave.Wave_read] = None
+        self._process: Optional[subprocess.Popen] = None
+        self._raw: Optional[bytes] = None
+        self._raw_pos = 0
+
+        frame_bytes = 2 * channels
+        if self._open_wav(file_path, start_seconds):
+            return
+
+        ffmpeg_path = shutil.which("ffmpeg")
+        if ffmpeg_path:
+            # ffmpeg decodifica en streaming: memoria acotada también en audios de una hora
+            self._process = subprocess.Popen(
+                [ffmpeg_path, "-nostdin", "-loglevel", "error", "-ss", f"{start_seconds:.3f}",
+                 "-i", file_path, "-f", "s16le", "-ac", str(channels), "-ar", str(sample_rate), "-"],
+                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+            )
+            return
+
+        # Sin ffmpeg: pygame decodifica el archivo completo al formato del mezclador
+        self._raw = pygame.mixer.Sound(file_path).get_raw()
+        self._raw_pos = min(len(self._raw), int(start_seconds * sample_rate) * frame_bytes)
+
+    def _open_wav(self, file_path: str, start_seconds: float) -> bool:
+        """Lectura directa si el WAV ya coincide con el mezclador (PCM de 16 bits)"""
+        if not file_path.lower().endswith(".wav"):
+            return False
+        try:
+            wav = wave.open(file_path, 'rb')
+        except (wave.Error, EOFError, OSError):
+            return False
+
+        if (wav.getframerate(), wav.getnchannels(), wav.getsampwidth()) != (self.sample_rate, self.channels, 2):
+            wav.close()
+            return False
+
+        wav.setpos(min(wav.getnframes(), int(start_seconds * self.sample_rate)))
+        self._wav = wav
+        return True
+
+    def read(self, frames: int) -> Optional[np.ndarray]:
+        """Lee hasta 'frames' muestras por canal; None al final del archivo"""
+        size = frames * 2 * self.channels
+        if self._wav is not None:
+            data = self._wav.readframes(frames)
+        elif self._process is not None:
+            data = self._process.stdout.read(size)
+        else:
+            data = self._raw[self._raw_pos:self._raw_pos + size]
+            self._raw_pos += len(data)
+
+        usable = len(data) - len(data) % (2 * self.channels)
+        if usable <= 0:
+            return None
+        return np.frombuffer(data[:usable], dtype=np.int16).reshape(-1, self.channels)
+
+    def close(self) -> None:
+        if self._wav is not None:
+            self._wav.close()
+        if self._process is not None:
+            self._process.kill()
+            self._process.wait()
+        self._raw = None
+
+
+class StretchedPlayback:
+    """Reproduce un archivo a otra velocidad encolando bloques procesados en un canal"""
+
+    def __init__(self, file_path: str, start_seconds: float, speed: float):
+        sample_rate, _, channels = pygame.mixer.get_init()
+        self.channels = channels
+        self.reader = PCMReader(file_path, start_seconds, sample_rate, channels)
+        self.stretcher = WSOLAStretcher(sample_rate, channels, speed)
+        self.block_frames = int(sample_rate * OUTPUT_BLOCK_SECONDS * speed)
+        self.channel = pygame.mixer.Channel(0)
+        self._eof = False
+
+    def pump(self) -> None:
+        """Mantiene un bloque sonando y otro en cola (se llama en cada tick)"""
+        while not self._eof and (not self.channel.get_busy() or self.channel.get_queue() is None):
+            output = self._next_output()
+            if output is None:
+                break
+
+            sound = pygame.mixer.Sound(buffer=output.tobytes())
+            if self.channel.get_busy():
+                self.channel.queue(sound)
+            else:
+                self.channel.play(sound)
+
+    def _next_output(self) -> Optional[np.ndarray]:
+        output = np.zeros((0, self.channels), dtype=np.int16)
+        while len(output) == 0:
+            block = self.reader.read(self.block_frames)
+            if block is None:
+                self._eof = True
+                output = self.stretcher.flush()
+                return output if len(output) else None
+            output = self.stretcher.process(block)
+        return output
+
+    def finished(self) -> bool:
+        return self._eof and not self.channel.get_busy()
+
+    def pause(self) -> None:
+        self.channel.pause()
+
+    def unpause(self) -> None:
+        self.channel.unpause()
+
+    def stop(self) -> None:
+        self.channel.stop()
+        self.reader.close()
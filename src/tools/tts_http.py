@@ -0,0 +1,128 @@
+import os
+import threading
+from typing import BinaryIO, Dict, Any, Optional, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Endpoints configurables (permiten apuntar a un servidor TTS simulado local)
+GOOGLE_TTS_URL = os.getenv('GOOGLE_TTS_URL', "https://translate.google.com/translate_tts")
+ELEVENLABS_API_URL = os.getenv('ELEVENLABS_API_URL', "https://api.elevenlabs.io")
+
+# Timeouts (conexión, lectura) en segundos
+DEFAULT_TIMEOUT: Tuple[float, float] = (5.0, 30.0)
+
+# Tamaño de bloque al escribir respuestas en disco
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class TTSHttpSession:
+    """Sesión HTTP compartida con conexiones persistentes para los motores TTS"""
+
+    def __init__(self, pool_size: int = 8, timeout: Tuple[float, float] = DEFAULT_TIMEOUT, retries: int = 2):
+        self.timeout = timeout
+        self.session = requests.Session()
+
+        # Un pool de conexiones keep-alive reutilizado por todos los chunks
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retries)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        """GET reutilizando conexiones, con timeout por defecto"""
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.get(url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        """POST reutilizando conexiones, con timeout por defecto"""
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.post(url, **kwargs)
+
+    def download_to_file(self, method: str, url: str, dest_path: str, **kwargs: Any) -> Optional[int]:
+        """Descarga el cuerpo de la respuesta directamente a disco, por bloques.
+
+        Devuelve el número de bytes escritos o None si la respuesta no es válida.
+        """
+        with open(dest_path, 'wb') as f:
+            return self.write_response(method, url, f, **kwargs)
+
+    def write_response(self, method: str, url: str, dest: BinaryIO, **kwargs: Any) -> Optional[int]:
+        """Escribe el cuerpo de la respuesta por bloques en un archivo ya abierto.
+
+        Permite juntar varias respuestas en un mismo archivo (chunks de un audio).
+        Devuelve el número de bytes escritos o None si la respuesta no es válida.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        with self.session.request(method, url, stream=True, **kwargs) as response:
+            if response.status_code != 200:
+                print(f"❌ Error en servicio TTS: {response.status_code}")
+                return None
+
+            written = 0
+            for block in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+                if block:
+                    dest.write(block)
+                    written += len(block)
+
+            return written
+
+    def close(self) -> None:
+        """Cierra las conexiones del pool"""
+        self.session.close()
+
+
+_shared_session: Optional[TTSHttpSession] = None
+_shared_lock = threading.Lock()
+
+
+def get_tts_session() -> TTSHttpSession:
+    """Devuelve la sesión TTS compartida del proceso (se crea la primera vez)"""
+    global _shared_session
+    with _shared_lock:
+        if _shared_session is None:
+            _shared_session = TTSHttpSession()
+        return _shared_session
+
+
+def google_tts_request(text: str) -> Tuple[str, Dict[str, Any]]:
+    """Construye URL y argumentos para pedir un chunk al TTS de Google"""
+    params = {
+        'ie': 'UTF-8',
+        'q': text,
+        'tl': 'es',
+        'client': 'tw-ob',
+        'idx': '0',
+        'total': '1'
+    }
+
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+        'Referer': 'https://translate.google.com/',
+        'Accept': 'audio/mpeg,audio/*,*/*;q=0.9'
+    }
+
+    return GOOGLE_TTS_URL, {'params': params, 'headers': headers}
+
+
+def elevenlabs_tts_request(text: str, api_key: str, voice_id: str = "21m00Tcm4TlvDq8ikWAM") -> Tuple[str, Dict[str, Any]]:
+    """Construye URL y argumentos para la API de ElevenLabs"""
+    url = f"{ELEVENLABS_API_URL}/v1/text-to-speech/{voice_id}"
+
+    headers = {
+        'Accept': 'audio/mpeg',
+        'Content-Type': 'application/json',
+        'xi-api-key': api_key
+    }
+
+    data = {
+        'text': text,
+        'model_id': 'eleven_monolingual_v1',
+        'voice_settings': {
+            'stability': 0.5,
+            'similarity_boost': 0.5
+        }
+    }
+
+    return url, {'json': data, 'headers': headers}